@@ -0,0 +1,14 @@
+"""Offline micro-benchmarks for backend hot paths (see benchmarks/run.py)."""
+
+from typing import Callable, Dict, Optional
+
+# name -> (setup returning a zero-arg op, per-case threshold or None)
+CASES: Dict[str, tuple] = {}
+
+
+def case(name: str, threshold: Optional[float] = None):
+    """Register a benchmark: the decorated function does setup and returns the op to time."""
+    def register(setup: Callable[[], Callable[[], object]]):
+        CASES[name] = (setup, threshold)
+        return setup
+    return register
@@ -0,0 +1,208 @@
+"""
+Benchmark cases. Each setup builds its fixtures and returns the operation to time.
+
+Nothing here touches the network: the detector gets a canned chat-completions response,
+and recorder cases write under the temporary SESSIONS_DIR set by benchmarks/run.py.
+"""
+
+import asyncio
+import json
+import random
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import numpy as np
+
+from benchmarks import case
+from core.analysis_engine import tactic_detection_v2 as v2
+from core.analysis_engine.schemas import TranscriptSegment
+from services.audio_format import AudioNormalizer
+from services.session_recorder import SessionRecorder, sessions_root
+
+SAMPLE_LINES = [
+    "Thanks for making the time today.",
+    "The price is $48,000 for the year, and that's already discounted.",
+    "This offer is only valid until Friday.",
+    "Most of our customers sign up on the first call.",
+    "I'd have to check with my manager before going any lower.",
+    "If I can get you that price, will you sign today?",
+    "We can bundle the onboarding and premium support together.",
+    "Another vendor quoted us about 20% less.",
+    "Sponsored by our friends at the podcast network, use code SAVE10.",
+    "You should shop around and compare a few quotes first.",
+    "Installation is usually two weeks out.",
+    "Okay.",
+]
+
+SAMPLE_OPTIONS = [
+    "Consider asking how that figure was calculated.",
+    "One option is to introduce your own reference point.",
+    "Push them to close the deal today.",
+    "ask for the breakdown in writing",
+    "You might pause before responding.",
+    "Tell the customer it expires soon.",
+]
+
+SIGNAL_ITEMS = [
+    {
+        "category": "ANCHORING", "subtype": "numeric_anchor", "confidence": 0.9,
+        "headline": "Anchor Set", "why": "First numbers pull the negotiation.",
+        "best_question": "What is that figure based on?", "options": SAMPLE_OPTIONS[:4],
+        "evidence": SAMPLE_LINES[1],
+    },
+    {
+        "category": "URGENCY", "subtype": "deadline", "confidence": 0.8,
+        "headline": "Time Pressure", "why": "Deadlines compress thinking.",
+        "best_question": "What happens after Friday?", "options": SAMPLE_OPTIONS[2:],
+        "evidence": SAMPLE_LINES[2],
+    },
+    {"category": "NONE", "subtype": "none", "confidence": 0.95, "evidence": SAMPLE_LINES[0]},
+]
+
+
+def _transcript_entries(n: int, seed: int = 7) -> list:
+    rng = random.Random(seed)
+    start = datetime(2026, 1, 1, 12, 0, 0)
+    return [
+        {"timestamp": (start + timedelta(seconds=4 * i)).isoformat(), "text": rng.choice(SAMPLE_LINES), "speaker": rng.choice([1, "unknown"])}
+        for i in range(n)
+    ]
+
+
+@case("coach_role_label")
+def role_label():
+    with patch("services.coach.TacticDetectorV2"):
+        from services.coach import Coach
+        coach = Coach(mode="live")
+    inputs = [0, 1, 2, "Speaker 0", "Speaker 1", "speaker 3", "USER", "COUNTERPARTY", "unknown", "1"] * 10
+
+    def op():
+        for speaker in inputs:
+            coach._role_label(speaker)
+    return op
+
+
+@case("tactic_heuristics")
+def heuristics():
+    checks = [
+        v2._is_price_anchor_candidate, v2._is_ad_segment, v2._is_competitor_reference,
+        v2._is_shopping_advice, v2._is_bundling_candidate, v2._is_commitment_trap,
+        v2.is_priority_cue,
+    ]
+    lines = SAMPLE_LINES * 4
+
+    def op():
+        for text in lines:
+            for check in checks:
+                check(text)
+    return op
+
+
+@case("filter_options")
+def filter_options():
+    option_lists = [SAMPLE_OPTIONS, SAMPLE_OPTIONS[::-1], SAMPLE_OPTIONS[:3]] * 10
+
+    def op():
+        for options in option_lists:
+            v2._filter_options(options)
+    return op
+
+
+@case("postprocess_signals")
+def postprocess():
+    segment = TranscriptSegment(speaker="COUNTERPARTY", text=SAMPLE_LINES[1], timestamp=0.0)
+
+    def op():
+        v2._postprocess_signals(SIGNAL_ITEMS, segment)
+    return op
+
+
+@case("detect_tactics_prompt_and_parse")
+def detect_prompt():
+    """Full detect_tactics call against an instant canned response: prompt build, JSON parse, postprocess."""
+    detector = v2.TacticDetectorV2(api_key="offline", engine="llm")
+    content = json.dumps({"signals": SIGNAL_ITEMS[:1]})
+    response = SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+    async def create(**kwargs):
+        return response
+    detector.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    context = [TranscriptSegment(speaker=("USER" if i % 2 else "COUNTERPARTY"), text=SAMPLE_LINES[i % len(SAMPLE_LINES)]) for i in range(12)]
+    new = [TranscriptSegment(speaker="COUNTERPARTY", text="We need an answer on the $48,000 figure soon.")]
+    loop = asyncio.new_event_loop()
+
+    def op():
+        loop.run_until_complete(detector.detect_tactics(context, negotiation_type="Vendor Pricing", new_segments=new))
+    return op
+
+
+def _recorder_with(n: int) -> SessionRecorder:
+    recorder = SessionRecorder(negotiation_type="General")
+    recorder.transcripts = _transcript_entries(n)
+    recorder.advice_given = [{"timestamp": "2026-01-01T12:00:00", "advice": {"category": "ANCHORING"}, "personality": "tactical"}] * (n // 20)
+    return recorder
+
+
+def _register_recorder_case(n: int, label: str, threshold: float):
+    @case(f"recorder_save_{label}", threshold=threshold)
+    def recorder_save():
+        recorder = _recorder_with(n)
+        return recorder._save
+
+
+_register_recorder_case(10, "10", 0.5)
+_register_recorder_case(1000, "1k", 0.35)
+_register_recorder_case(10000, "10k", 0.35)
+
+
+@case("list_sessions_500", threshold=0.5)
+def list_sessions():
+    root = sessions_root() / "archive"
+    root.mkdir(parents=True, exist_ok=True)
+    transcripts = _transcript_entries(150)
+    for i in range(500):
+        data = {
+            "session_id": f"2026-01-01_{i:06d}",
+            "session_start": f"2026-01-01T12:{i % 60:02d}:00",
+            "session_end": f"2026-01-01T13:{i % 60:02d}:00",
+            "negotiation_type": "General",
+            "transcripts": transcripts,
+            "advice_given": [],
+            "outcome": {"result": "won"} if i % 3 else None,
+            "reflection": {"negotiation_score": i % 100},
+        }
+        with open(root / f"{data['session_id']}.json", "w") as f:
+            json.dump(data, f, indent=2)
+
+    def op():
+        with patch("services.session_recorder.sessions_root", return_value=root):
+            sessions = SessionRecorder.list_sessions()
+        assert len(sessions) == 500
+    return op
+
+
+@case("summary_normalize_2k_lines")
+def summary_normalize():
+    rng = random.Random(3)
+    transcript = "\n".join(f"{rng.choice(['Speaker 0', 'Speaker 1', 'unknown'])}: {rng.choice(SAMPLE_LINES)}" for _ in range(2000))
+
+    def op():
+        return "".join(rendered for *_, rendered in v2._normalize_transcript_lines(transcript, 0))
+    return op
+
+
+@case("audio_normalize_48k_stereo_float32")
+def audio_normalize():
+    """One second of 48 kHz stereo float32 in 4096-frame chunks (what a ScriptProcessorNode emits)."""
+    t = np.arange(48000) / 48000
+    tone = (0.4 * np.sin(2 * np.pi * 220 * t)).astype("<f4")
+    audio = np.stack([tone, tone[::-1]], axis=1).tobytes()
+    chunk = 4096 * 2 * 4
+    chunks = [audio[i:i + chunk] for i in range(0, len(audio), chunk)]
+    normalizer = AudioNormalizer("float32", 48000, 2)
+
+    def op():
+        for c in chunks:
+            normalizer.process(c)
+    return op
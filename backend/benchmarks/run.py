@@ -0,0 +1,169 @@
+"""
+Micro-benchmark runner with stored baselines.
+
+Usage (from backend/):
+    python -m benchmarks.run                       # compare against benchmarks/baselines.json
+    python -m benchmarks.run --update-baseline     # re-record baselines on this machine
+    python -m benchmarks.run -k recorder --threshold 0.3
+
+Each case is timed with timeit (auto-ranged to >= --min-time per sample, best of --repeat)
+and reported as seconds per operation. A calibration loop is timed alongside, and
+baselines are scaled by how fast this machine runs it compared to the baseline machine, so
+a slower CI box does not read as a regression. A case fails when it exceeds
+baseline * scale * (1 + threshold) on its initial measurement and on up to --retries
+re-measurements (timing noise rarely persists, real regressions do); the exit status is
+1 if any case failed.
+
+Runs fully offline: no API keys, session files go to a temporary SESSIONS_DIR.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import timeit
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+# To fix imports path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks import CASES
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baselines.json")
+DEFAULT_THRESHOLD = 0.25
+
+
+@contextmanager
+def _bench_env(sessions_dir: str):
+    """Scratch SESSIONS_DIR and quiet logging for the duration of a run."""
+    previous = os.environ.get("SESSIONS_DIR")
+    os.environ["SESSIONS_DIR"] = sessions_dir
+    logging.disable(logging.WARNING)
+    try:
+        yield
+    finally:
+        logging.disable(logging.NOTSET)
+        if previous is None:
+            os.environ.pop("SESSIONS_DIR", None)
+        else:
+            os.environ["SESSIONS_DIR"] = previous
+
+
+def _calibration_op():
+    return sum(i * i for i in range(20000))
+
+
+def measure(op: Callable[[], object], min_time: float = 0.2, repeat: int = 5) -> float:
+    """Best seconds per call of op."""
+    timer = timeit.Timer(op)
+    number, elapsed = timer.autorange()
+    if elapsed < min_time:
+        number = max(1, int(number * min_time / max(elapsed, 1e-9)))
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def compare(results: Dict[str, float], baseline: dict, threshold: float, scale: float = 1.0) -> List[dict]:
+    """Per-case verdicts; cases missing from the baseline are reported as new."""
+    verdicts = []
+    base_cases = baseline.get("cases", {})
+    for name, seconds in results.items():
+        entry = {"case": name, "seconds": seconds}
+        base = base_cases.get(name)
+        if base is None:
+            entry["status"] = "new"
+        else:
+            limit = CASES[name][1] if name in CASES and CASES[name][1] is not None else threshold
+            allowed = base * scale * (1 + limit)
+            entry.update(baseline=base, ratio=round(seconds / (base * scale), 3), allowed=allowed)
+            entry["status"] = "regressed" if seconds > allowed else "ok"
+        verdicts.append(entry)
+    return verdicts
+
+
+def _format_seconds(seconds: float) -> str:
+    for unit, factor in (("s", 1), ("ms", 1e3), ("us", 1e6)):
+        if seconds * factor >= 1:
+            return f"{seconds * factor:8.2f}{unit}"
+    return f"{seconds * 1e9:8.1f}ns"
+
+
+def run_cases(selected: List[str], min_time: float, repeat: int, quick: bool = False) -> Dict[str, float]:
+    results = {}
+    for name in selected:
+        setup, _ = CASES[name]
+        op = setup()
+        if quick:
+            op()
+            results[name] = 0.0
+            continue
+        results[name] = measure(op, min_time=min_time, repeat=repeat)
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Backend micro-benchmarks")
+    parser.add_argument("-k", "--filter", help="Only cases whose name contains this")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Allowed slowdown (0.25 = +25%%)")
+    parser.add_argument("--min-time", type=float, default=0.2)
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--retries", type=int, default=2, help="Re-measure apparently regressed cases this many times")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--quick", action="store_true", help="Run each case once (smoke test, no comparison)")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as scratch, _bench_env(scratch):
+        from benchmarks import cases  # noqa: F401  (registers CASES)
+
+        selected = [n for n in CASES if not args.filter or args.filter in n]
+        calibration = measure(_calibration_op, args.min_time, args.repeat) if not args.quick else 0.0
+        results = run_cases(selected, args.min_time, args.repeat, quick=args.quick)
+        if not args.quick:
+            calibration = min(calibration, measure(_calibration_op, args.min_time, args.repeat))
+
+            baseline = {}
+            if os.path.exists(args.baseline):
+                with open(args.baseline) as f:
+                    baseline = json.load(f)
+            scale = calibration / baseline["calibration"] if baseline.get("calibration") else 1.0
+            if not args.update_baseline:
+                for _ in range(args.retries):
+                    regressed = [v["case"] for v in compare(results, baseline, args.threshold, scale) if v["status"] == "regressed"]
+                    if not regressed:
+                        break
+                    for name, seconds in run_cases(regressed, args.min_time, args.repeat).items():
+                        results[name] = min(results[name], seconds)
+
+    if args.quick:
+        print(f"Ran {len(results)} cases once: {', '.join(results)}")
+        return 0
+
+    if args.update_baseline:
+        baseline.setdefault("cases", {}).update(results)
+        baseline["calibration"] = calibration
+        baseline["machine"] = f"{platform.system()} {platform.machine()} / Python {platform.python_version()}"
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write("\n")
+        for name, seconds in results.items():
+            print(f"{name:32s} {_format_seconds(seconds)}")
+        print(f"Baselines written to {args.baseline}")
+        return 0
+
+    verdicts = compare(results, baseline, args.threshold, scale)
+    print(f"Machine speed vs baseline: x{scale:.2f} (calibration)")
+    for v in verdicts:
+        extra = f"  x{v['ratio']:.2f} of baseline" if "ratio" in v else ""
+        print(f"{v['case']:32s} {_format_seconds(v['seconds'])}  {v['status'].upper():9s}{extra}")
+    regressed = [v["case"] for v in verdicts if v["status"] == "regressed"]
+    if regressed:
+        print(f"Regressions: {', '.join(regressed)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,231 @@
+"""
+Local CPU-only tactic classifier.
+
+Hashed word/character n-gram features with a NumPy softmax (multinomial logistic
+regression) model over joint "CATEGORY/subtype" labels. Trained from the labeled
+fixture lines in data/tactic_lines.jsonl plus exported session advice.
+"""
+
+import json
+import logging
+import os
+import re
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SEED_DATA_PATH = Path(__file__).resolve().parent / "data" / "tactic_lines.jsonl"
+
+# Feature hashing space (2^14 buckets keeps the weight matrix small)
+N_FEATURES = 1 << 14
+# Training densifies examples x active columns up to this many entries (16 MB), sparse beyond
+_DENSE_TRAIN_MAX_ENTRIES = 1 << 22
+
+_MONEY_RE = re.compile(r"(?:\$|usd\s?)\s?\d[\d,]*(?:\.\d+)?k?|\b\d[\d,]*(?:\.\d+)?\s?k\b", re.IGNORECASE)
+_NUMBER_RE = re.compile(r"\b\d[\d,]*(?:\.\d+)?\b")
+_TOKEN_RE = re.compile(r"[a-z<>']+")
+
+
+@dataclass
+class LocalPrediction:
+    category: str
+    subtype: str
+    confidence: float
+
+
+def _tokenize(text: str) -> List[str]:
+    lowered = _MONEY_RE.sub(" <money> ", text.lower())
+    lowered = _NUMBER_RE.sub(" <num> ", lowered)
+    return _TOKEN_RE.findall(lowered)
+
+
+def _featurize(text: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Returns (bucket indices, L2-normalized values) for a single line."""
+    tokens = _tokenize(text)
+    grams = [f"w:{t}" for t in tokens]
+    grams += [f"b:{a} {b}" for a, b in zip(tokens, tokens[1:])]
+    for t in tokens:
+        padded = f"#{t}#"
+        grams += [f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2)]
+    if not grams:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+
+    buckets = np.fromiter((zlib.crc32(g.encode()) % N_FEATURES for g in grams), dtype=np.int64, count=len(grams))
+    idx, counts = np.unique(buckets, return_counts=True)
+    values = counts.astype(np.float32)
+    values /= np.linalg.norm(values)
+    return idx, values
+
+
+class LocalTacticClassifier:
+    """
+    Linear softmax model over hashed n-grams.
+    predict() costs one sparse dot product (tens of microseconds per line).
+    """
+
+    def __init__(self, weights: np.ndarray, bias: np.ndarray, labels: List[str]):
+        self.weights = weights.astype(np.float32)
+        self.bias = bias.astype(np.float32)
+        self.labels = list(labels)
+        self._label_categories = np.array([label.split("/", 1)[0] for label in self.labels])
+
+    @classmethod
+    def train(cls, examples: Iterable[Tuple[str, str, str]], epochs: int = 300, learning_rate: float = 8.0, l2: float = 1e-4) -> "LocalTacticClassifier":
+        """
+        Full-batch gradient descent on (text, category, subtype) examples.
+        """
+        examples = list(examples)
+        if not examples:
+            raise ValueError("No training examples for local classifier")
+
+        labels = sorted({f"{cat}/{sub}" for _, cat, sub in examples})
+        label_index = {label: i for i, label in enumerate(labels)}
+
+        # Hashed n-grams are very sparse (tens of the 16k buckets per line): keep the rows as
+        # coordinate arrays instead of a dense examples x N_FEATURES matrix
+        rows, cols, vals = [], [], []
+        y = np.zeros((len(examples), len(labels)), dtype=np.float32)
+        for row, (text, cat, sub) in enumerate(examples):
+            idx, values = _featurize(text)
+            rows.append(np.full(len(idx), row, dtype=np.int64))
+            cols.append(idx)
+            vals.append(values)
+            y[row, label_index[f"{cat}/{sub}"]] = 1.0
+        rows, cols, vals = np.concatenate(rows), np.concatenate(cols), np.concatenate(vals)
+
+        # Only train the columns that actually occur; the rest stay zero
+        active, cols = np.unique(cols, return_inverse=True)
+        w = np.zeros((len(active), len(labels)), dtype=np.float32)
+        b = np.zeros(len(labels), dtype=np.float32)
+        if len(examples) * len(active) <= _DENSE_TRAIN_MAX_ENTRIES:
+            # Small sets (the seed fixtures): a dense matrix over the active columns is fastest
+            xa = np.zeros((len(examples), len(active)), dtype=np.float32)
+            xa[rows, cols] = vals
+            forward, backward = xa.__matmul__, xa.T.__matmul__
+        else:
+            forward = _SparseProduct(rows, cols, vals, len(examples)).dot
+            backward = _SparseProduct(cols, rows, vals, len(active)).dot
+        n = float(len(examples))
+        for _ in range(epochs):
+            probs = _softmax(forward(w) + b)
+            grad = probs - y
+            w -= learning_rate * (backward(grad) / n + l2 * w)
+            b -= learning_rate * grad.mean(axis=0)
+
+        weights = np.zeros((N_FEATURES, len(labels)), dtype=np.float32)
+        weights[active] = w
+        logger.info(f"Local classifier trained on {len(examples)} examples ({len(labels)} labels)")
+        return cls(weights, b, labels)
+
+    def predict(self, text: str) -> LocalPrediction:
+        idx, values = _featurize(text)
+        scores = values @ self.weights[idx] + self.bias if len(idx) else self.bias.copy()
+        probs = _softmax(scores)
+
+        # Category confidence sums its subtypes; subtype is the best label within the category
+        category_probs = {}
+        for cat, p in zip(self._label_categories, probs):
+            category_probs[cat] = category_probs.get(cat, 0.0) + float(p)
+        category = max(category_probs, key=category_probs.get)
+        in_category = np.flatnonzero(self._label_categories == category)
+        best = in_category[np.argmax(probs[in_category])]
+        return LocalPrediction(
+            category=str(category),
+            subtype=self.labels[best].split("/", 1)[1],
+            confidence=round(category_probs[category], 4),
+        )
+
+    def save(self, path: str | Path):
+        np.savez_compressed(path, weights=self.weights, bias=self.bias, labels=np.array(self.labels))
+
+    @classmethod
+    def load(cls, path: str | Path) -> "LocalTacticClassifier":
+        data = np.load(path, allow_pickle=False)
+        return cls(data["weights"], data["bias"], [str(label) for label in data["labels"]])
+
+
+class _SparseProduct:
+    """
+    Products of a coordinate-format matrix (entries values at [out_index, in_index]) with
+    dense matrices; build a second one with the index arrays swapped for the transpose.
+    Entries are grouped by output row once, so each product is one gather + reduceat.
+    """
+
+    def __init__(self, out_index: np.ndarray, in_index: np.ndarray, values: np.ndarray, n_out: int):
+        order = np.argsort(out_index, kind="stable")
+        out_sorted = out_index[order]
+        self.in_index = in_index[order]
+        self.values = values[order][:, None]
+        self.starts = np.flatnonzero(np.r_[True, out_sorted[1:] != out_sorted[:-1]]) if len(order) else np.zeros(0, dtype=np.int64)
+        self.targets = out_sorted[self.starts]
+        self.n_out = n_out
+
+    def dot(self, dense: np.ndarray) -> np.ndarray:
+        out = np.zeros((self.n_out, dense.shape[1]), dtype=np.float32)
+        if len(self.starts):
+            out[self.targets] = np.add.reduceat(self.values * dense[self.in_index], self.starts, axis=0)
+        return out
+
+
+def _softmax(scores: np.ndarray) -> np.ndarray:
+    shifted = scores - scores.max(axis=-1, keepdims=True)
+    exp = np.exp(shifted)
+    return exp / exp.sum(axis=-1, keepdims=True)
+
+
+def load_seed_examples(path: str | Path = SEED_DATA_PATH) -> List[Tuple[str, str, str]]:
+    """Labeled fixture lines (JSONL with text/category/subtype)."""
+    examples = []
+    with open(path, "r") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            row = json.loads(line)
+            examples.append((row["text"], row["category"], row.get("subtype", "none")))
+    return examples
+
+
+def load_session_examples(sessions_dir: str | Path) -> List[Tuple[str, str, str]]:
+    """
+    Labeled lines from exported session advice (evidence quote + detected category/subtype).
+    """
+    examples = []
+    for file_path in Path(sessions_dir).glob("*.json"):
+        try:
+            with open(file_path, "r") as f:
+                data = json.load(f)
+        except Exception as e:
+            logger.warning(f"Skipping session file {file_path}: {e}")
+            continue
+        for entry in data.get("advice_given", []):
+            advice = entry.get("advice")
+            if not isinstance(advice, dict):
+                continue
+            evidence = advice.get("evidence")
+            category = advice.get("category")
+            if evidence and category and category != "NONE":
+                examples.append((evidence, category, advice.get("subtype") or "none"))
+    return examples
+
+
+_default_classifier: Optional[LocalTacticClassifier] = None
+
+
+def get_default_classifier() -> LocalTacticClassifier:
+    """
+    Loads LOCAL_CLASSIFIER_PATH if set, otherwise trains once from the seed fixtures.
+    """
+    global _default_classifier
+    if _default_classifier is None:
+        model_path = os.getenv("LOCAL_CLASSIFIER_PATH")
+        if model_path and Path(model_path).exists():
+            _default_classifier = LocalTacticClassifier.load(model_path)
+        else:
+            _default_classifier = LocalTacticClassifier.train(load_seed_examples())
+    return _default_classifier
@@ -5,6 +5,7 @@ class TranscriptSegment(BaseModel):
     speaker: str
     timestamp: float = Field(default=0.0)
     text: str
+    trace_id: Optional[str] = Field(description="Per-utterance correlation id from the STT stage", default=None)
 
 class TacticSignal(BaseModel):
     category: Literal[
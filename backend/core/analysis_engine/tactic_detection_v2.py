@@ -1,18 +1,117 @@
-from openai import AsyncOpenAI
+from openai import AsyncOpenAI, RateLimitError
+import asyncio
 import os
 import json
 import logging
+import random
 import re
-from typing import List, Optional
+import time
+from typing import Callable, List, Optional
+from ..metrics import GATE_DECISIONS, LLM_CALL_SECONDS, LLM_RETRIES, STAGE_SECONDS
+from ..tracing import record_span, span
 from .schemas import TranscriptSegment, TacticSignal, AnalysisResult, ImprovementSummary
+from .local_classifier import LocalPrediction, get_default_classifier
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Bump whenever the summary/batch prompts change so cached reflections are regenerated
+SUMMARY_PROMPT_VERSION = "2026-10-summary-v2"
+# Opponent lines classified per request when aggregating signals for a summary
+SUMMARY_BATCH_SIZE = 25
+# Transcripts longer than this are summarized map-reduce style instead of in one prompt
+SUMMARY_SINGLE_PASS_CHARS = 10000
+SUMMARY_CHUNK_CHARS = 8000
+SUMMARY_CHUNK_OVERLAP_CHARS = 800
+# Upper bound on map calls; chunks grow for very long sessions instead
+SUMMARY_MAX_CHUNKS = 24
+# Size caps for the reduce prompt
+SUMMARY_REDUCE_BUDGET_CHARS = 12000
+SUMMARY_SIGNALS_BUDGET_CHARS = 4000
+SUMMARY_MAX_TACTICS = 20
+SUMMARY_MAX_KEY_MOMENTS = 12
+# Size cap for the rolling notes kept by the running debrief
+RUNNING_SUMMARY_MAX_CHARS = 3000
+# Retries (with exponential backoff) when the provider rate-limits a summary request
+RATE_LIMIT_MAX_RETRIES = 4
+RATE_LIMIT_BACKOFF_SECONDS = 1.0
+
+# Detection engines: "llm" (default), "local" (offline classifier only) or
+# "gated" (local classifier answers confident lines, ambiguous ones go to the LLM)
+TACTIC_ENGINES = ("llm", "local", "gated")
+# Minimum local category confidence to answer a line without the LLM in gated mode
+LOCAL_GATE_CONFIDENCE = float(os.getenv("LOCAL_GATE_CONFIDENCE", "0.7"))
+
 class TacticDetectorV2:
-    def __init__(self, api_key: Optional[str] = None):
-        self.client = AsyncOpenAI(api_key=api_key or os.getenv("OPENAI_API_KEY"))
+    def __init__(self, api_key: Optional[str] = None, max_concurrency: Optional[int] = None, engine: Optional[str] = None):
+        self.engine = (engine or os.getenv("TACTIC_ENGINE", "llm")).lower()
+        if self.engine not in TACTIC_ENGINES:
+            raise ValueError(f"Unknown tactic engine: {self.engine} (expected one of {TACTIC_ENGINES})")
+        api_key = api_key or os.getenv("OPENAI_API_KEY")
+        # The local engine runs fully offline; only build a client if a key is available
+        self.client = AsyncOpenAI(api_key=api_key) if (api_key or self.engine != "local") else None
+        self.local_classifier = get_default_classifier() if self.engine != "llm" else None
+        # Concurrent batch requests allowed while aggregating signals for a summary
+        self.max_concurrency = max(1, int(max_concurrency or os.getenv("SUMMARY_MAX_CONCURRENCY", "4")))
+
+    def _detect_local(self, segment: TranscriptSegment) -> Optional[List[TacticSignal]]:
+        """
+        Classifies a single NEW line with the local model.
+        Returns None when the line is ambiguous and should be escalated to the LLM (gated engine).
+        """
+        if segment.speaker == "USER":
+            return []
+        prediction = self.local_classifier.predict(segment.text)
+        if prediction.confidence < LOCAL_GATE_CONFIDENCE:
+            if self.engine == "gated":
+                logger.info(f"LOCAL GATE: escalating {prediction.category} ({prediction.confidence:.2f}) to LLM")
+                return None
+            # Local-only engine cannot escalate; low-confidence lines stay silent
+            prediction = LocalPrediction(category="NONE", subtype="none", confidence=1.0 - prediction.confidence)
+
+        template = _LOCAL_SIGNAL_TEMPLATES.get(prediction.category, {})
+        item = {
+            "category": prediction.category,
+            "subtype": prediction.subtype,
+            "confidence": prediction.confidence,
+            "evidence": segment.text,
+            **template,
+        }
+        return _postprocess_signals([item], segment)
+
+    async def _create_timed(self, operation: str, attempt: int = 1, trace_id: Optional[str] = None, retry: int = 0, **kwargs):
+        """
+        chat.completions.create, recording the request latency per operation/attempt (and a span when traced).
+        attempt counts invalid-JSON re-asks; retry counts rate-limit retries of that attempt.
+        """
+        start = time.perf_counter()
+        with span(f"llm.{operation}", trace_id, attempt=attempt, retry=retry, model=kwargs.get("model")):
+            try:
+                return await self.client.chat.completions.create(**kwargs)
+            finally:
+                LLM_CALL_SECONDS.observe(time.perf_counter() - start, operation=operation, attempt=attempt, retry=retry)
+
+    async def _create_with_backoff(self, operation: str = "summary", attempt: int = 1, **kwargs):
+        """
+        chat.completions.create with rate-limit-aware backoff.
+        Honors the provider's retry-after header when present.
+        """
+        for retry in range(RATE_LIMIT_MAX_RETRIES + 1):
+            try:
+                return await self._create_timed(operation, attempt, retry=retry, **kwargs)
+            except RateLimitError as e:
+                if retry >= RATE_LIMIT_MAX_RETRIES:
+                    raise
+                LLM_RETRIES.inc(operation=operation, reason="rate_limit")
+                delay = RATE_LIMIT_BACKOFF_SECONDS * (2 ** retry) * (1 + random.random() * 0.25)
+                retry_after = getattr(getattr(e, "response", None), "headers", {}).get("retry-after")
+                try:
+                    delay = max(delay, float(retry_after))
+                except (TypeError, ValueError):
+                    pass
+                logger.warning(f"V2 Rate limited, retrying in {delay:.1f}s (attempt {retry + 1}/{RATE_LIMIT_MAX_RETRIES})")
+                await asyncio.sleep(delay)
 
     async def detect_tactics(self, segments: List[TranscriptSegment], negotiation_type: str = "General", new_segments: Optional[List[TranscriptSegment]] = None, context_limit: int = 12) -> List[TacticSignal]:
         """
@@ -27,6 +126,8 @@ class TacticDetectorV2:
         if not segments and not new_segments:
             return []
 
+        build_start = time.perf_counter()
+        build_wall = time.time()
         # Prepare Context Text
         context_text = ""
         # segments acts as context if new_segments is passed. 
@@ -54,96 +155,19 @@ class TacticDetectorV2:
         for seg in target_segments:
             new_text += f"[{seg.speaker}]: {seg.text}\n"
 
+        trace_id = target_segments[-1].trace_id
         newest_text = target_segments[-1].text if target_segments else ""
         if _is_ad_segment(newest_text):
             logger.info("AD FILTER: skipping analysis for ad-like segment")
+            GATE_DECISIONS.inc(reason="ad_filtered")
             return []
-            
-        system_prompt = f"""You are a negotiation intelligence engine (Core Mode).
-Context: {negotiation_type} negotiation.
-
-Your Job: Detect if the COUNTERPARTY is using a specific negotiation tactic in the NEW SECTIONS only.
-Use the CONTEXT for background understanding but DO NOT classify based on it.
-
-HARD RULES:
-- Only detect tactics if the NEW line is spoken by [COUNTERPARTY].
-- If the NEW line is spoken by [USER], return category "NONE".
-- Evidence must quote the NEW [COUNTERPARTY] line.
-- You are assisting the USER (the negotiator using this tool), not the counterparty.
-- Options must help the user slow pace, verify claims, surface decision makers, protect leverage, or re-anchor with data.
-- Never produce options that increase urgency, amplify pressure, or help the counterparty close.
-
-Forbidden option intent examples: 'emphasize the benefits of acting quickly', 'highlight urgency', 'push them to sign', 'close the deal', 'sell the value'.
-
-PRIORITY RULES:
-1. FOCUS ON THE NEW SECTONS. If no new tactic appears there, return category: "NONE".
-1a. COMMITMENT/TRADES OFF VS URGENCY:
-   - Only classify COMMITMENT_TRAP when the NEW line is an explicit conditional exchange ("If I do X, will you do Y?").
-   - If there is no clear conditional exchange, do NOT classify COMMITMENT_TRAP.
-   - If the NEW line offers a concession in exchange for action ("If I waive X, can you sign now?"), classify as CONCESSION (tradeoff_offer).
-   - These take precedence over URGENCY when both appear in the same line.
-2. AUTHORITY VS URGENCY:
-   - "I don't have authority", "check with manager", "company policy", "no flexibility" -> AUTHORITY (subtype: manager_deferral, policy_shield).
-   - ONLY classify as URGENCY if explicit time/scarcity cues exist ("today", "this week", "only one left").
-   - If both appear, prioritize the dominant constraint in the NEW SECTONS.
-   - If the detected tactic is URGENCY, options should focus on pausing, verifying deadlines, requesting time, or exploring alternatives — not acting faster.
-
-Supported Tactics & Subtypes:
-- ANCHORING: Setting a high/low opening number.
-  Subtypes: numeric_anchor, range_anchor, comparison_anchor
-- URGENCY: creating time pressure.
-  Subtypes: deadline, scarcity
-- AUTHORITY: Claiming lack of authority.
-  Subtypes: manager_deferral, policy_shield
-- FRAMING: Positioning a loss/gain.
-  Subtypes: roi_reframe, monthly_breakdown, minimization
-- COMMITMENT_TRAP: Conditional commitment requests.
-  Subtypes: conditional_commitment, reciprocity_gate
-- CONCESSION: Incremental give-and-take offers.
-  Subtypes: staged_concession, tradeoff_offer
-- BUNDLING: Packaging or adding items/fees.
-  Subtypes: add_on_bundle, take_it_or_leave_it_package
-- PAYMENT_DEFLECTION: Steering to monthly payment instead of total price.
-  Subtypes: monthly_focus, affordability_frame
-- LOSS_AVERSION: Emphasizing loss if no action is taken.
-  Subtypes: fear_of_missing_out, loss_warning
-- SOCIAL_PROOF: Referencing others' choices to persuade.
-  Subtypes: popularity_claim, herd_reference
-- NONE: No tactic detected.
-  Subtype: none
 
-Competitor Mentions:
-- If the NEW line references a competitor or "other dealer/offer", classify as ANCHORING (comparison_anchor), not SOCIAL_PROOF.
-
-Confidence Threshold:
-- Only return options if confidence > 0.7 AND category != "NONE".
-
-Tone Requirements:
-- Professional, neutral, and analytical.
-- Example: "Pricing Anchor Detected" instead of "They are lowballing you".
-
-Options Guidelines:
-- Must be 0-3 options.
-- Start with: "One option is to...", "Consider...", "Another approach could be...".
-- If confidence < 0.7 or category == "NONE", return empty options.
-
-Output Schema (JSON):
-{{
-  "signals": [
-    {{
-      "category": "ANCHORING | URGENCY | AUTHORITY | FRAMING | COMMITMENT_TRAP | CONCESSION | BUNDLING | PAYMENT_DEFLECTION | LOSS_AVERSION | SOCIAL_PROOF | NONE",
-      "subtype": "string (from list above)",
-      "confidence": float (0.0-1.0),
-      "headline": "Short headline (e.g., 'Pricing Anchor Set')",
-      "why": "One-sentence explanation of why it matters",
-      "best_question": "Single best question to ask next",
-      "evidence": "Quote from transcript causing detection",
-      "options": ["One option is to...", "Consider...", "Another approach could be..."],
-      "message": "Short neutral observation (e.g. 'Counterparty cited company policy.')"
-    }}
-  ]
-}}
-"""
+        if self.engine != "llm":
+            local_signals = self._detect_local(target_segments[-1])
+            if local_signals is not None:
+                return local_signals
+            
+        system_prompt = _build_system_prompt(negotiation_type)
 
         user_content = f"""PASSED CONTEXT (Do not classify this):
 {context_text}
@@ -151,44 +175,14 @@ Output Schema (JSON):
 NEW SECTIONS (Classify this):
 {new_text}
 """
-
-        async def attempt_parse(content_raw):
-            try:
-                return json.loads(content_raw)
-            except json.JSONDecodeError:
-                # Simple repair: try to find the JSON object subset
-                try:
-                    start = content_raw.find("{")
-                    end = content_raw.rfind("}") + 1
-                    if start != -1 and end != -1:
-                        return json.loads(content_raw[start:end])
-                except:
-                    pass
-                return None
-
-        # Banned Phrases Filter (Case-Insensitive)
-        BANNED_PHRASES = [
-            # Seller-ish closing language
-            "emphasize the benefits", "highlight urgency", "create urgency", 
-            "act quickly", "move fast", "close", "push", "pressure", 
-            "sell", "overcome objections", "convince", "increase urgency", 
-            "secure the offer",
-            # Seller role language (Buyer-side framing)
-            "your offering", "your service", "value proposition", 
-            "justify your pricing", "your pricing"
-        ]
-
-        def filter_options(raw_opts):
-            clean_opts = []
-            for opt in raw_opts:
-                if not any(banned in opt.lower() for banned in BANNED_PHRASES):
-                    clean_opts.append(opt)
-            return clean_opts
+        STAGE_SECONDS.observe(time.perf_counter() - build_start, stage="prompt_build")
+        record_span("detect.prompt_build", trace_id, build_wall, context=len(ctx_segs), new=len(target_segments))
 
         data = None
         # First Attempt
         try:
-            response = await self.client.chat.completions.create(
+            response = await self._create_timed(
+                "detect", 1, trace_id,
                 model="gpt-4o-mini",
                 messages=[
                     {"role": "system", "content": system_prompt},
@@ -198,7 +192,7 @@ NEW SECTIONS (Classify this):
                 temperature=0.0,
                 response_format={"type": "json_object"}
             )
-            data = await attempt_parse(response.choices[0].message.content.strip())
+            data = _parse_json(response.choices[0].message.content.strip())
         except Exception as e:
             logger.error(f"V2 Detection Error (Attempt 1): {e}")
 
@@ -220,7 +214,7 @@ NEW SECTIONS (Classify this):
                 raw_opts = item.get("options", [])
                 
                 if cat != "NONE" and conf >= 0.7 and raw_opts:
-                    clean_opts = filter_options(raw_opts)
+                    clean_opts = _filter_options(raw_opts)
                     if not clean_opts: # All filtered out!
                         retry_needed = True
                         retry_prompt_suffix = "\nIMPORTANT: Options must be user-protective (slow pace / verify / regain control). Do not include seller coaching."
@@ -228,8 +222,10 @@ NEW SECTIONS (Classify this):
 
         if retry_needed:
             # logger.warning("V2 JSON Parse failed or Options Filtered, retrying once...") # redundant with specific log above
+            LLM_RETRIES.inc(operation="detect", reason="invalid_json" if data is None else "options_filtered")
             try:
-                response = await self.client.chat.completions.create(
+                response = await self._create_timed(
+                    "detect", 2, trace_id,
                     model="gpt-4o-mini",
                     messages=[
                         {"role": "system", "content": system_prompt + retry_prompt_suffix},
@@ -239,189 +235,185 @@ NEW SECTIONS (Classify this):
                     temperature=0.0,
                     response_format={"type": "json_object"}
                 )
-                data = await attempt_parse(response.choices[0].message.content.strip())
+                data = _parse_json(response.choices[0].message.content.strip())
             except Exception as e:
                 logger.error(f"V2 Detection Error (Attempt 2): {e}")
 
         if data is None:
             return []
 
-        signals = []
-        for item in data.get("signals", []):
-            try:
-                category = item.get("category", "NONE")
-                confidence = item.get("confidence", 0)
+        with STAGE_SECONDS.time(stage="postprocess"), span("detect.postprocess", trace_id):
+            return _postprocess_signals(data.get("signals", []), target_segments[-1])
 
-                # Enforce Options Logic
-                raw_options = item.get("options", [])
-                
-                # Apply Filter
-                filtered_options = filter_options(raw_options)
-                
-                valid_options = []
-                
-                if category != "NONE" and confidence >= 0.7:
-                    allowed_prefixes = ["One option is to", "Consider", "Another approach could be", "You might"] # Added "You might" to align with frontend
-                    # Strict prefix enforcement of filtered options
-                    for opt in filtered_options:
-                        if len(valid_options) >= 3:
-                            break
-                        
-                        # Check prefix
-                        detected_prefix = next((p for p in allowed_prefixes if opt.startswith(p)), None)
-                        
-                        if detected_prefix:
-                            valid_options.append(opt)
-                        else:
-                             # Auto-fix prefix
-                             valid_options.append(f"Consider {opt[0].lower() + opt[1:]}")
-                
-                # Check bounds
-                if len(valid_options) > 3:
-                    valid_options = valid_options[:3]
-
-                signal = TacticSignal(
-                   category=category,
-                   subtype=item.get("subtype", "none"),
-                   confidence=confidence,
-                   headline=item.get("headline", item.get("message", "Signal detected")),
-                   why=item.get("why", ""),
-                   best_question=item.get("best_question", ""),
-                   evidence=item.get("evidence", ""),
-                   timestamp=target_segments[-1].timestamp, 
-                   options=valid_options, 
-                   message=item.get("message", "Signal Detected")
+    async def detect_tactics_batch(self, lines: List[TranscriptSegment], negotiation_type: str = "General", context: Optional[List[TranscriptSegment]] = None, context_limit: int = 12) -> List[List[TacticSignal]]:
+        """
+        Classifies many NEW lines in a single request.
+        Lines are numbered in the prompt and share the same CONTEXT.
+        Returns one signal list per input line, in input order.
+        """
+        results: List[List[TacticSignal]] = [[] for _ in lines]
+        if not lines:
+            return results
+
+        numbered = [(i, seg) for i, seg in enumerate(lines) if not _is_ad_segment(seg.text)]
+        if len(numbered) < len(lines):
+            logger.info(f"AD FILTER: skipping {len(lines) - len(numbered)} ad-like line(s) in batch")
+            GATE_DECISIONS.inc(len(lines) - len(numbered), reason="ad_filtered")
+        if not numbered:
+            return results
+
+        if self.engine != "llm":
+            escalated = []
+            for i, seg in numbered:
+                local_signals = self._detect_local(seg)
+                if local_signals is None:
+                    escalated.append((i, seg))
+                else:
+                    results[i] = local_signals
+            numbered = escalated
+            if not numbered:
+                return results
+
+        context_text = ""
+        for seg in (context or [])[-context_limit:]:
+            context_text += f"[{seg.speaker}]: {seg.text}\n"
+
+        new_text = ""
+        for i, seg in numbered:
+            new_text += f"[LINE {i+1}] [{seg.speaker}]: {seg.text}\n"
+
+        system_prompt = _build_system_prompt(negotiation_type) + _BATCH_PROMPT_SUFFIX
+        user_content = f"""PASSED CONTEXT (Do not classify this):
+{context_text}
+
+NEW LINES (Classify each line independently):
+{new_text}
+"""
+        # Compact per-line output, so the budget scales with the batch
+        max_tokens = min(4000, 200 + 60 * len(numbered))
+
+        data = None
+        for attempt, suffix in enumerate(("", "\nIMPORTANT: RETURN VALID JSON ONLY."), start=1):
+            if attempt > 1:
+                LLM_RETRIES.inc(operation="batch", reason="invalid_json")
+            try:
+                response = await self._create_with_backoff(
+                    "batch", attempt,
+                    model="gpt-4o-mini",
+                    messages=[
+                        {"role": "system", "content": system_prompt + suffix},
+                        {"role": "user", "content": user_content}
+                    ],
+                    max_tokens=max_tokens,
+                    temperature=0.0,
+                    response_format={"type": "json_object"}
                 )
-                if signal.category == "FRAMING" and signal.confidence < 0.85:
-                    continue
-                if signal.category == "COMMITMENT_TRAP" and not _is_commitment_trap(signal.evidence):
-                    signal.category = "NONE"
-                    signal.subtype = "none"
-                    signal.options = []
-                # Re-map competitor mentions away from SOCIAL_PROOF
-                if signal.category == "SOCIAL_PROOF" and _is_competitor_reference(signal.evidence):
-                    signal.category = "ANCHORING"
-                    signal.subtype = "comparison_anchor"
-                if signal.category == "SOCIAL_PROOF" and _is_shopping_advice(signal.evidence):
-                    signal.category = "NONE"
-                    signal.subtype = "none"
-                    signal.options = []
-                if signal.category == "AUTHORITY" and signal.subtype == "policy_shield" and not signal.options:
-                    signal.options = [
-                        "Consider asking which parts of the policy are flexible versus fixed.",
-                        "One option is to request a review or exception path.",
-                        "Another approach could be to ask who can approve exceptions."
-                    ]
-                if signal.category == "SOCIAL_PROOF" and not signal.options:
-                    signal.options = [
-                        "Consider asking for evidence supporting the popularity claim.",
-                        "One option is to request comparative data against other models.",
-                        "Another approach could be to refocus on your specific requirements."
-                    ]
-                signals.append(signal)
+                data = _parse_json(response.choices[0].message.content.strip())
             except Exception as e:
-                logger.warning(f"V2 Skipping invalid signal item: {item} | Error: {e}")
+                logger.error(f"V2 Batch Detection Error (Attempt {attempt}): {e}")
+            if data is not None:
+                break
 
-        # Deterministic override for numeric anchors in NEW text (only if LLM returns NONE/empty)
-        newest_text = target_segments[-1].text if target_segments else ""
-        if _is_bundling_candidate(newest_text):
-            if not signals or signals[0].category == "NONE":
-                return [TacticSignal(
-                    category="BUNDLING",
-                    subtype="add_on_bundle",
-                    confidence=1.0,
-                    headline="Add-On Bundle Detected",
-                    why="Bundled add-ons can inflate the total cost beyond the base offer.",
-                    best_question="Which items are optional versus required in that bundle?",
-                    evidence=newest_text,
-                    timestamp=target_segments[-1].timestamp if target_segments else 0.0,
-                    options=[
-                        "Consider asking for a line-item breakdown of each add-on.",
-                        "One option is to request the base price without bundled items.",
-                        "Another approach could be to ask which items are required versus optional."
-                    ],
-                    message="Counterparty bundled add-ons into the offer."
-                )]
-        if _is_price_anchor_candidate(newest_text):
-            if not signals or signals[0].category == "NONE":
-                return [TacticSignal(
-                    category="ANCHORING",
-                    subtype="numeric_anchor",
-                    confidence=1.0,
-                    headline="Pricing Anchor Set",
-                    why="First numbers tend to pull the negotiation toward them.",
-                    best_question="What assumptions are baked into that number?",
-                    evidence=newest_text,
-                    timestamp=target_segments[-1].timestamp if target_segments else 0.0,
-                    options=[
-                        "Consider asking for a breakdown of how that figure was calculated.",
-                        "One option is to pause and request external benchmarks before responding.",
-                        "Another approach could be to introduce an alternative reference point."
-                    ],
-                    message="Counterparty stated a concrete price point."
-                )]
+        if data is None:
+            return results
+
+        items_by_line: dict = {}
+        for entry in data.get("results", []):
+            try:
+                line_no = int(entry.get("line"))
+            except (TypeError, ValueError, AttributeError):
+                logger.warning(f"V2 Batch skipping entry without valid line number: {entry}")
+                continue
+            items_by_line.setdefault(line_no - 1, []).extend(entry.get("signals", []))
 
-        return signals
+        # Post-process every line (including omitted ones) so the deterministic overrides still apply
+        for i, seg in numbered:
+            results[i] = _postprocess_signals(items_by_line.get(i, []), seg)
 
-    async def generate_summary(self, transcript_text: str, outcome: dict, user_speaker_id: int = 0, negotiation_type: str = "General") -> ImprovementSummary:
+        return results
+
+    async def generate_summary(self, transcript_text: str, outcome: dict, user_speaker_id: int = 0, negotiation_type: str = "General", on_progress: Optional[Callable[[int, int], None]] = None, prior_state: Optional[dict] = None) -> ImprovementSummary:
         """
         Generate a strategic debrief of the negotiation.
+        on_progress(analyzed, total) is called as opponent lines finish classification.
+        prior_state is a running debrief state (covered_lines, timeline, rolling_summary) built
+        during the session; its lines are not re-classified, only the uncovered tail is.
         """
         user_role = f"Speaker {user_speaker_id}"
+        covered_lines = int((prior_state or {}).get("covered_lines", 0))
         
+        # Opponent lines are classified in numbered batches (see step 2). Batches are dispatched
+        # while normalization is still running and run concurrently under a semaphore.
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        # Progress is only reported once normalization has counted every line (total is final)
+        progress = {"analyzed": 0, "total": 0, "final": False}
+        batch_tasks = []
+        pending_batch = []
+
+        async def classify_batch(batch):
+            async with semaphore:
+                segs = [TranscriptSegment(speaker="COUNTERPARTY", text=text) for _, text in batch]
+                batch_signals = await self.detect_tactics_batch(segs, negotiation_type=negotiation_type)
+            progress["analyzed"] += len(batch)
+            if on_progress and progress["final"]:
+                on_progress(progress["analyzed"], progress["total"])
+            return list(zip(batch, batch_signals))
+
         # 1. Normalize Transcript Labels for AI Clarity
         # Convert "Speaker 0" or "unknown" to "[USER]" and others to "[OPPONENT]"
         # This prevents the LLM from hallucinating roles when diarization is imperfect.
-        
-        normalized_transcript = ""
-        lines = transcript_text.split('\n')
-        for line in lines:
-            if ":" in line:
-                speaker_part, text_part = line.split(":", 1)
-                speaker_part = speaker_part.lower().strip()
-                
-                # Logic: If user is 0, then "0" or "unknown" is USER.
-                # If user is 1, then "1" is USER.
-                is_user = False
-                if str(user_speaker_id) in speaker_part:
-                    is_user = True
-                elif user_speaker_id == 0 and "unknown" in speaker_part:
-                    is_user = True
-                
-                label = "[USER]" if is_user else "[OPPONENT]"
-                normalized_transcript += f"{label}: {text_part.strip()}\n"
-            else:
-                normalized_transcript += line + "\n"
-        
+        normalized_parts = []
+        for line_no, is_user, text, rendered in _normalize_transcript_lines(transcript_text, user_speaker_id):
+            normalized_parts.append(rendered)
+            if is_user is False and line_no >= covered_lines:
+                pending_batch.append((line_no, text))
+                progress["total"] += 1
+                if len(pending_batch) >= SUMMARY_BATCH_SIZE:
+                    batch_tasks.append(asyncio.create_task(classify_batch(pending_batch)))
+                    pending_batch = []
+                    # Let the batch request go out before normalizing further
+                    await asyncio.sleep(0)
+        normalized_transcript = "".join(normalized_parts)
+        if pending_batch:
+            batch_tasks.append(asyncio.create_task(classify_batch(pending_batch)))
+        progress["final"] = True
+        if on_progress:
+            on_progress(progress["analyzed"], progress["total"])
+
         # 2. Aggregate Signals from Transcript Lines (like Practice Mode)
-        # Build TranscriptSegment objects for each line and detect tactics on opponent lines.
-        aggregated_signals_text = ""
+        # signal_lines keeps (line index, formatted signal) so long transcripts can split them per chunk
+        signal_lines = []
         try:
-            normalized_lines = normalized_transcript.strip().split('\n')
-            for idx, line in enumerate(normalized_lines):
-                if ": " in line and line.startswith("[OPPONENT]"):
-                    text = line.split(": ", 1)[1]
-                    # Create a minimal segment for detection
-                    seg = TranscriptSegment(speaker="COUNTERPARTY", text=text)
-                    # Call detect_tactics with this single line as "new"
-                    signals = await self.detect_tactics(segments=[], new_segments=[seg], negotiation_type=negotiation_type)
-                    for sig in signals:
-                        if sig.category != "NONE":
-                            # Format: "[LINE X] TACTIC: quote snippet"
-                            snippet = text[:60] + "..." if len(text) > 60 else text
-                            aggregated_signals_text += f"  - [LINE {idx+1}] {sig.category} ({sig.subtype}): \"{snippet}\"\n"
+            # Lines already covered by the running debrief come from its timeline
+            for entry in (prior_state or {}).get("timeline", []):
+                if entry["line"] < covered_lines:
+                    signal_lines.append((entry["line"], _format_signal_line(entry["line"], entry["category"], entry["subtype"], entry["snippet"])))
+            classified = []
+            for batch_result in await asyncio.gather(*batch_tasks):
+                classified.extend(batch_result)
+            for (idx, text), signals in classified:
+                for sig in signals:
+                    if sig.category != "NONE":
+                        signal_lines.append((idx, _format_signal_line(idx, sig.category, sig.subtype, text)))
+            # Reorder by transcript line index
+            signal_lines.sort(key=lambda entry: entry[0])
+            aggregated_signals_text = "".join(line for _, line in signal_lines)
         except Exception as e:
             logger.warning(f"Signal aggregation failed: {e}")
+            signal_lines = []
             aggregated_signals_text = "  (Aggregation skipped due to error)\n"
 
+        # Long transcripts are summarized hierarchically instead of being truncated
+        if len(normalized_transcript) > SUMMARY_SINGLE_PASS_CHARS:
+            rolling_summary = (prior_state or {}).get("rolling_summary", "")
+            summary_lines = int((prior_state or {}).get("summary_lines", 0))
+            if rolling_summary and summary_lines:
+                # The running debrief already condensed those lines; one short call finishes it
+                return await self._finalize_running_summary(normalized_transcript, rolling_summary, summary_lines, signal_lines, outcome, negotiation_type)
+            return await self._map_reduce_summary(normalized_transcript, signal_lines, outcome, negotiation_type)
+
         # 3. Build Pre-Identified Signals section for the prompt
-        pre_signals_section = ""
-        if aggregated_signals_text.strip():
-            pre_signals_section = f"""
-PRE-IDENTIFIED SIGNALS (from automated detection):
-{aggregated_signals_text}
-Use these pre-identified signals to guide your analysis. Include ALL of them in your tactics_faced list.
-"""
+        pre_signals_section = _pre_signals_section(aggregated_signals_text)
 
         prompt = f"""
 You are the world's best negotiation coach. Your client is [USER]. The opponent is [OPPONENT].
@@ -429,7 +421,7 @@ Context: {negotiation_type} negotiation.
 Analyze this transcript from the [USER]'s perspective. Do NOT just critique the [OPPONENT]'s moves—critique how the [USER] *responded* to them.
 {pre_signals_section}
 Transcript:
-{normalized_transcript[:10000]}
+{normalized_transcript[:SUMMARY_SINGLE_PASS_CHARS]}
 
 Outcome: {outcome.get('result', 'unknown')}
 
@@ -438,40 +430,17 @@ Task:
 2. Evaluate the [USER]'s counter-moves.
 3. Score the [USER]'s performance (0-100).
 4. Extract key moments where the [USER] won or lost ground.
+{_SUMMARY_OUTPUT_FORMAT}"""
 
-MANDATORY JSON OUTPUT FORMAT (Strict):
-{{
-  "negotiation_summary": "High-level executive summary of the entire session (2-3 sentences)",
-  "strong_move": "Best move by the User (e.g., 'You effectively anchored the price...')",
-  "missed_opportunity": "Critical miss by the User (e.g., 'You failed to challenge the deadline...')",
-  "improvement_tip": "One actionable tip for next time (e.g., 'Next time, use a Label when...')",
-  "negotiation_score": integer (0-100),
-  "tactics_faced": ["TACTIC: Specific Detail", "TACTIC: Specific Detail"], 
-  "key_moments": [
-    {{ "quote": "quote from transcript", "insight": "Why this mattered for the User..." }}
-  ]
-}}
-IMPORTANT: 
-- 'tactics_faced' strings MUST follow the format "TACTIC NAME: Brief Context" (e.g., "ANCHORING: Seller asked for $125k").
-- Do NOT include 'expanded_insights'. 
-- Speak directly to the User ("You did X").
-"""
-
-        def attempt_parse(content_raw):
-            try:
-                return json.loads(content_raw)
-            except json.JSONDecodeError:
-                try:
-                    start = content_raw.find("{")
-                    end = content_raw.rfind("}") + 1
-                    if start != -1 and end != -1:
-                        return json.loads(content_raw[start:end])
-                except Exception:
-                    return None
-            return None
+        return await self._complete_summary(prompt)
 
+    async def _complete_summary(self, prompt: str) -> ImprovementSummary:
+        """
+        Runs the final summary prompt (retrying once on invalid JSON) and extracts the result.
+        """
         try:
-            response = await self.client.chat.completions.create(
+            response = await self._create_timed(
+                 "summary", 1,
                  model="gpt-4o-mini",
                  messages=[
                      {"role": "system", "content": "You are a negotiation coach for the User. Return strictly valid JSON."},
@@ -482,10 +451,12 @@ IMPORTANT:
                  response_format={"type": "json_object"}
             )
             raw = response.choices[0].message.content
-            data = attempt_parse(raw)
+            data = _parse_json(raw)
             if data is None:
                  # Retry once with stricter system prompt if JSON fails
-                response = await self.client.chat.completions.create(
+                LLM_RETRIES.inc(operation="summary", reason="invalid_json")
+                response = await self._create_timed(
+                     "summary", 2,
                      model="gpt-4o-mini",
                      messages=[
                          {"role": "system", "content": "Return valid JSON only. meaningful negotiation_score and key_moments are REQUIRED."},
@@ -496,44 +467,740 @@ IMPORTANT:
                      response_format={"type": "json_object"}
                  )
                 raw = response.choices[0].message.content
-                data = attempt_parse(raw)
+                data = _parse_json(raw)
 
             if data is None:
                 raise ValueError("Invalid JSON from summary model")
             
-            # Robust extraction
-            score = 50
-            raw_score = data.get("negotiation_score")
-            if isinstance(raw_score, int):
-                score = raw_score
-            elif isinstance(raw_score, str) and raw_score.isdigit():
-                score = int(raw_score)
-
-            # Robust moments extraction
-            raw_moments = data.get("key_moments", [])
-            valid_moments = []
-            if isinstance(raw_moments, list):
-                for m in raw_moments:
-                    if isinstance(m, dict) and "quote" in m and "insight" in m:
-                        valid_moments.append(m)
-            
+            return _summary_from_data(data)
+        except Exception as e:
+            logger.error(f"Summary generation error: {e}")
             return ImprovementSummary(
-                strong_move=str(data.get("strong_move", "N/A")),
-                missed_opportunity=str(data.get("missed_opportunity", "N/A")),
-                improvement_tip=str(data.get("improvement_tip", "N/A")),
-                negotiation_score=score,
-                negotiation_summary=str(data.get("negotiation_summary", "")),
-                tactics_faced=[str(t) for t in data.get("tactics_faced", []) if isinstance(t, str)],
-                key_moments=valid_moments
+                strong_move="Analysis failed",
+                missed_opportunity="Analysis failed",
+                improvement_tip="Analysis failed"
+            )
+
+    async def _finalize_running_summary(self, normalized_transcript: str, rolling_summary: str, covered_lines: int, signal_lines: List[tuple], outcome: dict, negotiation_type: str) -> ImprovementSummary:
+        """
+        Final summary from a running debrief: rolling notes for the covered lines plus the
+        raw tail of the transcript that arrived after the last update.
+        """
+        tail = "\n".join(normalized_transcript.split('\n')[covered_lines:]).strip()
+        if len(tail) > SUMMARY_CHUNK_CHARS:
+            tail = "...\n" + tail[-SUMMARY_CHUNK_CHARS:]
+
+        prompt = f"""
+You are the world's best negotiation coach. Your client is [USER]. The opponent is [OPPONENT].
+Context: {negotiation_type} negotiation.
+Running notes were kept during the session for the first {covered_lines} lines; the rest of the transcript follows.
+Analyze the whole session from the [USER]'s perspective.
+{_pre_signals_section(_clip_signal_lines(signal_lines))}
+RUNNING NOTES:
+{rolling_summary[:SUMMARY_REDUCE_BUDGET_CHARS]}
+
+REMAINING TRANSCRIPT:
+{tail or "(none)"}
+
+Outcome: {outcome.get('result', 'unknown')}
+
+Task:
+1. Identify specific tactics used AGAINST the [USER] (incorporate PRE-IDENTIFIED SIGNALS above).
+2. Evaluate the [USER]'s counter-moves.
+3. Score the [USER]'s performance (0-100).
+4. Extract key moments where the [USER] won or lost ground.
+{_SUMMARY_OUTPUT_FORMAT}"""
+
+        return await self._complete_summary(prompt)
+
+    async def update_running_summary(self, previous_summary: str, new_segments: List[TranscriptSegment], negotiation_type: str = "General") -> Optional[str]:
+        """
+        Folds newly arrived lines into the rolling session notes kept by the running debrief.
+        Returns None if the notes could not be updated (no LLM client or the call failed).
+        """
+        if self.client is None or not new_segments:
+            return None
+
+        new_text = "\n".join(
+            f"[{'USER' if seg.speaker == 'USER' else 'OPPONENT'}]: {seg.text}" for seg in new_segments
+        )
+        prompt = f"""
+You keep running notes on a live {negotiation_type} negotiation for the [USER]'s coach.
+
+NOTES SO FAR:
+{previous_summary or "(none yet)"}
+
+NEW LINES:
+{new_text}
+
+Rewrite the notes to include the new lines. Keep offers, numbers, concessions, tactics the [OPPONENT] used
+and how the [USER] responded, with short quotes for key moments. Stay under {RUNNING_SUMMARY_MAX_CHARS} characters.
+Return the notes as plain text only.
+"""
+        try:
+            response = await self._create_with_backoff(
+                "running_summary",
+                model="gpt-4o-mini",
+                messages=[
+                    {"role": "system", "content": "You are a concise negotiation note-taker."},
+                    {"role": "user", "content": prompt}
+                ],
+                max_tokens=500,
+                temperature=0.2
             )
+            notes = (response.choices[0].message.content or "").strip()
+            return notes[:RUNNING_SUMMARY_MAX_CHARS] if notes else None
         except Exception as e:
-            logger.error(f"Summary generation error: {e}")
+            logger.warning(f"Running summary update failed: {e}")
+            return None
+
+    async def _map_reduce_summary(self, normalized_transcript: str, signal_lines: List[tuple], outcome: dict, negotiation_type: str) -> ImprovementSummary:
+        """
+        Hierarchical summary for transcripts beyond SUMMARY_SINGLE_PASS_CHARS.
+        Map: overlapping chunks are summarized concurrently. Reduce: partial results are
+        merged locally (bounded) and a single final call produces the ImprovementSummary.
+        """
+        lines = normalized_transcript.split('\n')
+        # Grow chunks for very long sessions so the number of calls stays bounded
+        chunk_chars = max(SUMMARY_CHUNK_CHARS, -(-len(normalized_transcript) // SUMMARY_MAX_CHUNKS) + SUMMARY_CHUNK_OVERLAP_CHARS)
+        ranges = _chunk_line_ranges(lines, chunk_chars, SUMMARY_CHUNK_OVERLAP_CHARS)
+        logger.info(f"Map-reduce summary: {len(normalized_transcript)} chars in {len(ranges)} chunks")
+
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def summarize_chunk(part_no: int, start: int, end: int):
+            chunk_text = "\n".join(lines[start:end])
+            chunk_signals = "".join(line for idx, line in signal_lines if start <= idx < end)
+            prompt = f"""
+You are the world's best negotiation coach. Your client is [USER]. The opponent is [OPPONENT].
+Context: {negotiation_type} negotiation.
+This is PART {part_no} of {len(ranges)} of a long transcript (parts overlap slightly). Analyze ONLY this part from the [USER]'s perspective.
+{_pre_signals_section(chunk_signals)}
+Transcript part:
+{chunk_text}
+{_PARTIAL_OUTPUT_FORMAT}"""
+            async with semaphore:
+                try:
+                    response = await self._create_with_backoff(
+                        "summary_chunk",
+                        model="gpt-4o-mini",
+                        messages=[
+                            {"role": "system", "content": "You are a negotiation coach for the User. Return strictly valid JSON."},
+                            {"role": "user", "content": prompt}
+                        ],
+                        max_tokens=600,
+                        temperature=0.3,
+                        response_format={"type": "json_object"}
+                    )
+                    data = _parse_json(response.choices[0].message.content.strip())
+                except Exception as e:
+                    logger.error(f"Summary chunk {part_no} error: {e}")
+                    data = None
+            if data is None:
+                logger.warning(f"Summary chunk {part_no} skipped (no valid JSON)")
+                return None
+            return (len(chunk_text), data)
+
+        partials = await asyncio.gather(*[
+            summarize_chunk(n + 1, start, end) for n, (start, end) in enumerate(ranges)
+        ])
+        merged = _merge_partials([p for p in partials if p])
+        if merged is None:
             return ImprovementSummary(
                 strong_move="Analysis failed",
                 missed_opportunity="Analysis failed",
                 improvement_tip="Analysis failed"
             )
 
+        # Keep the reduce prompt within budget regardless of session length
+        per_part = max(200, SUMMARY_REDUCE_BUDGET_CHARS // max(1, len(merged["part_summaries"])))
+        part_notes = "\n".join(
+            f"PART {n + 1}: {summary[:per_part]}" for n, summary in enumerate(merged["part_summaries"])
+        )
+        aggregated_signals_text = _clip_signal_lines(signal_lines)
+
+        prompt = f"""
+You are the world's best negotiation coach. Your client is [USER]. The opponent is [OPPONENT].
+Context: {negotiation_type} negotiation.
+The transcript was too long to read at once. It was analyzed in {len(ranges)} consecutive parts; the partial analyses are below.
+Combine them into ONE debrief of the whole session from the [USER]'s perspective.
+{_pre_signals_section(aggregated_signals_text)}
+PART SUMMARIES:
+{part_notes}
+
+STRONG MOVES NOTED: {json.dumps(merged["strong_moves"])}
+MISSED OPPORTUNITIES NOTED: {json.dumps(merged["missed_opportunities"])}
+TACTICS NOTED: {json.dumps(merged["tactics_faced"])}
+KEY MOMENTS NOTED: {json.dumps(merged["key_moments"])}
+PART SCORES (length-weighted average {merged["negotiation_score"]}): {merged["part_scores"]}
+
+Outcome: {outcome.get('result', 'unknown')}
+
+Task:
+1. Identify specific tactics used AGAINST the [USER] across the whole session.
+2. Evaluate the [USER]'s counter-moves and how they changed over time.
+3. Score the [USER]'s overall performance (0-100).
+4. Pick the key moments that mattered most for the outcome.
+{_SUMMARY_OUTPUT_FORMAT}"""
+
+        summary = await self._complete_summary(prompt)
+        if summary.strong_move == "Analysis failed":
+            # Final call failed: fall back to the locally merged partials
+            return _summary_from_data({
+                "negotiation_summary": " ".join(merged["part_summaries"])[:1000],
+                "strong_move": merged["strong_moves"][0] if merged["strong_moves"] else "N/A",
+                "missed_opportunity": merged["missed_opportunities"][0] if merged["missed_opportunities"] else "N/A",
+                "improvement_tip": "N/A",
+                "negotiation_score": merged["negotiation_score"],
+                "tactics_faced": merged["tactics_faced"],
+                "key_moments": merged["key_moments"],
+            })
+        return summary
+
+_SUMMARY_OUTPUT_FORMAT = """
+MANDATORY JSON OUTPUT FORMAT (Strict):
+{
+  "negotiation_summary": "High-level executive summary of the entire session (2-3 sentences)",
+  "strong_move": "Best move by the User (e.g., 'You effectively anchored the price...')",
+  "missed_opportunity": "Critical miss by the User (e.g., 'You failed to challenge the deadline...')",
+  "improvement_tip": "One actionable tip for next time (e.g., 'Next time, use a Label when...')",
+  "negotiation_score": integer (0-100),
+  "tactics_faced": ["TACTIC: Specific Detail", "TACTIC: Specific Detail"], 
+  "key_moments": [
+    { "quote": "quote from transcript", "insight": "Why this mattered for the User..." }
+  ]
+}
+IMPORTANT: 
+- 'tactics_faced' strings MUST follow the format "TACTIC NAME: Brief Context" (e.g., "ANCHORING: Seller asked for $125k").
+- Do NOT include 'expanded_insights'. 
+- Speak directly to the User ("You did X").
+"""
+
+_PARTIAL_OUTPUT_FORMAT = """
+MANDATORY JSON OUTPUT FORMAT (Strict):
+{
+  "part_summary": "What happened in this part (2-3 sentences)",
+  "strong_moves": ["Good moves by the User in this part"],
+  "missed_opportunities": ["Misses by the User in this part"],
+  "tactics_faced": ["TACTIC NAME: Brief Context"],
+  "key_moments": [
+    { "quote": "quote from this part", "insight": "Why this mattered for the User..." }
+  ],
+  "negotiation_score": integer (0-100, the User's performance in this part)
+}
+Keep every list to at most 3 items. Speak directly to the User ("You did X").
+"""
+
+
+def _pre_signals_section(aggregated_signals_text: str) -> str:
+    if not aggregated_signals_text.strip():
+        return ""
+    return f"""
+PRE-IDENTIFIED SIGNALS (from automated detection):
+{aggregated_signals_text}
+Use these pre-identified signals to guide your analysis. Include ALL of them in your tactics_faced list.
+"""
+
+
+def _format_signal_line(idx: int, category: str, subtype: str, text: str) -> str:
+    # Format: "[LINE X] TACTIC: quote snippet"
+    snippet = text[:60] + "..." if len(text) > 60 else text
+    return f"  - [LINE {idx+1}] {category} ({subtype}): \"{snippet}\"\n"
+
+
+def _clip_signal_lines(signal_lines: List[tuple]) -> str:
+    """Joins (idx, line) signals, clipped to SUMMARY_SIGNALS_BUDGET_CHARS."""
+    text = "".join(line for _, line in signal_lines)
+    if len(text) > SUMMARY_SIGNALS_BUDGET_CHARS:
+        kept = text[:SUMMARY_SIGNALS_BUDGET_CHARS].rsplit("\n", 1)[0] + "\n"
+        text = kept + f"  (+{len(signal_lines) - kept.count(chr(10))} more signals)\n"
+    return text
+
+
+def _summary_from_data(data: dict) -> ImprovementSummary:
+    """Robust extraction of an ImprovementSummary from model JSON."""
+    score = 50
+    raw_score = data.get("negotiation_score")
+    if isinstance(raw_score, int):
+        score = raw_score
+    elif isinstance(raw_score, str) and raw_score.isdigit():
+        score = int(raw_score)
+
+    # Robust moments extraction
+    raw_moments = data.get("key_moments", [])
+    valid_moments = []
+    if isinstance(raw_moments, list):
+        for m in raw_moments:
+            if isinstance(m, dict) and "quote" in m and "insight" in m:
+                valid_moments.append(m)
+    
+    return ImprovementSummary(
+        strong_move=str(data.get("strong_move", "N/A")),
+        missed_opportunity=str(data.get("missed_opportunity", "N/A")),
+        improvement_tip=str(data.get("improvement_tip", "N/A")),
+        negotiation_score=score,
+        negotiation_summary=str(data.get("negotiation_summary", "")),
+        tactics_faced=[str(t) for t in data.get("tactics_faced", []) if isinstance(t, str)],
+        key_moments=valid_moments
+    )
+
+
+def _chunk_line_ranges(lines: List[str], chunk_chars: int, overlap_chars: int) -> List[tuple]:
+    """
+    Splits lines into [start, end) ranges of about chunk_chars characters.
+    Each range after the first starts with roughly overlap_chars of the previous one.
+    """
+    ranges = []
+    start = 0
+    while start < len(lines):
+        end = start
+        size = 0
+        while end < len(lines) and (end == start or size + len(lines[end]) + 1 <= chunk_chars):
+            size += len(lines[end]) + 1
+            end += 1
+        ranges.append((start, end))
+        if end >= len(lines):
+            break
+        # Step back into the current chunk for overlap, but always make progress
+        next_start = end
+        overlap = 0
+        while next_start - 1 > start and overlap + len(lines[next_start - 1]) + 1 <= overlap_chars:
+            next_start -= 1
+            overlap += len(lines[next_start]) + 1
+        start = next_start
+    return ranges
+
+
+def _merge_partials(partials: List[tuple]) -> Optional[dict]:
+    """
+    Merges (chunk length, partial JSON) results into bounded lists and a length-weighted score.
+    """
+    if not partials:
+        return None
+
+    def dedupe(values, limit):
+        seen, out = set(), []
+        for v in values:
+            if isinstance(v, str) and v.strip() and v.strip().lower() not in seen:
+                seen.add(v.strip().lower())
+                out.append(v.strip())
+            if len(out) >= limit:
+                break
+        return out
+
+    def round_robin(lists):
+        # Interleave so every part contributes its strongest items first
+        out = []
+        for i in range(max((len(l) for l in lists), default=0)):
+            out.extend(l[i] for l in lists if i < len(l))
+        return out
+
+    scores, weights = [], []
+    for length, data in partials:
+        raw_score = data.get("negotiation_score")
+        if isinstance(raw_score, str) and raw_score.isdigit():
+            raw_score = int(raw_score)
+        if isinstance(raw_score, (int, float)):
+            scores.append(float(raw_score))
+            weights.append(length)
+    score = int(round(sum(s * w for s, w in zip(scores, weights)) / sum(weights))) if weights else 50
+
+    def as_list(data, key):
+        value = data.get(key, [])
+        return value if isinstance(value, list) else []
+
+    moments = round_robin([
+        [m for m in as_list(data, "key_moments") if isinstance(m, dict) and "quote" in m and "insight" in m]
+        for _, data in partials
+    ])
+    return {
+        "part_summaries": [str(data.get("part_summary", "")) for _, data in partials],
+        "strong_moves": dedupe(round_robin([as_list(d, "strong_moves") for _, d in partials]), 8),
+        "missed_opportunities": dedupe(round_robin([as_list(d, "missed_opportunities") for _, d in partials]), 8),
+        "tactics_faced": dedupe(round_robin([as_list(d, "tactics_faced") for _, d in partials]), SUMMARY_MAX_TACTICS),
+        "key_moments": moments[:SUMMARY_MAX_KEY_MOMENTS],
+        "negotiation_score": score,
+        "part_scores": [int(s) for s in scores],
+    }
+
+
+def _build_system_prompt(negotiation_type: str) -> str:
+    return f"""You are a negotiation intelligence engine (Core Mode).
+Context: {negotiation_type} negotiation.
+
+Your Job: Detect if the COUNTERPARTY is using a specific negotiation tactic in the NEW SECTIONS only.
+Use the CONTEXT for background understanding but DO NOT classify based on it.
+
+HARD RULES:
+- Only detect tactics if the NEW line is spoken by [COUNTERPARTY].
+- If the NEW line is spoken by [USER], return category "NONE".
+- Evidence must quote the NEW [COUNTERPARTY] line.
+- You are assisting the USER (the negotiator using this tool), not the counterparty.
+- Options must help the user slow pace, verify claims, surface decision makers, protect leverage, or re-anchor with data.
+- Never produce options that increase urgency, amplify pressure, or help the counterparty close.
+
+Forbidden option intent examples: 'emphasize the benefits of acting quickly', 'highlight urgency', 'push them to sign', 'close the deal', 'sell the value'.
+
+PRIORITY RULES:
+1. FOCUS ON THE NEW SECTONS. If no new tactic appears there, return category: "NONE".
+1a. COMMITMENT/TRADES OFF VS URGENCY:
+   - Only classify COMMITMENT_TRAP when the NEW line is an explicit conditional exchange ("If I do X, will you do Y?").
+   - If there is no clear conditional exchange, do NOT classify COMMITMENT_TRAP.
+   - If the NEW line offers a concession in exchange for action ("If I waive X, can you sign now?"), classify as CONCESSION (tradeoff_offer).
+   - These take precedence over URGENCY when both appear in the same line.
+2. AUTHORITY VS URGENCY:
+   - "I don't have authority", "check with manager", "company policy", "no flexibility" -> AUTHORITY (subtype: manager_deferral, policy_shield).
+   - ONLY classify as URGENCY if explicit time/scarcity cues exist ("today", "this week", "only one left").
+   - If both appear, prioritize the dominant constraint in the NEW SECTONS.
+   - If the detected tactic is URGENCY, options should focus on pausing, verifying deadlines, requesting time, or exploring alternatives — not acting faster.
+
+Supported Tactics & Subtypes:
+- ANCHORING: Setting a high/low opening number.
+  Subtypes: numeric_anchor, range_anchor, comparison_anchor
+- URGENCY: creating time pressure.
+  Subtypes: deadline, scarcity
+- AUTHORITY: Claiming lack of authority.
+  Subtypes: manager_deferral, policy_shield
+- FRAMING: Positioning a loss/gain.
+  Subtypes: roi_reframe, monthly_breakdown, minimization
+- COMMITMENT_TRAP: Conditional commitment requests.
+  Subtypes: conditional_commitment, reciprocity_gate
+- CONCESSION: Incremental give-and-take offers.
+  Subtypes: staged_concession, tradeoff_offer
+- BUNDLING: Packaging or adding items/fees.
+  Subtypes: add_on_bundle, take_it_or_leave_it_package
+- PAYMENT_DEFLECTION: Steering to monthly payment instead of total price.
+  Subtypes: monthly_focus, affordability_frame
+- LOSS_AVERSION: Emphasizing loss if no action is taken.
+  Subtypes: fear_of_missing_out, loss_warning
+- SOCIAL_PROOF: Referencing others' choices to persuade.
+  Subtypes: popularity_claim, herd_reference
+- NONE: No tactic detected.
+  Subtype: none
+
+Competitor Mentions:
+- If the NEW line references a competitor or "other dealer/offer", classify as ANCHORING (comparison_anchor), not SOCIAL_PROOF.
+
+Confidence Threshold:
+- Only return options if confidence > 0.7 AND category != "NONE".
+
+Tone Requirements:
+- Professional, neutral, and analytical.
+- Example: "Pricing Anchor Detected" instead of "They are lowballing you".
+
+Options Guidelines:
+- Must be 0-3 options.
+- Start with: "One option is to...", "Consider...", "Another approach could be...".
+- If confidence < 0.7 or category == "NONE", return empty options.
+
+Output Schema (JSON):
+{{
+  "signals": [
+    {{
+      "category": "ANCHORING | URGENCY | AUTHORITY | FRAMING | COMMITMENT_TRAP | CONCESSION | BUNDLING | PAYMENT_DEFLECTION | LOSS_AVERSION | SOCIAL_PROOF | NONE",
+      "subtype": "string (from list above)",
+      "confidence": float (0.0-1.0),
+      "headline": "Short headline (e.g., 'Pricing Anchor Set')",
+      "why": "One-sentence explanation of why it matters",
+      "best_question": "Single best question to ask next",
+      "evidence": "Quote from transcript causing detection",
+      "options": ["One option is to...", "Consider...", "Another approach could be..."],
+      "message": "Short neutral observation (e.g. 'Counterparty cited company policy.')"
+    }}
+  ]
+}}
+"""
+
+
+# Presentation fields for signals produced by the local classifier (no LLM text available)
+_LOCAL_SIGNAL_TEMPLATES = {
+    "ANCHORING": {
+        "headline": "Anchor Set",
+        "why": "First numbers and reference points tend to pull the negotiation toward them.",
+        "best_question": "What is that figure based on?",
+        "options": [
+            "Consider asking for a breakdown of how that figure was calculated.",
+            "One option is to introduce your own reference point.",
+        ],
+        "message": "Counterparty set a reference point.",
+    },
+    "URGENCY": {
+        "headline": "Time Pressure Applied",
+        "why": "Deadlines compress your thinking time and reduce comparison shopping.",
+        "best_question": "What specifically changes after that deadline?",
+        "options": [
+            "Consider asking what happens if you need more time.",
+            "One option is to verify the deadline in writing.",
+        ],
+        "message": "Counterparty introduced a deadline or scarcity.",
+    },
+    "AUTHORITY": {
+        "headline": "Authority Limit Claimed",
+        "why": "Deferring to someone absent lets them hold firm without negotiating.",
+        "best_question": "Who makes the final decision on this?",
+        "options": [
+            "Consider asking to include the decision maker.",
+            "One option is to ask what they can approve today.",
+        ],
+        "message": "Counterparty deferred to authority or policy.",
+    },
+    "FRAMING": {
+        "headline": "Cost Reframed",
+        "why": "Reframing can make a meaningful cost look smaller than it is.",
+        "best_question": "What is the total cost over the full term?",
+        "options": [
+            "Consider restating the total cost in your own terms.",
+        ],
+        "message": "Counterparty reframed the cost.",
+    },
+    "COMMITMENT_TRAP": {
+        "headline": "Conditional Commitment Requested",
+        "why": "Agreeing to a condition early can lock you in before terms are clear.",
+        "best_question": "What else would be part of that agreement?",
+        "options": [
+            "Consider separating the condition from the commitment.",
+            "One option is to ask for the full terms before agreeing.",
+        ],
+        "message": "Counterparty tied a concession to a commitment.",
+    },
+    "CONCESSION": {
+        "headline": "Concession Offered",
+        "why": "Small staged concessions can signal more room than is offered.",
+        "best_question": "What is the best total offer you can make?",
+        "options": [
+            "Consider asking what else is flexible.",
+            "One option is to pause before accepting the first concession.",
+        ],
+        "message": "Counterparty offered a concession.",
+    },
+    "BUNDLING": {
+        "headline": "Bundle Detected",
+        "why": "Bundled items can inflate the total cost beyond the base offer.",
+        "best_question": "Which items are optional versus required?",
+        "options": [
+            "Consider asking for a line-item breakdown.",
+        ],
+        "message": "Counterparty bundled items into the offer.",
+    },
+    "PAYMENT_DEFLECTION": {
+        "headline": "Monthly Payment Focus",
+        "why": "Monthly framing can hide a higher total price or a longer term.",
+        "best_question": "What is the total price, including all fees?",
+        "options": [
+            "Consider steering the discussion back to the total price.",
+        ],
+        "message": "Counterparty focused on monthly payments.",
+    },
+    "LOSS_AVERSION": {
+        "headline": "Loss Framing Used",
+        "why": "Fear of losing out pushes decisions before they are fully evaluated.",
+        "best_question": "What exactly would be lost, and when?",
+        "options": [
+            "Consider asking for the claimed loss to be quantified.",
+        ],
+        "message": "Counterparty emphasized a potential loss.",
+    },
+}
+
+
+_BATCH_PROMPT_SUFFIX = """
+BATCH MODE:
+- The NEW LINES are numbered "[LINE n]". Classify EACH line independently, as if it were the only NEW line.
+- Evidence must quote that line only.
+- Only include lines where a tactic is detected; omit lines that are "NONE".
+- Keep signals compact: category, subtype, confidence and evidence only. Do not include options.
+
+Output Schema for BATCH MODE (JSON, replaces the schema above):
+{
+  "results": [
+    {
+      "line": integer (the n from [LINE n]),
+      "signals": [
+        {"category": "...", "subtype": "...", "confidence": float (0.0-1.0), "evidence": "Quote from that line"}
+      ]
+    }
+  ]
+}
+"""
+
+
+def _parse_json(content_raw: str) -> Optional[dict]:
+    try:
+        return json.loads(content_raw)
+    except json.JSONDecodeError:
+        # Simple repair: try to find the JSON object subset
+        try:
+            start = content_raw.find("{")
+            end = content_raw.rfind("}") + 1
+            if start != -1 and end != -1:
+                return json.loads(content_raw[start:end])
+        except Exception:
+            pass
+        return None
+
+
+# Banned Phrases Filter (Case-Insensitive)
+_BANNED_PHRASES = [
+    # Seller-ish closing language
+    "emphasize the benefits", "highlight urgency", "create urgency", 
+    "act quickly", "move fast", "close", "push", "pressure", 
+    "sell", "overcome objections", "convince", "increase urgency", 
+    "secure the offer",
+    # Seller role language (Buyer-side framing)
+    "your offering", "your service", "value proposition", 
+    "justify your pricing", "your pricing"
+]
+
+
+def _normalize_transcript_lines(transcript_text: str, user_speaker_id: int = 0):
+    """
+    Yields (line_no, is_user, text, rendered_line) per transcript line.
+    "Speaker N: text" lines are relabelled [USER]/[OPPONENT]; if the user is 0, "unknown"
+    is the user too. Lines without a speaker prefix have is_user None and pass through.
+    """
+    user_id = str(user_speaker_id)
+    unknown_is_user = user_speaker_id == 0
+    for line_no, line in enumerate(transcript_text.split("\n")):
+        if ":" not in line:
+            yield line_no, None, None, line + "\n"
+            continue
+        speaker_part, text_part = line.split(":", 1)
+        speaker_part = speaker_part.lower()
+        is_user = user_id in speaker_part or (unknown_is_user and "unknown" in speaker_part)
+        text = text_part.strip()
+        yield line_no, is_user, text, f"{'[USER]' if is_user else '[OPPONENT]'}: {text}\n"
+
+
+def _filter_options(raw_opts: List[str]) -> List[str]:
+    clean_opts = []
+    for opt in raw_opts:
+        if not any(banned in opt.lower() for banned in _BANNED_PHRASES):
+            clean_opts.append(opt)
+    return clean_opts
+
+
+def _postprocess_signals(items: List[dict], segment: TranscriptSegment) -> List[TacticSignal]:
+    """
+    Turn raw LLM signal items for a single NEW line into validated signals.
+    Applies option filtering/prefixing, category remaps and the deterministic overrides.
+    """
+    signals = []
+    for item in items:
+        try:
+            category = item.get("category", "NONE")
+            confidence = item.get("confidence", 0)
+
+            # Enforce Options Logic
+            raw_options = item.get("options", [])
+
+            # Apply Filter
+            filtered_options = _filter_options(raw_options)
+
+            valid_options = []
+
+            if category != "NONE" and confidence >= 0.7:
+                allowed_prefixes = ["One option is to", "Consider", "Another approach could be", "You might"] # Added "You might" to align with frontend
+                # Strict prefix enforcement of filtered options
+                for opt in filtered_options:
+                    if len(valid_options) >= 3:
+                        break
+
+                    # Check prefix
+                    detected_prefix = next((p for p in allowed_prefixes if opt.startswith(p)), None)
+
+                    if detected_prefix:
+                        valid_options.append(opt)
+                    else:
+                         # Auto-fix prefix
+                         valid_options.append(f"Consider {opt[0].lower() + opt[1:]}")
+
+            # Check bounds
+            if len(valid_options) > 3:
+                valid_options = valid_options[:3]
+
+            signal = TacticSignal(
+               category=category,
+               subtype=item.get("subtype", "none"),
+               confidence=confidence,
+               headline=item.get("headline", item.get("message", "Signal detected")),
+               why=item.get("why", ""),
+               best_question=item.get("best_question", ""),
+               evidence=item.get("evidence", ""),
+               timestamp=segment.timestamp, 
+               options=valid_options, 
+               message=item.get("message", "Signal Detected")
+            )
+            if signal.category == "FRAMING" and signal.confidence < 0.85:
+                continue
+            if signal.category == "COMMITMENT_TRAP" and not _is_commitment_trap(signal.evidence):
+                signal.category = "NONE"
+                signal.subtype = "none"
+                signal.options = []
+            # Re-map competitor mentions away from SOCIAL_PROOF
+            if signal.category == "SOCIAL_PROOF" and _is_competitor_reference(signal.evidence):
+                signal.category = "ANCHORING"
+                signal.subtype = "comparison_anchor"
+            if signal.category == "SOCIAL_PROOF" and _is_shopping_advice(signal.evidence):
+                signal.category = "NONE"
+                signal.subtype = "none"
+                signal.options = []
+            if signal.category == "AUTHORITY" and signal.subtype == "policy_shield" and not signal.options:
+                signal.options = [
+                    "Consider asking which parts of the policy are flexible versus fixed.",
+                    "One option is to request a review or exception path.",
+                    "Another approach could be to ask who can approve exceptions."
+                ]
+            if signal.category == "SOCIAL_PROOF" and not signal.options:
+                signal.options = [
+                    "Consider asking for evidence supporting the popularity claim.",
+                    "One option is to request comparative data against other models.",
+                    "Another approach could be to refocus on your specific requirements."
+                ]
+            signals.append(signal)
+        except Exception as e:
+            logger.warning(f"V2 Skipping invalid signal item: {item} | Error: {e}")
+
+    # Deterministic override for numeric anchors in NEW text (only if LLM returns NONE/empty)
+    newest_text = segment.text
+    if _is_bundling_candidate(newest_text):
+        if not signals or signals[0].category == "NONE":
+            return [TacticSignal(
+                category="BUNDLING",
+                subtype="add_on_bundle",
+                confidence=1.0,
+                headline="Add-On Bundle Detected",
+                why="Bundled add-ons can inflate the total cost beyond the base offer.",
+                best_question="Which items are optional versus required in that bundle?",
+                evidence=newest_text,
+                timestamp=segment.timestamp,
+                options=[
+                    "Consider asking for a line-item breakdown of each add-on.",
+                    "One option is to request the base price without bundled items.",
+                    "Another approach could be to ask which items are required versus optional."
+                ],
+                message="Counterparty bundled add-ons into the offer."
+            )]
+    if _is_price_anchor_candidate(newest_text):
+        if not signals or signals[0].category == "NONE":
+            return [TacticSignal(
+                category="ANCHORING",
+                subtype="numeric_anchor",
+                confidence=1.0,
+                headline="Pricing Anchor Set",
+                why="First numbers tend to pull the negotiation toward them.",
+                best_question="What assumptions are baked into that number?",
+                evidence=newest_text,
+                timestamp=segment.timestamp,
+                options=[
+                    "Consider asking for a breakdown of how that figure was calculated.",
+                    "One option is to pause and request external benchmarks before responding.",
+                    "Another approach could be to introduce an alternative reference point."
+                ],
+                message="Counterparty stated a concrete price point."
+            )]
+
+    return signals
+
 
 _AMOUNT_PATTERNS = [
     re.compile(r"\$\s?\d[\d,]*", re.IGNORECASE),
@@ -592,6 +1259,36 @@ _AD_HINTS = [
     r"\bvisit\b",
 ]
 
+# High-value cues that should be analyzed right away in live mode (see Coach.process_transcript)
+_PRIORITY_CUE_PATTERNS = [
+    re.compile(p, re.IGNORECASE) for p in (
+        r"\btoday only\b",
+        r"\bonly (?:valid|good|available) (?:today|until|through)\b",
+        r"\b(?:expires?|ends?|offer is good)\b.{0,20}\b(?:today|tonight|tomorrow|friday|this week|end of (?:the )?(?:day|week|month))\b",
+        r"\b(?:deadline|final offer|last chance|best and final)\b",
+        r"\b(?:last|only) (?:one|unit|slot|spot)s? left\b",
+        r"\bmy (?:manager|boss|supervisor|director|partner)\b",
+        r"\b(?:company|our) policy\b",
+        r"\bif you sign\b",
+        r"\bsign (?:today|now|tonight)\b",
+        r"\bif\b.{0,40}\b(?:commit|agree)\b",
+    )
+]
+
+
+def is_priority_cue(text: str) -> bool:
+    """
+    Cheap check for cues worth an immediate live analysis: amounts, deadlines,
+    authority deferrals, commitment asks and competitor mentions.
+    """
+    if _is_ad_segment(text):
+        return False
+    return (
+        _is_price_anchor_candidate(text)
+        or _is_competitor_reference(text)
+        or any(p.search(text) for p in _PRIORITY_CUE_PATTERNS)
+    )
+
 
 def _is_price_anchor_candidate(text: str) -> bool:
     lowered = text.lower()
@@ -0,0 +1,237 @@
+"""
+Minimal in-process metrics with Prometheus text exposition (served at /metrics).
+
+Dependency-free and cheap enough to leave on: an observation is a dict lookup, a bisect
+over fixed buckets and a few additions under a lock. Metrics are module-level singletons
+defined at the bottom of this file.
+"""
+
+import asyncio
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Latency buckets (seconds) covering ms-scale local work up to slow LLM calls
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_REGISTRY: List["_Metric"] = []
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), register: bool = True):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        if register:
+            _REGISTRY.append(self)
+
+    def _key(self, labels: Dict[str, object]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in items]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in items]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS, register: bool = True):
+        super().__init__(name, documentation, labelnames, register=register)
+        self.buckets = tuple(sorted(buckets))
+        # key -> [per-bucket counts..., +Inf count], sum
+        self._counts: Dict[Tuple[str, ...], List[int]] = {}
+        self._sums: Dict[Tuple[str, ...], float] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._counts.get(key)
+            if counts is None:
+                counts = self._counts[key] = [0] * (len(self.buckets) + 1)
+                self._sums[key] = 0.0
+            counts[idx] += 1
+            self._sums[key] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of a with-block."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels) -> int:
+        return sum(self._counts.get(self._key(labels), []))
+
+    def total(self, **labels) -> float:
+        return self._sums.get(self._key(labels), 0.0)
+
+    def _samples(self):
+        with self._lock:
+            items = sorted((k, list(c), self._sums[k]) for k, c in self._counts.items())
+        lines = []
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, c in zip(self.buckets + (float("inf"),), counts):
+                cumulative += c
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, ('le', _format_value(bound)))} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+def render() -> str:
+    """All registered metrics in Prometheus text format (version 0.0.4)."""
+    PROCESS_RSS_BYTES.set(current_rss_bytes())
+    lines = []
+    for metric in _REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# --- Metrics ---
+
+# Stages: audio_normalize, stt_send, stt_final_to_callback, callback_to_coach, prompt_build, postprocess, ws_send, recorder_flush
+STAGE_SECONDS = Histogram("equalizer_stage_seconds", "Latency of live pipeline stages", ("stage",))
+# One observation per provider request; attempt is 1 for the first try, 2+ for retries
+LLM_CALL_SECONDS = Histogram("equalizer_llm_call_seconds", "Latency of individual LLM requests", ("operation", "attempt", "retry"))
+LLM_RETRIES = Counter("equalizer_llm_retries_total", "LLM requests retried", ("operation", "reason"))
+# Reasons: user_line, none, deduped, ad_filtered, filler, low_content, near_duplicate, analyzed
+GATE_DECISIONS = Counter("equalizer_gate_decisions_total", "Live analysis gating decisions", ("reason",))
+ACTIVE_SESSIONS = Gauge("equalizer_active_sessions", "Open WebSocket sessions")
+# How late the event loop runs a timer that should fire every LOOP_LAG_INTERVAL seconds
+EVENT_LOOP_LAG_SECONDS = Histogram(
+    "equalizer_event_loop_lag_seconds", "Event loop scheduling delay",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+# Summed over connections; lines dropped when a connection's analysis queue is full
+PIPELINE_QUEUE_DEPTH = Gauge("equalizer_transcript_queue_depth", "Transcript lines waiting for analysis")
+PIPELINE_DROPPED = Counter("equalizer_transcript_queue_dropped_total", "Transcript lines dropped from live analysis (queue full)")
+# Client audio queued for Deepgram (summed over connections) and frames given up
+AUDIO_BUFFERED_SECONDS = Gauge("equalizer_audio_buffered_seconds", "Client audio queued for STT")
+AUDIO_FRAMES_DROPPED = Counter("equalizer_audio_frames_dropped_total", "Audio frames dropped before STT", ("reason",))
+# Outcomes: success, failure (one attempt), gave_up; downtime is from drop to reconnected
+STT_RECONNECTS = Counter("equalizer_stt_reconnects_total", "Deepgram reconnection attempts", ("outcome",))
+STT_DOWNTIME_SECONDS = Histogram("equalizer_stt_downtime_seconds", "Time without a Deepgram connection before reconnecting")
+# Pre-opened Deepgram connections waiting for a session; acquisitions by result (hit, miss)
+STT_POOL_IDLE = Gauge("equalizer_stt_pool_idle", "Idle pre-opened Deepgram connections")
+STT_POOL_ACQUIRES = Counter("equalizer_stt_pool_acquires_total", "Deepgram connections handed to sessions", ("result",))
+# Offline engine (services/local_stt.py): submit-to-result time per utterance, and backlog drops
+LOCAL_STT_SECONDS = Histogram("equalizer_local_stt_seconds", "Local STT time per utterance, queueing included")
+LOCAL_STT_DROPPED = Counter("equalizer_local_stt_dropped_total", "Utterances dropped because local STT fell behind")
+# Audio the VAD kept from Deepgram (silence), summed over sessions
+VAD_SAVED_SECONDS = Counter("equalizer_vad_saved_seconds_total", "Seconds of client audio not streamed to STT")
+PROCESS_RSS_BYTES = Gauge("equalizer_process_rss_bytes", "Resident memory of the backend process")
+
+
+# --- Process / loop health ---
+
+LOOP_LAG_INTERVAL = float(os.getenv("LOOP_LAG_INTERVAL", "0.25"))
+_loop_monitor: Optional[asyncio.Task] = None
+
+
+async def _monitor_loop_lag(interval: float):
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG_SECONDS.observe(max(0.0, loop.time() - start - interval))
+
+
+def ensure_loop_monitor():
+    """Start the loop-lag sampler on the running loop (idempotent)."""
+    global _loop_monitor
+    if _loop_monitor is None or _loop_monitor.done():
+        _loop_monitor = asyncio.get_running_loop().create_task(_monitor_loop_lag(LOOP_LAG_INTERVAL))
+
+
+def current_rss_bytes() -> int:
+    """Resident set size from /proc (Linux); falls back to peak RSS from getrusage."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
@@ -0,0 +1,93 @@
+"""
+Per-utterance trace ids and timing spans for the live pipeline.
+
+AudioProcessor assigns a trace id to each utterance; it travels with the transcript
+(recorder entry, TranscriptSegment, advice payload). Spans are written as JSON lines to
+TRACE_LOG_PATH when set, one object per span:
+
+    {"trace_id": "...", "span": "llm.detect", "start": 1760000000.123, "duration_ms": 812.4, ...attrs}
+
+With TRACE_LOG_PATH unset, spans are not recorded at all.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+def new_trace_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+class JsonlSpanExporter:
+    """Appends spans to a JSON-lines file (opened lazily, line-buffered)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+        self._lock = threading.Lock()
+
+    def export(self, record: dict):
+        line = json.dumps(record, default=str)
+        with self._lock:
+            try:
+                if self._file is None:
+                    self._file = open(self.path, "a", buffering=1)
+                self._file.write(line + "\n")
+            except Exception as e:
+                logger.warning(f"Trace export failed: {e}")
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+_exporter: Optional[JsonlSpanExporter] = JsonlSpanExporter(os.environ["TRACE_LOG_PATH"]) if os.getenv("TRACE_LOG_PATH") else None
+
+
+def set_exporter(exporter: Optional[JsonlSpanExporter]):
+    """Replace the span exporter (None disables tracing)."""
+    global _exporter
+    if _exporter is not None and _exporter is not exporter:
+        _exporter.close()
+    _exporter = exporter
+
+
+def enabled() -> bool:
+    return _exporter is not None
+
+
+def record_span(name: str, trace_id: Optional[str], start: float, end: Optional[float] = None, **attrs):
+    """Export a span measured elsewhere. start/end are time.time() values."""
+    if _exporter is None:
+        return
+    end = time.time() if end is None else end
+    _exporter.export({
+        "trace_id": trace_id,
+        "span": name,
+        "start": round(start, 6),
+        "duration_ms": round((end - start) * 1000, 3),
+        **attrs,
+    })
+
+
+@contextmanager
+def span(name: str, trace_id: Optional[str], **attrs):
+    """Time a block as a span. Extra attributes can be added to the yielded dict."""
+    if _exporter is None:
+        yield attrs
+        return
+    start = time.time()
+    try:
+        yield attrs
+    finally:
+        record_span(name, trace_id, start, **attrs)
@@ -0,0 +1 @@
+"""Local stand-ins for external services (Deepgram, OpenAI) used by load tests."""
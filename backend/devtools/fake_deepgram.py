@@ -0,0 +1,341 @@
+"""
+Fake Deepgram live-transcription WebSocket server.
+
+Speaks the subset of the /v1/listen protocol AudioProcessor uses, so the audio path can be
+benchmarked and regression-tested without keys or network:
+
+- Query params: encoding/sample_rate/channels set the audio clock (containerized streams
+  are timed at 32 kB/s); an unknown encoding, or an encoding without sample_rate, is
+  refused with HTTP 400 like the real service. diarize=true adds words[].speaker;
+  interim_results=true adds is_final=false partials every `interim_seconds` of audio
+  while a line is "spoken".
+- Script: each line is (speaker, text) or (speaker, text, seconds) and is finalized once
+  that much audio has arrived (default `utterance_seconds`, or words / `words_per_second`).
+  load_script() builds one from a recorded session JSON, keeping its pacing. Lines longer
+  than `final_seconds` arrive as several is_final results; only the last is speech_final.
+- Timing: every message is delayed by `latency_ms` plus up to `jitter_ms`, in order.
+- Faults: `error_rate` drops the connection (1011) at an utterance boundary,
+  `disconnect_after_seconds` drops a connection after that much audio (both stop after
+  `max_disconnects` drops in total, if set), and `diarization_error_rate` gives each word
+  the wrong speaker with that probability.
+- Protocol: KeepAlive and CloseStream are honored (CloseStream gets a Metadata message,
+  then a normal close), and a connection with no audio or KeepAlive for
+  `idle_timeout_seconds` is closed with 1011 (Deepgram's NET-0001).
+
+Usage:
+    python -m devtools.fake_deepgram --port 8765 [--latency-ms 150] [--jitter-ms 100] [--error-rate 0.01]
+                                     [--script ../sessions/<id>.json] [--diarization-error-rate 0.05]
+
+Point the backend at it with DEEPGRAM_URL=ws://127.0.0.1:8765/v1/listen.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import random
+import time
+import uuid
+from http import HTTPStatus
+from typing import List, Optional, Sequence, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from websockets.asyncio.server import serve
+from websockets.exceptions import ConnectionClosed
+
+logger = logging.getLogger(__name__)
+
+# (speaker, text); speaker 0 is the user by default
+DEFAULT_SCRIPT: List[Tuple[int, str]] = [
+    (0, "Thanks for taking the time to walk me through this."),
+    (1, "Of course. Our standard package includes installation and support."),
+    (0, "What would the total come to for our team?"),
+    (1, "The price is $48,000 for the year, and that's already discounted."),
+    (1, "This offer is only valid until Friday."),
+    (0, "I need to compare that with the other quotes."),
+    (1, "Most of our customers sign up on the first call."),
+    (1, "I'd have to check with my manager before going any lower."),
+]
+
+_BYTES_PER_SAMPLE = {"linear16": 2, "linear32": 4, "mulaw": 1, "alaw": 1}
+# Timing for containerized audio (WebM/Ogg Opus), whose rate is not in the URL
+_CONTAINER_BYTES_PER_SECOND = 32000.0
+# Bounds on line durations taken from a recorded session's pacing
+_MIN_LINE_SECONDS = 0.5
+_MAX_LINE_SECONDS = 15.0
+
+
+def audio_bytes_per_second(query: dict) -> Optional[float]:
+    """Bytes of audio per second for raw encodings, None for containerized ones."""
+    encoding = query.get("encoding", ["linear16"])[0]
+    width = _BYTES_PER_SAMPLE.get(encoding)
+    if width is None:
+        return None
+    sample_rate = int(query.get("sample_rate", ["16000"])[0])
+    channels = int(query.get("channels", ["1"])[0])
+    return float(sample_rate * channels * width)
+
+
+def validate_query(query: dict) -> Optional[str]:
+    """Reason the real service would refuse these params, or None."""
+    if "encoding" in query:
+        if query["encoding"][0] not in _BYTES_PER_SAMPLE:
+            return f"unsupported encoding {query['encoding'][0]!r}"
+        if "sample_rate" not in query:
+            return "sample_rate is required with encoding"
+    for name in ("sample_rate", "channels", "endpointing"):
+        value = query.get(name, ["1"])[0]
+        if not value.isdigit() and value != "false":
+            return f"invalid {name} {value!r}"
+    return None
+
+
+def results_message(text: str, speaker: int, start: float, duration: float, is_final: bool = True, speech_final: bool = True,
+                    speakers: Optional[Sequence[int]] = None, diarize: bool = True) -> str:
+    """A Results message; `speakers` labels each word (default: all `speaker`)."""
+    words = text.split()
+    step = duration / max(1, len(words))
+    word_entries = []
+    for i, w in enumerate(words):
+        entry = {"word": w, "start": round(start + i * step, 3), "end": round(start + (i + 1) * step, 3), "confidence": 0.98}
+        if diarize:
+            entry["speaker"] = speakers[i] if speakers is not None else speaker
+        word_entries.append(entry)
+    return json.dumps({
+        "type": "Results",
+        "channel_index": [0, 1],
+        "duration": round(duration, 3),
+        "start": round(start, 3),
+        "is_final": is_final,
+        "speech_final": speech_final,
+        "channel": {"alternatives": [{
+            "transcript": text,
+            "confidence": 0.98,
+            "words": word_entries,
+        }]},
+    })
+
+
+def load_script(path: str, words_per_second: float = 2.5) -> List[Tuple[int, str, float]]:
+    """
+    Script from a JSON file: a recorded session (its transcripts, paced by the gaps between
+    them) or a list of [speaker, text] / [speaker, text, seconds].
+    """
+    with open(path) as f:
+        data = json.load(f)
+    if isinstance(data, list):
+        return [(int(item[0]), str(item[1]), *([float(item[2])] if len(item) > 2 else [])) for item in data]
+    from services.replay import load_session_events
+    script = []
+    prev = None
+    for event in load_session_events(data):
+        speaker = event["speaker"] if isinstance(event["speaker"], int) else 0
+        # A line was received about one line-duration after the previous one
+        if prev is None:
+            seconds = len(event["text"].split()) / words_per_second
+        else:
+            seconds = event["offset"] - prev
+        script.append((speaker, event["text"], min(_MAX_LINE_SECONDS, max(_MIN_LINE_SECONDS, seconds))))
+        prev = event["offset"]
+    return script
+
+
+class FakeDeepgram:
+    def __init__(self, script: Sequence[tuple] = DEFAULT_SCRIPT, utterance_seconds: float = 3.0, latency_ms: float = 100.0, error_rate: float = 0.0,
+                 seed: Optional[int] = None, jitter_ms: float = 0.0, words_per_second: Optional[float] = None, final_seconds: Optional[float] = None,
+                 disconnect_after_seconds: Optional[float] = None, max_disconnects: Optional[int] = None, diarization_error_rate: float = 0.0,
+                 idle_timeout_seconds: float = 10.0, interim_seconds: float = 1.0):
+        self.utterance_seconds = utterance_seconds
+        self.words_per_second = words_per_second
+        self.script = [self._line(item) for item in script]
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.final_seconds = final_seconds
+        self.error_rate = error_rate
+        self.disconnect_after_seconds = disconnect_after_seconds
+        self.max_disconnects = max_disconnects
+        self.diarization_error_rate = diarization_error_rate
+        self.idle_timeout_seconds = idle_timeout_seconds
+        self.interim_seconds = interim_seconds
+        self.rng = random.Random(seed)
+        self.connections = 0
+        self.active = 0
+        self.errors_injected = 0
+        self.disconnects = 0
+        self.idle_timeouts = 0
+        self.diarization_errors = 0
+        self.keepalives = 0
+        self.results_sent = 0
+        # Query params of every accepted connection, e.g. {"encoding": "linear16", ...}
+        self.requests: List[dict] = []
+
+    def _line(self, item: tuple) -> Tuple[int, str, float]:
+        speaker, text = item[0], item[1]
+        if len(item) > 2:
+            seconds = float(item[2])
+        elif self.words_per_second:
+            seconds = max(_MIN_LINE_SECONDS, len(text.split()) / self.words_per_second)
+        else:
+            seconds = self.utterance_seconds
+        return speaker, text, seconds
+
+    def _may_disconnect(self) -> bool:
+        return self.max_disconnects is None or self.errors_injected + self.disconnects < self.max_disconnects
+
+    def process_request(self, connection, request):
+        reason = validate_query(parse_qs(urlparse(request.path).query))
+        if reason:
+            logger.info(f"Refusing connection: {reason}")
+            return connection.respond(HTTPStatus.BAD_REQUEST, reason + "\n")
+        return None
+
+    def _speakers(self, speaker: int, count: int) -> List[int]:
+        labels = []
+        for _ in range(count):
+            if self.diarization_error_rate and self.rng.random() < self.diarization_error_rate:
+                self.diarization_errors += 1
+                labels.append(1 - speaker if speaker in (0, 1) else 0)
+            else:
+                labels.append(speaker)
+        return labels
+
+    async def handler(self, connection):
+        query = parse_qs(urlparse(connection.request.path).query)
+        self.requests.append({k: v[0] for k, v in query.items()})
+        bytes_per_second = audio_bytes_per_second(query) or _CONTAINER_BYTES_PER_SECOND
+        diarize = query.get("diarize", ["false"])[0] == "true"
+        interim = query.get("interim_results", ["false"])[0] == "true"
+        outbox: asyncio.Queue = asyncio.Queue()
+        sender = asyncio.create_task(self._sender(connection, outbox))
+        line_index = 0
+        line_start = 0.0  # audio time the current line started
+        finalized = 0  # words of the current line already sent as is_final
+        partial_at = 0.0  # audio time of the last interim partial
+        received = 0
+        self.connections += 1
+        self.active += 1
+        try:
+            while True:
+                try:
+                    message = await asyncio.wait_for(connection.recv(), self.idle_timeout_seconds)
+                except asyncio.TimeoutError:
+                    self.idle_timeouts += 1
+                    await connection.close(code=1011, reason="NET-0001: no audio received within the timeout")
+                    return
+                if isinstance(message, str):
+                    kind = json.loads(message).get("type")
+                    if kind == "KeepAlive":
+                        self.keepalives += 1
+                    elif kind == "CloseStream":
+                        await self._enqueue(outbox, json.dumps({
+                            "type": "Metadata",
+                            "request_id": str(uuid.uuid4()),
+                            "duration": round(received / bytes_per_second, 3),
+                            "channels": int(query.get("channels", ["1"])[0]),
+                        }))
+                        await outbox.put(None)
+                        await sender
+                        await connection.close()
+                        return
+                    continue
+                received += len(message)
+                audio_seconds = received / bytes_per_second
+                if self.disconnect_after_seconds is not None and audio_seconds >= self.disconnect_after_seconds and self._may_disconnect():
+                    self.disconnects += 1
+                    await connection.close(code=1011, reason="injected disconnect")
+                    return
+                while True:
+                    speaker, text, seconds = self.script[line_index % len(self.script)]
+                    words = text.split()
+                    # Words "spoken" so far, and where the next is_final chunk would end
+                    spoken = min(len(words), int(len(words) * (audio_seconds - line_start) / seconds))
+                    if audio_seconds - line_start >= seconds:
+                        if self.error_rate and self._may_disconnect() and self.rng.random() < self.error_rate:
+                            self.errors_injected += 1
+                            await connection.close(code=1011, reason="injected error")
+                            return
+                        await self._final(outbox, words[finalized:], speaker, line_start, seconds, len(words), finalized, True, diarize)
+                        line_index += 1
+                        line_start += seconds
+                        finalized = 0
+                        partial_at = line_start
+                        continue
+                    step = seconds / max(1, len(words))
+                    if self.final_seconds and (spoken - finalized) * step >= self.final_seconds:
+                        await self._final(outbox, words[finalized:spoken], speaker, line_start, seconds, len(words), finalized, False, diarize)
+                        finalized = spoken
+                    elif interim and spoken > finalized and audio_seconds - partial_at >= self.interim_seconds:
+                        partial_at = audio_seconds
+                        chunk = words[finalized:spoken]
+                        await self._enqueue(outbox, results_message(
+                            " ".join(chunk), speaker, line_start + finalized * step, len(chunk) * step,
+                            is_final=False, speech_final=False, speakers=self._speakers(speaker, len(chunk)), diarize=diarize,
+                        ))
+                    break
+        except ConnectionClosed:
+            pass
+        finally:
+            self.active -= 1
+            sender.cancel()
+
+    async def _final(self, outbox, chunk, speaker, line_start, seconds, total_words, offset_words, speech_final, diarize):
+        step = seconds / max(1, total_words)
+        await self._enqueue(outbox, results_message(
+            " ".join(chunk), speaker, line_start + offset_words * step, len(chunk) * step,
+            is_final=True, speech_final=speech_final, speakers=self._speakers(speaker, len(chunk)), diarize=diarize,
+        ))
+
+    async def _enqueue(self, outbox: asyncio.Queue, msg: str):
+        delay = self.latency_ms + (self.rng.uniform(0, self.jitter_ms) if self.jitter_ms else 0.0)
+        await outbox.put((time.monotonic() + delay / 1000.0, msg))
+
+    async def _sender(self, connection, outbox: asyncio.Queue):
+        # One sender per connection keeps messages in order however the delays fall
+        while True:
+            item = await outbox.get()
+            if item is None:
+                return
+            due, msg = item
+            await asyncio.sleep(max(0.0, due - time.monotonic()))
+            try:
+                await connection.send(msg)
+                self.results_sent += 1
+            except Exception:
+                return
+
+    def serve(self, host: str = "127.0.0.1", port: int = 8765):
+        """Async context manager running the server (port 0 picks a free port)."""
+        return serve(self.handler, host, port, max_size=None, process_request=self.process_request)
+
+
+async def _main(args):
+    script = load_script(args.script) if args.script else DEFAULT_SCRIPT
+    fake = FakeDeepgram(
+        script=script, utterance_seconds=args.utterance_seconds, latency_ms=args.latency_ms, error_rate=args.error_rate, seed=args.seed,
+        jitter_ms=args.jitter_ms, words_per_second=args.words_per_second, final_seconds=args.final_seconds,
+        disconnect_after_seconds=args.disconnect_after_seconds, max_disconnects=args.max_disconnects, diarization_error_rate=args.diarization_error_rate,
+        idle_timeout_seconds=args.idle_timeout_seconds,
+    )
+    async with fake.serve(args.host, args.port):
+        logger.info(f"Fake Deepgram listening on ws://{args.host}:{args.port}/v1/listen")
+        await asyncio.Future()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake Deepgram live WebSocket server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--script", help="Session JSON or [[speaker, text, seconds?], ...] to replay (default: built-in lines)")
+    parser.add_argument("--utterance-seconds", type=float, default=3.0)
+    parser.add_argument("--words-per-second", type=float, help="Time lines by word count instead of --utterance-seconds")
+    parser.add_argument("--final-seconds", type=float, help="Split longer lines into several is_final results")
+    parser.add_argument("--latency-ms", type=float, default=100.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Extra random delay per message (order is kept)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Probability per utterance of dropping the connection")
+    parser.add_argument("--disconnect-after-seconds", type=float, help="Drop every connection after this much audio")
+    parser.add_argument("--max-disconnects", type=int, help="Stop injecting drops after this many")
+    parser.add_argument("--diarization-error-rate", type=float, default=0.0, help="Probability per word of a wrong speaker label")
+    parser.add_argument("--idle-timeout-seconds", type=float, default=10.0)
+    parser.add_argument("--seed", type=int)
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_main(parser.parse_args()))
@@ -0,0 +1,114 @@
+"""
+Fake OpenAI chat-completions server.
+
+Answers POST /v1/chat/completions in the shape the openai client expects. Tactic
+detection prompts get a JSON signal built from the local classifier, so advice looks
+realistic without a network call. Latency (mean + jitter) and error injection
+(HTTP 500 or 429 with retry-after) are configurable.
+
+Usage:
+    python -m devtools.fake_openai --port 8766 [--latency-ms 400] [--jitter-ms 150] [--error-rate 0.02]
+
+Point the backend at it with OPENAI_BASE_URL=http://127.0.0.1:8766/v1 OPENAI_API_KEY=fake.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import random
+import re
+import time
+import uuid
+from typing import Optional
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from core.analysis_engine.local_classifier import get_default_classifier
+from core.analysis_engine.tactic_detection_v2 import _LOCAL_SIGNAL_TEMPLATES
+
+logger = logging.getLogger(__name__)
+
+_NEW_SECTION_RE = re.compile(r"NEW SECTIONS \(Classify this\):\n(.*)", re.S)
+_NEW_LINES_RE = re.compile(r"\[LINE (\d+)\] \[(\w+)\]: (.*)")
+_SPEAKER_LINE_RE = re.compile(r"\[(\w+)\]: (.*)")
+
+
+def _signal_for(text: str, speaker: str) -> dict:
+    if speaker == "USER":
+        return {"category": "NONE", "subtype": "none", "confidence": 0.9, "evidence": text}
+    prediction = get_default_classifier().predict(text)
+    return {
+        "category": prediction.category,
+        "subtype": prediction.subtype,
+        "confidence": max(prediction.confidence, 0.75) if prediction.category != "NONE" else prediction.confidence,
+        "evidence": text,
+        **_LOCAL_SIGNAL_TEMPLATES.get(prediction.category, {}),
+    }
+
+
+def completion_content(messages: list) -> str:
+    """JSON content for a request, based on the last user message."""
+    user = next((m.get("content", "") for m in reversed(messages) if m.get("role") == "user"), "")
+    batch = _NEW_LINES_RE.findall(user)
+    if batch:
+        return json.dumps({"results": [
+            {"line": int(n), "signals": [_signal_for(text.strip(), speaker)]} for n, speaker, text in batch
+        ]})
+    match = _NEW_SECTION_RE.search(user)
+    if match:
+        lines = _SPEAKER_LINE_RE.findall(match.group(1))
+        if lines:
+            speaker, text = lines[-1]
+            return json.dumps({"signals": [_signal_for(text.strip(), speaker)]})
+    # Summaries and anything else: minimal valid JSON
+    return json.dumps({"signals": [], "summary": "Fake summary.", "tactics": [], "key_moments": []})
+
+
+def create_app(latency_ms: float = 300.0, jitter_ms: float = 100.0, error_rate: float = 0.0, rate_limit_rate: float = 0.0, seed: Optional[int] = None) -> FastAPI:
+    app = FastAPI()
+    rng = random.Random(seed)
+    app.state.requests = 0
+    app.state.errors = 0
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        app.state.requests += 1
+        delay = max(0.0, rng.gauss(latency_ms, jitter_ms)) / 1000.0 if jitter_ms else latency_ms / 1000.0
+        await asyncio.sleep(delay)
+        roll = rng.random()
+        if roll < rate_limit_rate:
+            app.state.errors += 1
+            return JSONResponse(status_code=429, headers={"retry-after": "0.5"},
+                                content={"error": {"message": "Rate limit (injected)", "type": "rate_limit_error"}})
+        if roll < rate_limit_rate + error_rate:
+            app.state.errors += 1
+            return JSONResponse(status_code=500, content={"error": {"message": "Server error (injected)", "type": "server_error"}})
+        content = completion_content(body.get("messages", []))
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "gpt-4o-mini"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        }
+
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake OpenAI chat-completions server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--latency-ms", type=float, default=300.0)
+    parser.add_argument("--jitter-ms", type=float, default=100.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Probability of an HTTP 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Probability of an HTTP 429")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+    app = create_app(args.latency_ms, args.jitter_ms, args.error_rate, args.rate_limit_rate, args.seed)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
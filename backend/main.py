@@ -4,14 +4,26 @@ import logging
 import json
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 import uvicorn
 from dotenv import load_dotenv
 
-from services.audio_processor import AudioProcessor
+from contextlib import asynccontextmanager
+from services.audio_processor import AudioProcessor, listen_url
+from services.local_stt import STT_ENGINE, STT_ENGINES, LocalAudioProcessor, shutdown_pool
+from services.audio_ingest import AudioIngestBuffer
+from services.audio_format import AudioNormalizer, is_compressed, stream_bytes_per_second
+from services.vad import VAD_ENABLED, VoiceActivityDetector
 from services.coach import Coach
 from services.personalities import list_personalities, DEFAULT_PERSONALITY, list_negotiation_types, DEFAULT_NEGOTIATION_TYPE
-from services.session_recorder import SessionRecorder
+from services.session_recorder import SessionRecorder, session_path
+from services.summary_cache import summary_cache_key, get_cached_summary
+from services.summary_jobs import SummaryJobQueue
+from services.running_debrief import RunningDebrief, usable_running_debrief
+from services.transcript_pipeline import TranscriptPipeline
+from services.stt_pool import DeepgramConnectionPool
+from core import metrics
+from core.tracing import span
 
 # Load env variables
 load_dotenv()
@@ -20,7 +32,34 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI()
+def create_stt_pool(engine: str = STT_ENGINE):
+    """
+    Pre-opened Deepgram connections for the default session parameters (STT_POOL_SIZE=0
+    disables). None unless Deepgram is the default engine and a key is set, so offline and
+    keyless setups never dial out.
+    """
+    api_key = os.getenv("DEEPGRAM_API_KEY")
+    if engine != "deepgram" or not api_key:
+        logger.info("STT connection pool disabled (no DEEPGRAM_API_KEY or non-deepgram STT_ENGINE)")
+        return None
+    return DeepgramConnectionPool(listen_url(), {"Authorization": f"Token {api_key}"})
+
+
+stt_pool = create_stt_pool()
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # Warm the pool before the first session arrives
+    if stt_pool is not None:
+        stt_pool.start()
+    yield
+    if stt_pool is not None:
+        await stt_pool.close()
+    shutdown_pool()
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -31,6 +70,12 @@ app.add_middleware(
 )
 
 
+@app.get("/metrics")
+async def get_metrics():
+    """Pipeline latency histograms and gating/retry counters (Prometheus text format)."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
 @app.get("/personalities")
 async def get_personalities():
     """List available coach personalities."""
@@ -94,20 +139,20 @@ async def save_session_outcome(session_id: str, outcome: OutcomeRequest):
     return JSONResponse(status_code=404, content={"message": "Session not found"})
 
 
-@app.post("/sessions/{session_id}/summary")
-async def generate_session_summary(session_id: str, expanded: bool = False):
-    """Generate a post-session reflection summary."""
-    from pathlib import Path
+async def run_session_summary(session_id: str, expanded: bool = False, on_progress=None) -> dict:
+    """
+    Generate (or reuse) the reflection for a session and persist it.
+    Raises FileNotFoundError if the session does not exist.
+    """
     import json as json_module
     
-    project_root = Path(__file__).resolve().parent.parent
-    session_path = project_root / "sessions" / f"{session_id}.json"
-    
-    if not session_path.exists():
-        return JSONResponse(status_code=404, content={"message": "Session not found"})
+    path = session_path(session_id)
+    if not path.exists():
+        raise FileNotFoundError(f"Session not found: {session_id}")
     
+    session_data = {}
     try:
-        with open(session_path, 'r') as f:
+        with open(path, 'r') as f:
             session_data = json_module.load(f)
         
         # Build transcript text
@@ -120,10 +165,21 @@ async def generate_session_summary(session_id: str, expanded: bool = False):
         outcome = session_data.get("outcome") or {}
         negotiation_type = session_data.get("negotiation_type", "General")
         
+        # Reuse the stored reflection if none of its inputs changed
+        cache_key = summary_cache_key(transcripts, outcome, negotiation_type, expanded)
+        cached = get_cached_summary(session_data, cache_key)
+        if cached is not None:
+            logger.info(f"Summary cache hit for session {session_id}")
+            return cached
+        
         # Create a Coach instance for summary generation
         # Mode doesn't strictly matter here as we call generate_summary directly
         coach = Coach(negotiation_type=negotiation_type, mode="debrief")
-        summary = await coach.generate_summary(transcript_text, outcome, expanded=expanded)
+        # Incremental state built during the live session (if enabled and still valid)
+        prior_state = usable_running_debrief(session_data)
+        if prior_state:
+            logger.info(f"Finalizing running debrief for session {session_id} ({prior_state['covered_lines']}/{len(transcripts)} lines covered)")
+        summary = await coach.generate_summary(transcript_text, outcome, expanded=expanded, on_progress=on_progress, prior_state=prior_state)
         
         # Save summary to session file
         session_data["reflection"] = summary
@@ -133,7 +189,10 @@ async def generate_session_summary(session_id: str, expanded: bool = False):
             "expanded": bool(expanded),
             "generated_at": __import__("datetime").datetime.now().isoformat()
         }
-        with open(session_path, 'w') as f:
+        # Failed analyses are stored for review but never served from cache
+        if summary.get("strong_move") != "Analysis failed":
+            session_data["summary_details"]["cache_key"] = cache_key
+        with open(path, 'w') as f:
             json_module.dump(session_data, f, indent=2)
         
         return summary
@@ -143,21 +202,69 @@ async def generate_session_summary(session_id: str, expanded: bool = False):
         # Persist failure for debugging
         try:
             session_data["reflection_error"] = str(e)
-            with open(session_path, 'w') as f:
+            with open(path, 'w') as f:
                 json_module.dump(session_data, f, indent=2)
         except Exception:
             pass
-        return JSONResponse(status_code=500, content={"message": str(e)})
+        raise
+
+
+summary_jobs = SummaryJobQueue(run_session_summary)
+
+
+@app.post("/sessions/{session_id}/summary")
+async def generate_session_summary(session_id: str, expanded: bool = False):
+    """
+    Generate a post-session reflection summary and wait for it. Runs as a summary job,
+    so a retry (or a job already submitted for the session) joins the running work.
+    """
+    if not session_path(session_id).exists():
+        return JSONResponse(status_code=404, content={"message": "Session not found"})
+    job = await summary_jobs.wait(summary_jobs.submit(session_id, expanded=expanded))
+    if job["status"] == "failed":
+        return JSONResponse(status_code=500, content={"message": job["error"]})
+    return job["result"]
+
+
+@app.post("/sessions/{session_id}/summary/jobs")
+async def submit_summary_job(session_id: str, expanded: bool = False):
+    """Queue summary generation in the background. Returns a job id to poll."""
+    if not session_path(session_id).exists():
+        return JSONResponse(status_code=404, content={"message": "Session not found"})
+    job = summary_jobs.submit(session_id, expanded=expanded)
+    return JSONResponse(status_code=202, content=summary_jobs.describe(job))
+
+
+@app.get("/summary/jobs/{job_id}")
+async def get_summary_job(job_id: str):
+    """Status, progress and (when done) result of a summary job."""
+    job = summary_jobs.get(job_id)
+    if not job:
+        return JSONResponse(status_code=404, content={"message": "Job not found"})
+    return JSONResponse(content=summary_jobs.describe(job, include_result=True))
 
 
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     await websocket.accept()
     logger.info("Client connected")
+    metrics.ACTIVE_SESSIONS.inc()
+    metrics.ensure_loop_monitor()
     
     # Defaults
     coach = Coach(mode="debrief", negotiation_type=DEFAULT_NEGOTIATION_TYPE)
     recorder = SessionRecorder(personality="tactical", negotiation_type=DEFAULT_NEGOTIATION_TYPE)
+    # Optional background debrief (config flag "running_debrief" or RUNNING_DEBRIEF=1)
+    running_debrief = None
+    
+    # Advice from the coach's trailing-edge analysis arrives outside process_transcript
+    async def send_advice(advice):
+        await deliver_advice(advice, websocket, recorder)
+    coach.advice_callback = send_advice
+    
+    # Transcripts are analyzed in order by one consumer; persistence is batched separately
+    pipeline = TranscriptPipeline(coach, recorder, send_advice)
+    pipeline.start()
     
     # Send session ID to frontend immediately
     await websocket.send_text(json.dumps({
@@ -165,27 +272,31 @@ async def websocket_endpoint(websocket: WebSocket):
         "session_id": recorder.session_id
     }))
     
-    # Callback to run when Deepgram detects a sentence/pause
-    def on_transcript(transcript: str, speaker: int = 0):
-        # Pass raw speaker ID to recorder and coach
-        # They will handle mapping based on configuration
-        
-        # Record the transcript with speaker
-        recorder.add_transcript(transcript, speaker=speaker)
-        
-        # Schedule async coach processing
-        # We process every transcript; the coach internally handles buffering and debrief logic.
-        asyncio.run_coroutine_threadsafe(
-            process_transcript_and_advise(transcript, speaker, websocket, coach, recorder), 
-            loop
-        )
-
-    # Initialize AudioProcessor with the callback
-    processor = AudioProcessor(transcript_callback=on_transcript)
+    # Callback to run when Deepgram detects a sentence/pause (runs on the event loop)
+    def on_transcript(transcript: str, speaker: int = 0, trace_id: str = None):
+        # Raw speaker ID goes to recorder and coach; they map it based on configuration.
+        # Enqueue only: the pipeline records every line and feeds the coach in order.
+        pipeline.submit(transcript, speaker, trace_id)
+
+    # Tell the UI when transcription drops and comes back
+    async def send_stt_status(event: dict):
+        await websocket.send_text(json.dumps({"type": "stt_status", **event}))
+
+    # Initialize the STT engine with the callback (STT_ENGINE, or "stt_engine" in the config frame)
+    def make_processor(engine: str):
+        if engine == "local":
+            return LocalAudioProcessor(transcript_callback=on_transcript, status_callback=send_stt_status)
+        return AudioProcessor(transcript_callback=on_transcript, status_callback=send_stt_status, pool=stt_pool)
+
+    stt_engine = STT_ENGINE
+    processor = make_processor(stt_engine)
     await processor.start()
-    
-    # Capture the main event loop
-    loop = asyncio.get_running_loop()
+    # Client chunks are coalesced into frames and sent by a separate task
+    # Silence is withheld from Deepgram (VAD_ENABLED, or "vad" in the config frame)
+    audio_ingest = AudioIngestBuffer(processor, vad=VoiceActivityDetector() if VAD_ENABLED else None)
+    audio_ingest.start()
+    # Client audio is 16 kHz mono linear16 unless the config frame declares otherwise
+    audio_format = AudioNormalizer()
 
     try:
         while True:
@@ -198,8 +309,8 @@ async def websocket_endpoint(websocket: WebSocket):
                 break
             
             if "bytes" in message:
-                # Binary audio chunk from microphone (or mixed audio)
-                await processor.send_audio(message["bytes"])
+                # Binary audio chunk from microphone (or mixed audio); never waits on Deepgram
+                audio_ingest.push(audio_format.process(message["bytes"]))
             elif "text" in message:
                 # Text message - personality change or other commands
                 try:
@@ -218,12 +329,30 @@ async def websocket_endpoint(websocket: WebSocket):
                         coach.set_negotiation_type(new_type)
                         coach.set_mode(mode)
                         coach.set_user_speaker_id(user_id)
+                        # Engine first: the settings below apply to whichever one is running
+                        if data.get("stt_engine") is not None and data["stt_engine"] != stt_engine:
+                            processor, ack = await switch_stt_engine(data["stt_engine"], processor, audio_ingest, make_processor)
+                            if ack["status"] == "accepted":
+                                stt_engine = ack["engine"]
+                            await websocket.send_text(json.dumps(ack))
                         processor.set_emit_interim(emit_interim)
                         if endpointing_ms is not None:
                             processor.set_endpointing(endpointing_ms)
                         if window_override is not None:
                             coach.window_size_seconds = float(window_override)
+                        if data.get("analysis_debounce_seconds") is not None:
+                            coach.scheduler.debounce_seconds = float(data["analysis_debounce_seconds"])
+                        if data.get("analysis_max_latency_seconds") is not None:
+                            coach.scheduler.max_latency_seconds = float(data["analysis_max_latency_seconds"])
                         coach.set_test_mode_counterparty(test_mode)
+                        if data.get("vad") is not None and bool(data["vad"]) != (audio_ingest.vad is not None):
+                            audio_ingest.vad = VoiceActivityDetector() if data["vad"] else None
+                        if data.get("audio_format") is not None:
+                            audio_format, ack = await negotiate_audio_format(data["audio_format"], audio_format, audio_ingest, processor)
+                            await websocket.send_text(json.dumps(ack))
+                        if data.get("running_debrief", os.getenv("RUNNING_DEBRIEF", "0") == "1") and running_debrief is None:
+                            running_debrief = RunningDebrief(coach, recorder)
+                            running_debrief.start()
                         
                         # Update recorder context
                         recorder.negotiation_type = new_type
@@ -256,30 +385,77 @@ async def websocket_endpoint(websocket: WebSocket):
     except Exception as e:
         logger.error(f"Connection error: {e}")
     finally:
+        metrics.ACTIVE_SESSIONS.dec()
+        await audio_ingest.close()
+        recorder.set_audio_stats(audio_ingest.stats())
+        logger.info(f"Session audio: {audio_ingest.stats()}")
         await processor.stop()
+        # Finish queued lines (bounded) so they reach the recorder before it closes
+        await pipeline.close()
+        coach.close()
+        if running_debrief is not None:
+            # Catch up on the last lines so the reflection only needs finalization
+            await running_debrief.stop()
         recorder.close()
 
 
-async def process_transcript_and_advise(
-    transcript: str,
-    speaker: int | str,
-    websocket: WebSocket, 
-    coach: Coach,
-    recorder: SessionRecorder
-):
+async def negotiate_audio_format(spec, current: AudioNormalizer, audio_ingest: AudioIngestBuffer, processor: AudioProcessor):
     """
-    Ingest transcript into Coach.
-    If advice is returned (Live Mode only), send to UI.
+    Apply a client's declared audio_format. PCM formats are normalized here; compressed
+    containers pass through, which re-dials Deepgram for the container. Returns the
+    normalizer to use and the ack for the client (the client starts a compressed stream
+    only after an accepted ack with transport "passthrough").
     """
-    logger.info(f"Processing [{speaker}]: {transcript}")
-    
-    # Coach handles buffering and mode logic internally.
-    # Returns advice string only if live mode triggers a signal.
-    advice = await coach.process_transcript(transcript, speaker)
-    
-    if advice:
-        logger.info(f"Sending Live Advice: {advice}")
-        recorder.add_advice(advice)
+    try:
+        normalizer = AudioNormalizer.from_config(spec)
+        if audio_ingest.compressed and normalizer.format != current.format:
+            raise ValueError("audio format cannot change once a compressed stream has started")
+        if is_compressed(normalizer.format) and not processor.supports_compressed:
+            raise ValueError("compressed audio needs the deepgram stt_engine")
+    except (TypeError, ValueError) as e:
+        logger.warning(f"Rejected audio_format {spec}: {e}")
+        return current, {"type": "audio_format", "status": "rejected", "reason": str(e)}
+    fmt = normalizer.format
+    stt_connected = True
+    if is_compressed(fmt) and not audio_ingest.compressed:
+        audio_ingest.set_compressed(fmt["encoding"], stream_bytes_per_second(fmt))
+        stt_connected = await processor.set_stream_format(fmt)
+    logger.info(f"Client audio format: {fmt}")
+    return normalizer, {
+        "type": "audio_format",
+        "status": "accepted",
+        "transport": "passthrough" if is_compressed(fmt) else "pcm",
+        "format": fmt,
+        "stt_connected": stt_connected,
+    }
+
+
+async def switch_stt_engine(engine, processor, audio_ingest: AudioIngestBuffer, make_processor):
+    """
+    Replace the session's STT engine ("deepgram" or "local"). The new one is started
+    before the old one stops, so a failed start (no faster-whisper, no API key) keeps the
+    current engine. Returns the processor to use and the ack for the client.
+    """
+    if engine not in STT_ENGINES:
+        return processor, {"type": "stt_engine", "status": "rejected", "reason": f"unknown stt_engine {engine!r}"}
+    if audio_ingest.compressed:
+        return processor, {"type": "stt_engine", "status": "rejected", "reason": "stt_engine cannot change once a compressed stream has started"}
+    new = make_processor(engine)
+    new.set_emit_interim(processor.emit_interim)
+    if not await new.start():
+        await new.stop()
+        return processor, {"type": "stt_engine", "status": "rejected", "reason": f"{engine} engine failed to start"}
+    audio_ingest.processor = new
+    await processor.stop()
+    logger.info(f"STT engine switched to {engine}")
+    return new, {"type": "stt_engine", "status": "accepted", "engine": engine}
+
+
+async def deliver_advice(advice: dict, websocket: WebSocket, recorder: SessionRecorder):
+    """Record advice and send it to the UI."""
+    logger.info(f"Sending Live Advice: {advice}")
+    recorder.add_advice(advice)
+    with metrics.STAGE_SECONDS.time(stage="ws_send"), span("ws_send", advice.get("trace_id")):
         await websocket.send_text(json.dumps({
             "type": "advice",
             "content": advice
@@ -0,0 +1,312 @@
+"""
+Multi-client load test for the /ws endpoint.
+
+Opens N concurrent sessions, sends a live-mode config frame and streams PCM
+(16 kHz mono linear16, looped) in real time. With --spawn it also starts the fake
+Deepgram and fake OpenAI servers (devtools/) and a backend pointed at them, so nothing
+leaves the machine.
+
+Usage:
+    python scripts/loadtest.py --spawn --sessions 10,25,50 --duration 60
+    python scripts/loadtest.py --url ws://127.0.0.1:8000/ws --sessions 20 [--pcm call.raw]
+
+Per level it reports advice latency percentiles (time from the audio chunk that
+completed an utterance to the advice frame), event-loop lag and RSS per session from the
+backend's /metrics, and, when the backend was spawned, its CPU use. A level is
+"sustained" when no session failed and the latency/lag SLOs held; sessions per core is
+the largest sustained level divided by the CPU the backend used at that level.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import re
+import struct
+import subprocess
+import sys
+import time
+import urllib.request
+from typing import Dict, List, Optional, Tuple
+
+import websockets
+
+# To fix imports path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+SAMPLE_RATE = 16000
+BYTES_PER_SECOND = SAMPLE_RATE * 2
+
+_SAMPLE_RE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(\{[^}]*\})?\s+(\S+)$')
+
+
+def synthetic_pcm(seconds: float = 2.0) -> bytes:
+    """A speech-level tone (so energy-based gating upstream still forwards it)."""
+    n = int(SAMPLE_RATE * seconds)
+    return b"".join(struct.pack("<h", int(6000 * math.sin(2 * math.pi * 220 * i / SAMPLE_RATE))) for i in range(n))
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * pct / 100
+    lo, hi = math.floor(k), math.ceil(k)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def parse_metrics(text: str) -> Dict[Tuple[str, str], float]:
+    samples = {}
+    for line in text.splitlines():
+        if not line or line.startswith("#"):
+            continue
+        m = _SAMPLE_RE.match(line)
+        if m:
+            samples[(m.group(1), m.group(2) or "")] = float(m.group(3))
+    return samples
+
+
+def histogram_delta(before: dict, after: dict, name: str) -> Tuple[List[Tuple[float, float]], float, float]:
+    """(cumulative bucket counts as (le, count), sum, count) between two scrapes, unlabelled histogram."""
+    buckets = []
+    for (metric, labels), value in after.items():
+        if metric == f"{name}_bucket":
+            le = re.search(r'le="([^"]+)"', labels).group(1)
+            bound = float("inf") if le == "+Inf" else float(le)
+            buckets.append((bound, value - before.get((metric, labels), 0.0)))
+    buckets.sort()
+    total = after.get((f"{name}_sum", ""), 0.0) - before.get((f"{name}_sum", ""), 0.0)
+    count = after.get((f"{name}_count", ""), 0.0) - before.get((f"{name}_count", ""), 0.0)
+    return buckets, total, count
+
+
+def histogram_quantile(buckets: List[Tuple[float, float]], q: float) -> Optional[float]:
+    """Upper bound of the bucket holding quantile q (Prometheus-style, no interpolation)."""
+    if not buckets or buckets[-1][1] <= 0:
+        return None
+    target = q * buckets[-1][1]
+    for bound, cumulative in buckets:
+        if cumulative >= target:
+            return bound
+    return buckets[-1][0]
+
+
+def scrape(metrics_url: str) -> dict:
+    with urllib.request.urlopen(metrics_url, timeout=5) as resp:
+        return parse_metrics(resp.read().decode())
+
+
+def process_cpu_seconds(pid: int) -> Optional[float]:
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+class ClientSession:
+    def __init__(self, url: str, pcm: bytes, duration: float, chunk_ms: int, utterance_seconds: float, config: dict):
+        self.url = url
+        self.pcm = pcm
+        self.duration = duration
+        self.chunk_bytes = int(BYTES_PER_SECOND * chunk_ms / 1000) & ~1
+        self.chunk_seconds = self.chunk_bytes / BYTES_PER_SECOND
+        self.utterance_seconds = utterance_seconds
+        self.config = config
+        self.boundaries: List[float] = []
+        self.advice_latencies: List[float] = []
+        self.advice_count = 0
+        self.error: Optional[str] = None
+
+    async def _receive(self, ws):
+        async for message in ws:
+            data = json.loads(message)
+            if data.get("type") == "advice":
+                now = time.perf_counter()
+                self.advice_count += 1
+                sent = [b for b in self.boundaries if b <= now]
+                if sent:
+                    self.advice_latencies.append(now - sent[-1])
+
+    async def run(self):
+        try:
+            async with websockets.connect(self.url, max_size=None) as ws:
+                json.loads(await ws.recv())  # session_init
+                await ws.send(json.dumps(self.config))
+                receiver = asyncio.create_task(self._receive(ws))
+                loop = asyncio.get_running_loop()
+                start = loop.time()
+                sent_bytes = 0
+                offset = 0
+                next_boundary = self.utterance_seconds
+                chunks = int(self.duration / self.chunk_seconds)
+                for i in range(chunks):
+                    chunk = self.pcm[offset:offset + self.chunk_bytes]
+                    if len(chunk) < self.chunk_bytes:
+                        offset = 0
+                        chunk = self.pcm[:self.chunk_bytes]
+                    offset += self.chunk_bytes
+                    await ws.send(chunk)
+                    sent_bytes += len(chunk)
+                    if sent_bytes / BYTES_PER_SECOND >= next_boundary:
+                        self.boundaries.append(time.perf_counter())
+                        next_boundary += self.utterance_seconds
+                    # Real-time pacing against the session start, so sends don't drift
+                    delay = start + (i + 1) * self.chunk_seconds - loop.time()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                # Grace period for trailing advice
+                await asyncio.sleep(2.0)
+                receiver.cancel()
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+
+
+async def run_level(args, n: int, pcm: bytes, metrics_url: str, backend_pid: Optional[int]) -> dict:
+    config = {"type": "config", "mode": "live", "negotiation_type": "General", "user_speaker_id": 0}
+    sessions = [ClientSession(args.url, pcm, args.duration, args.chunk_ms, args.utterance_seconds, config) for _ in range(n)]
+    before = scrape(metrics_url)
+    rss_base = before.get(("equalizer_process_rss_bytes", ""), 0.0)
+    cpu_start = process_cpu_seconds(backend_pid) if backend_pid else None
+    wall_start = time.perf_counter()
+
+    rss_peak = rss_base
+    tasks = []
+    for s in sessions:
+        tasks.append(asyncio.create_task(s.run()))
+        if args.ramp:
+            await asyncio.sleep(args.ramp / n)
+    while not all(t.done() for t in tasks):
+        await asyncio.sleep(1.0)
+        try:
+            rss_peak = max(rss_peak, (await asyncio.to_thread(scrape, metrics_url)).get(("equalizer_process_rss_bytes", ""), 0.0))
+        except Exception:
+            pass
+
+    wall = time.perf_counter() - wall_start
+    after = scrape(metrics_url)
+    cpu_end = process_cpu_seconds(backend_pid) if backend_pid else None
+    lag_buckets, lag_sum, lag_count = histogram_delta(before, after, "equalizer_event_loop_lag_seconds")
+    latencies = [x for s in sessions for x in s.advice_latencies]
+    errors = [s.error for s in sessions if s.error]
+
+    def ms(value):
+        return None if value is None else round(value * 1000, 1)
+
+    result = {
+        "sessions": n,
+        "failed_sessions": len(errors),
+        "errors": sorted(set(errors))[:5],
+        "advice": sum(s.advice_count for s in sessions),
+        "advice_latency_ms": {"p50": ms(percentile(latencies, 50)), "p95": ms(percentile(latencies, 95)), "p99": ms(percentile(latencies, 99))},
+        "loop_lag_ms": {"mean": ms(lag_sum / lag_count) if lag_count else None, "p99": ms(histogram_quantile(lag_buckets, 0.99))},
+        "rss_per_session_mb": round((rss_peak - rss_base) / n / 2**20, 2) if rss_base else None,
+        "backend_cpu_cores": round((cpu_end - cpu_start) / wall, 3) if cpu_start is not None and cpu_end is not None else None,
+    }
+    p95 = result["advice_latency_ms"]["p95"]
+    lag_p99 = result["loop_lag_ms"]["p99"]
+    result["sustained"] = (
+        not errors
+        and (p95 is None or p95 <= args.slo_advice_p95_ms)
+        and (lag_p99 is None or lag_p99 <= args.slo_loop_lag_p99_ms)
+    )
+    return result
+
+
+def _spawn(args) -> List[subprocess.Popen]:
+    env = dict(os.environ)
+    env.update({
+        "DEEPGRAM_URL": f"ws://127.0.0.1:{args.fake_deepgram_port}/v1/listen",
+        "DEEPGRAM_API_KEY": "fake",
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{args.fake_openai_port}/v1",
+        "OPENAI_API_KEY": "fake",
+    })
+    procs = [
+        subprocess.Popen([sys.executable, "-m", "devtools.fake_deepgram", "--port", str(args.fake_deepgram_port),
+                          "--utterance-seconds", str(args.utterance_seconds), "--latency-ms", str(args.stt_latency_ms),
+                          "--error-rate", str(args.stt_error_rate), "--jitter-ms", str(args.stt_jitter_ms),
+                          "--diarization-error-rate", str(args.stt_diarization_error_rate)], cwd=BACKEND_DIR, env=env),
+        subprocess.Popen([sys.executable, "-m", "devtools.fake_openai", "--port", str(args.fake_openai_port),
+                          "--latency-ms", str(args.llm_latency_ms), "--error-rate", str(args.llm_error_rate)], cwd=BACKEND_DIR, env=env),
+        subprocess.Popen([sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.backend_port), "--log-level", "warning"],
+                         cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL),
+    ]
+    return procs
+
+
+def _wait_for(url: str, timeout: float = 20.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(url, timeout=1).read()
+            return
+        except Exception:
+            time.sleep(0.2)
+    raise RuntimeError(f"Backend did not come up at {url}")
+
+
+async def main_async(args):
+    pcm = open(args.pcm, "rb").read() if args.pcm else synthetic_pcm()
+    metrics_url = re.sub(r"^ws", "http", args.url).rsplit("/ws", 1)[0] + "/metrics"
+    backend_pid = args.backend_pid
+
+    procs = []
+    if args.spawn:
+        procs = _spawn(args)
+        backend_pid = procs[-1].pid
+    try:
+        await asyncio.to_thread(_wait_for, metrics_url)
+        levels = []
+        for n in args.sessions:
+            result = await run_level(args, n, pcm, metrics_url, backend_pid)
+            print(json.dumps(result), flush=True)
+            levels.append(result)
+        sustained = [r for r in levels if r["sustained"]]
+        report = {"levels": levels, "max_sustained_sessions": max((r["sessions"] for r in sustained), default=0)}
+        best = max(sustained, key=lambda r: r["sessions"], default=None)
+        if best and best["backend_cpu_cores"]:
+            report["sessions_per_core"] = round(best["sessions"] / best["backend_cpu_cores"], 1)
+        print(json.dumps(report, indent=2))
+        if args.out:
+            with open(args.out, "w") as f:
+                json.dump(report, f, indent=2)
+    finally:
+        for p in procs:
+            p.terminate()
+        for p in procs:
+            p.wait(timeout=10)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the /ws endpoint with N concurrent sessions")
+    parser.add_argument("--url", default=None, help="Backend WebSocket URL (default ws://127.0.0.1:<backend-port>/ws)")
+    parser.add_argument("--sessions", default="10", help="Comma-separated concurrency levels, e.g. 10,25,50")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds of audio per session")
+    parser.add_argument("--ramp", type=float, default=2.0, help="Seconds over which sessions are opened")
+    parser.add_argument("--chunk-ms", type=int, default=100)
+    parser.add_argument("--pcm", help="Raw 16 kHz mono linear16 file to stream (looped)")
+    parser.add_argument("--utterance-seconds", type=float, default=3.0, help="Audio per fake utterance (must match the fake STT)")
+    parser.add_argument("--slo-advice-p95-ms", type=float, default=3000.0)
+    parser.add_argument("--slo-loop-lag-p99-ms", type=float, default=100.0)
+    parser.add_argument("--out", help="Write the report as JSON")
+    parser.add_argument("--spawn", action="store_true", help="Start fake Deepgram/OpenAI servers and a backend")
+    parser.add_argument("--backend-pid", type=int, help="PID of an externally started backend (for CPU accounting)")
+    parser.add_argument("--backend-port", type=int, default=8010)
+    parser.add_argument("--fake-deepgram-port", type=int, default=8765)
+    parser.add_argument("--fake-openai-port", type=int, default=8766)
+    parser.add_argument("--stt-latency-ms", type=float, default=100.0)
+    parser.add_argument("--stt-error-rate", type=float, default=0.0)
+    parser.add_argument("--stt-jitter-ms", type=float, default=0.0)
+    parser.add_argument("--stt-diarization-error-rate", type=float, default=0.0)
+    parser.add_argument("--llm-latency-ms", type=float, default=400.0)
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    args.sessions = [int(x) for x in str(args.sessions).split(",") if x.strip()]
+    args.url = args.url or f"ws://127.0.0.1:{args.backend_port}/ws"
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Replay a recorded session through the live Coach on a virtual clock.
+
+Usage:
+    python scripts/replay_session.py ../sessions/<id>.json [--speed 1|10|max] [--engine local|gated|llm] [--out replay.json]
+
+Prints the advice stream, gating decisions and per-line latency. With the (default)
+local engine the output is deterministic, so two runs can be diffed.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+
+# To fix imports path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.replay import replay_session
+
+
+def _parse_speed(value: str):
+    if value.lower() in ("max", "unbounded", "inf"):
+        return None
+    speed = float(value.lower().rstrip("x"))
+    if speed <= 0:
+        raise argparse.ArgumentTypeError("speed must be positive")
+    return speed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded session through Coach")
+    parser.add_argument("session", help="Session JSON file")
+    parser.add_argument("--speed", type=_parse_speed, default=None, help="1, 10 (x real time) or max (default)")
+    parser.add_argument("--engine", default="local", choices=("local", "gated", "llm"), help="Tactic engine")
+    parser.add_argument("--user-speaker-id", type=int, default=0)
+    parser.add_argument("--out", help="Write the full result as JSON")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    result = asyncio.run(replay_session(args.session, speed=args.speed, engine=args.engine, user_speaker_id=args.user_speaker_id))
+
+    print(f"Replayed {result['lines']} lines ({result['virtual_seconds']}s of session) in {result['wall_seconds']}s")
+    for item in result["advice"]:
+        print(f"  +{item['offset']:8.2f}s [{item['source']}] {item['category']}({item['subtype']}) {item.get('headline') or ''}")
+    print(f"Gating: {json.dumps(result['gate_counts'], sort_keys=True)}")
+    print(f"Latency: {json.dumps(result['latency'])}")
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"Wrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
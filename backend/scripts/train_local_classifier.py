@@ -0,0 +1,46 @@
+"""
+Train the local tactic classifier from the labeled fixtures plus exported session advice.
+
+Usage:
+    python scripts/train_local_classifier.py [--sessions ../sessions] [--out local_classifier.npz]
+
+Then point the backend at it with LOCAL_CLASSIFIER_PATH=<out> and TACTIC_ENGINE=local|gated.
+"""
+import argparse
+import os
+import sys
+import time
+
+# To fix imports path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.analysis_engine.local_classifier import LocalTacticClassifier, load_seed_examples, load_session_examples
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the local tactic classifier")
+    parser.add_argument("--sessions", default=os.path.join(os.path.dirname(__file__), "..", "..", "sessions"),
+                        help="Directory of recorded session JSON files")
+    parser.add_argument("--out", default="local_classifier.npz", help="Output model path (.npz)")
+    args = parser.parse_args()
+
+    examples = load_seed_examples()
+    print(f"Seed examples: {len(examples)}")
+    if os.path.isdir(args.sessions):
+        session_examples = load_session_examples(args.sessions)
+        print(f"Session advice examples: {len(session_examples)}")
+        examples += session_examples
+
+    start = time.perf_counter()
+    model = LocalTacticClassifier.train(examples)
+    print(f"Trained in {time.perf_counter() - start:.2f}s on {len(examples)} examples, {len(model.labels)} labels")
+
+    correct = sum(model.predict(text).category == category for text, category, _ in examples)
+    print(f"Training accuracy: {correct / len(examples):.1%}")
+
+    model.save(args.out)
+    print(f"Saved model to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
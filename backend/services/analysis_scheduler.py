@@ -0,0 +1,89 @@
+"""
+Trailing-edge scheduler for Coach live analysis.
+
+The leading edge (analyze as soon as a line arrives, at most once per window) lives in
+Coach.process_transcript. Lines that arrive inside the window are handed to this
+scheduler, which fires one analysis once the conversation settles:
+
+    fire_at = max(not_before, min(last_line + debounce, first_pending + max_latency))
+
+so a pending counterparty line is analyzed within a bounded delay even if nobody speaks
+again, while `not_before` keeps the minimum spacing between LLM calls.
+"""
+
+import asyncio
+import logging
+import os
+from typing import Awaitable, Callable, Optional
+
+from services.clock import SystemClock
+
+logger = logging.getLogger(__name__)
+
+# Quiet period after the latest line before the trailing analysis runs
+ANALYSIS_DEBOUNCE_SECONDS = float(os.getenv("ANALYSIS_DEBOUNCE_SECONDS", "1.5"))
+# A pending line is never held longer than this (on top of the minimum spacing)
+ANALYSIS_MAX_LATENCY_SECONDS = float(os.getenv("ANALYSIS_MAX_LATENCY_SECONDS", "6"))
+
+
+class AnalysisScheduler:
+    """One pending trailing analysis per session; re-armed as new lines arrive."""
+
+    def __init__(self, run: Callable[[], Awaitable[None]], debounce_seconds: Optional[float] = None, max_latency_seconds: Optional[float] = None, clock=None):
+        self.run = run
+        self.clock = clock or SystemClock()
+        self.debounce_seconds = ANALYSIS_DEBOUNCE_SECONDS if debounce_seconds is None else debounce_seconds
+        self.max_latency_seconds = ANALYSIS_MAX_LATENCY_SECONDS if max_latency_seconds is None else max_latency_seconds
+        self._first_pending: Optional[float] = None
+        self._last_pending: Optional[float] = None
+        self._not_before = 0.0
+        self._timer: Optional[asyncio.Task] = None
+
+    @property
+    def pending(self) -> bool:
+        return self._first_pending is not None
+
+    def fire_at(self) -> Optional[float]:
+        """When the pending analysis will run (clock time), or None."""
+        if self._first_pending is None:
+            return None
+        due = min(self._last_pending + self.debounce_seconds, self._first_pending + self.max_latency_seconds)
+        return max(due, self._not_before)
+
+    def note_pending(self, now: float, not_before: float):
+        """
+        A line arrived that the leading edge could not analyze.
+        not_before is the earliest time another LLM call is allowed (minimum spacing).
+        """
+        if self._first_pending is None:
+            self._first_pending = now
+        self._last_pending = now
+        self._not_before = not_before
+        self._arm(now)
+
+    def clear(self):
+        """Drop the pending analysis (e.g. the leading edge just covered it)."""
+        self._first_pending = None
+        self._last_pending = None
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _arm(self, now: float):
+        # Only the sleeping timer is replaced; an analysis that already started keeps running
+        if self._timer is not None:
+            self._timer.cancel()
+        delay = max(0.0, self.fire_at() - now)
+        self._timer = asyncio.create_task(self._fire(delay))
+
+    async def _fire(self, delay: float):
+        await self.clock.sleep(delay)
+        self._timer = None
+        waited = self.clock.time() - self._first_pending if self._first_pending is not None else 0.0
+        self._first_pending = None
+        self._last_pending = None
+        logger.info(f"Trailing analysis firing (oldest pending line waited {waited:.1f}s)")
+        try:
+            await self.run()
+        except Exception as e:
+            logger.error(f"Trailing analysis failed: {e}")
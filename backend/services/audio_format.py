@@ -0,0 +1,191 @@
+"""
+Client audio normalization.
+
+Clients declare what they stream (config frame "audio_format": encoding, sample_rate,
+channels) and this stage turns it into what the Deepgram connection is opened with:
+16 kHz mono linear16. Downmix is a channel mean; resampling is linear interpolation that
+carries its position and last sample across chunks, so chunk boundaries are seamless.
+When downsampling by 2x or more, a moving average (also carried across chunks) runs
+first so content above the new Nyquist does not fold back into the speech band.
+
+The canonical format passes straight through. Compressed containers (WebM/Ogg Opus,
+e.g. from MediaRecorder) are not decoded at all: they pass through to Deepgram, which is
+re-dialed without the raw-audio query parameters so it detects the container itself.
+"""
+
+import logging
+from typing import Optional
+
+import numpy as np
+
+from core.metrics import STAGE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+CANONICAL_SAMPLE_RATE = 16000
+CANONICAL_CHANNELS = 1
+
+# Declared encoding -> little-endian sample dtype
+ENCODINGS = {
+    "linear16": "<i2",
+    "int16": "<i2",
+    "pcm_s16le": "<i2",
+    "float32": "<f4",
+    "pcm_f32le": "<f4",
+}
+# Declared container -> canonical name; passed through to STT untouched
+CONTAINERS = {
+    "webm": "webm",
+    "webm-opus": "webm",
+    "audio/webm": "webm",
+    "ogg": "ogg",
+    "ogg-opus": "ogg",
+    "audio/ogg": "ogg",
+}
+# First bytes of a container stream
+CONTAINER_MAGIC = {"webm": b"\x1a\x45\xdf\xa3", "ogg": b"OggS"}
+# Nominal bitrate of a compressed stream when the client does not declare one; only used
+# to size buffers and estimate stream time
+DEFAULT_COMPRESSED_BITRATE = 32000
+MAX_CHANNELS = 8
+SAMPLE_RATE_RANGE = (8000, 192000)
+
+
+def parse_audio_format(spec: Optional[dict]) -> dict:
+    """Validate a client's audio_format; missing fields default to the canonical format."""
+    spec = spec or {}
+    if not isinstance(spec, dict):
+        raise ValueError(f"audio_format must be an object, got {type(spec).__name__}")
+    encoding = str(spec.get("encoding", "linear16")).lower()
+    if encoding.split(";")[0] in CONTAINERS:
+        bitrate = int(spec.get("bitrate", DEFAULT_COMPRESSED_BITRATE))
+        if bitrate <= 0:
+            raise ValueError(f"Unsupported bitrate: {bitrate}")
+        return {"encoding": CONTAINERS[encoding.split(";")[0]], "container": True, "bitrate": bitrate}
+    if encoding not in ENCODINGS:
+        raise ValueError(f"Unsupported audio encoding: {encoding} (expected one of {sorted(ENCODINGS)})")
+    sample_rate = int(spec.get("sample_rate", CANONICAL_SAMPLE_RATE))
+    if not SAMPLE_RATE_RANGE[0] <= sample_rate <= SAMPLE_RATE_RANGE[1]:
+        raise ValueError(f"Unsupported sample rate: {sample_rate}")
+    channels = int(spec.get("channels", CANONICAL_CHANNELS))
+    if not 1 <= channels <= MAX_CHANNELS:
+        raise ValueError(f"Unsupported channel count: {channels}")
+    return {"encoding": encoding, "sample_rate": sample_rate, "channels": channels}
+
+
+def is_compressed(fmt: dict) -> bool:
+    return bool(fmt.get("container"))
+
+
+def stt_stream_params(fmt: dict) -> dict:
+    """Deepgram query parameters for what the normalizer outputs."""
+    if is_compressed(fmt):
+        # Containerized audio: Deepgram reads encoding and rate from the container
+        return {}
+    return {"encoding": "linear16", "channels": CANONICAL_CHANNELS, "sample_rate": CANONICAL_SAMPLE_RATE}
+
+
+def stream_bytes_per_second(fmt: dict) -> int:
+    """Bytes per second of the stream sent to STT (nominal for compressed audio)."""
+    if is_compressed(fmt):
+        return max(1, fmt["bitrate"] // 8)
+    return CANONICAL_SAMPLE_RATE * CANONICAL_CHANNELS * 2
+
+
+def container_header(fmt: dict, data: bytes) -> bytes:
+    """
+    The initialization part of a container stream's first chunk: what a new STT connection
+    needs before it can decode data from the middle of the stream. Falls back to the whole
+    chunk if no media data starts in it.
+    """
+    if fmt.get("encoding") == "webm":
+        # Everything before the first Cluster element (EBML header, Segment info, Tracks)
+        cluster = data.find(b"\x1f\x43\xb6\x75")
+        return data[:cluster] if cluster > 0 else data
+    if fmt.get("encoding") == "ogg":
+        # Opus in Ogg: the first two pages are OpusHead and OpusTags
+        end = 0
+        for _ in range(2):
+            if data[end:end + 4] != b"OggS" or len(data) < end + 27:
+                return data
+            segments = data[end + 26]
+            table = data[end + 27:end + 27 + segments]
+            end += 27 + segments + sum(table)
+        return data[:end]
+    return data
+
+
+class AudioNormalizer:
+    def __init__(self, encoding: str = "linear16", sample_rate: int = CANONICAL_SAMPLE_RATE, channels: int = CANONICAL_CHANNELS):
+        fmt = parse_audio_format({"encoding": encoding, "sample_rate": sample_rate, "channels": channels})
+        self.format = fmt
+        self.dtype = np.dtype(ENCODINGS[fmt["encoding"]])
+        self.sample_rate = fmt["sample_rate"]
+        self.channels = fmt["channels"]
+        self.frame_bytes = self.dtype.itemsize * self.channels
+        self.passthrough = self.dtype == np.dtype("<i2") and self.sample_rate == CANONICAL_SAMPLE_RATE and self.channels == 1
+        # Input samples per output sample
+        self._step = self.sample_rate / CANONICAL_SAMPLE_RATE
+        # Bytes of an incomplete input frame held for the next chunk
+        self._pending = b""
+        # Resampler state: last input sample of the previous chunk, and where the next
+        # output falls relative to it (in input samples)
+        self._last: Optional[float] = None
+        self._next = 0.0
+        # Anti-alias moving average over ~one output period when decimating
+        self._taps = int(round(self._step)) if self._step >= 2 else 1
+        self._history = np.zeros(self._taps - 1, dtype=np.float32)
+
+    @classmethod
+    def from_config(cls, spec: Optional[dict]) -> "AudioNormalizer":
+        fmt = parse_audio_format(spec)
+        if is_compressed(fmt):
+            normalizer = cls()
+            normalizer.format = fmt
+            return normalizer
+        return cls(fmt["encoding"], fmt["sample_rate"], fmt["channels"])
+
+    def process(self, data: bytes) -> bytes:
+        """Convert one client chunk to canonical linear16; may hold back a partial frame."""
+        if self.passthrough:
+            return data
+        with STAGE_SECONDS.time(stage="audio_normalize"):
+            buf = memoryview(data)
+            if self._pending:
+                buf = memoryview(self._pending + data)
+            usable = len(buf) - len(buf) % self.frame_bytes
+            self._pending = bytes(buf[usable:])
+            if not usable:
+                return b""
+            # Zero-copy view over the client bytes
+            samples = np.frombuffer(buf[:usable], dtype=self.dtype)
+            if self.dtype.kind == "f":
+                mono = samples.reshape(-1, self.channels).mean(axis=1, dtype=np.float32) if self.channels > 1 else samples
+                mono = mono * np.float32(32767.0)
+            else:
+                mono = samples.reshape(-1, self.channels).mean(axis=1, dtype=np.float32) if self.channels > 1 else samples.astype(np.float32)
+            if self.sample_rate != CANONICAL_SAMPLE_RATE:
+                mono = self._resample(mono)
+            return np.clip(np.rint(mono), -32768, 32767).astype("<i2").tobytes()
+
+    def _resample(self, x: np.ndarray) -> np.ndarray:
+        if self._taps > 1:
+            padded = np.concatenate((self._history, x))
+            self._history = padded[len(padded) - (self._taps - 1):]
+            x = np.convolve(padded, np.full(self._taps, 1.0 / self._taps, dtype=np.float32), mode="valid")
+        if self._last is None:
+            # First chunk: the first output sits on the first input sample
+            self._last = float(x[0])
+            self._next = 1.0
+        # Index 0 is the previous chunk's last sample, 1..n this chunk
+        n = len(x)
+        if self._next > n:
+            self._next -= n
+            self._last = float(x[-1])
+            return np.empty(0, dtype=np.float32)
+        count = int((n - self._next) // self._step) + 1
+        positions = self._next + self._step * np.arange(count)
+        out = np.interp(positions, np.arange(n + 1), np.concatenate(([self._last], x)))
+        self._next = self._next + self._step * count - n
+        self._last = float(x[-1])
+        return out
@@ -0,0 +1,246 @@
+"""
+Client audio ingestion buffer between the WebSocket receive loop and Deepgram.
+
+The receive loop calls push(), which never awaits: client chunks (arbitrary sizes) are
+coalesced into fixed-duration frames and queued. A sender task forwards frames to the
+AudioProcessor. Queued audio is bounded; when Deepgram is slow or disconnected and the
+bound is hit, a congestion policy decides what to give up:
+
+- drop_oldest (default): keep the most recent audio; live advice cares about now.
+- drop_newest: keep what is queued and discard incoming frames.
+- drop_quiet: degrade instead of cutting speech; drop the lowest-energy queued frame
+  (silence, background) first.
+
+With a VoiceActivityDetector (services/vad.py), the sender withholds silent frames,
+tells the processor how much audio it skipped (timestamps stay on session time) and
+sends KeepAlive instead while it is withholding.
+
+For compressed container audio (set_compressed) client chunks are forwarded whole:
+no framing, no VAD, and nothing is sent before the container's first bytes arrive.
+"""
+
+import asyncio
+import logging
+import os
+from collections import deque
+from typing import Optional
+
+import numpy as np
+
+from core.metrics import AUDIO_BUFFERED_SECONDS, AUDIO_FRAMES_DROPPED, STAGE_SECONDS, VAD_SAVED_SECONDS
+from services.audio_format import CONTAINER_MAGIC
+
+logger = logging.getLogger(__name__)
+
+# Frame duration forwarded to Deepgram
+AUDIO_FRAME_MS = int(os.getenv("AUDIO_FRAME_MS", "100"))
+# Queued audio per connection before the congestion policy applies
+AUDIO_MAX_BUFFER_MS = int(os.getenv("AUDIO_MAX_BUFFER_MS", "2000"))
+AUDIO_CONGESTION_POLICY = os.getenv("AUDIO_CONGESTION_POLICY", "drop_oldest")
+# Back-off while the processor is disconnected (frames stay queued, bounded)
+AUDIO_DISCONNECTED_BACKOFF_SECONDS = 0.1
+# KeepAlive interval while the VAD withholds audio
+VAD_KEEPALIVE_SECONDS = float(os.getenv("VAD_KEEPALIVE_SECONDS", "4"))
+
+CONGESTION_POLICIES = ("drop_oldest", "drop_newest", "drop_quiet")
+
+
+def _frame_energy(frame: bytes) -> float:
+    """Mean absolute amplitude of a linear16 frame."""
+    samples = np.frombuffer(frame[: len(frame) - len(frame) % 2], dtype="<i2")
+    return float(np.abs(samples.astype(np.int32)).mean()) if samples.size else 0.0
+
+
+class AudioIngestBuffer:
+    def __init__(self, processor, bytes_per_second: int = 32000, frame_ms: Optional[int] = None, max_buffer_ms: Optional[int] = None, policy: Optional[str] = None, vad=None):
+        self.processor = processor
+        self.vad = vad
+        self.policy = policy or AUDIO_CONGESTION_POLICY
+        if self.policy not in CONGESTION_POLICIES:
+            raise ValueError(f"Unknown congestion policy: {self.policy} (expected one of {CONGESTION_POLICIES})")
+        self.bytes_per_second = bytes_per_second
+        frame_ms = AUDIO_FRAME_MS if frame_ms is None else frame_ms
+        max_buffer_ms = AUDIO_MAX_BUFFER_MS if max_buffer_ms is None else max_buffer_ms
+        # Whole samples (linear16) per frame
+        self.frame_bytes = max(2, int(bytes_per_second * frame_ms / 1000) & ~1)
+        self.max_frames = max(1, max_buffer_ms // max(1, frame_ms))
+        self._partial = bytearray()
+        self._frames: deque = deque()  # (frame, energy or None)
+        self._ready = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+        self.frames_sent = 0
+        self.frames_dropped = 0
+        self._last_sent = 0.0
+        # Container magic expected at the start of a compressed stream (None: raw PCM)
+        self._container_magic: Optional[bytes] = None
+        self.compressed = False
+
+    @property
+    def buffered_seconds(self) -> float:
+        if self.compressed:
+            return sum(len(f) for f, _ in self._frames) / self.bytes_per_second
+        return (len(self._frames) * self.frame_bytes + len(self._partial)) / self.bytes_per_second
+
+    def start(self):
+        self._task = asyncio.create_task(self._send_loop())
+
+    def set_compressed(self, encoding: str, bytes_per_second: int):
+        """
+        Switch to forwarding a compressed container stream. Queued PCM is discarded (it
+        must not reach a connection opened for the container), and so are chunks until
+        one starts with the container's magic bytes.
+        """
+        AUDIO_BUFFERED_SECONDS.dec(self.buffered_seconds)
+        self._frames.clear()
+        self._partial.clear()
+        self.compressed = True
+        self._container_magic = CONTAINER_MAGIC.get(encoding, b"")
+        self.bytes_per_second = bytes_per_second
+        if self.policy == "drop_quiet":
+            # Energy of compressed bytes means nothing
+            self.policy = "drop_oldest"
+        if self.vad is not None:
+            logger.info("VAD disabled for compressed audio")
+            self.vad = None
+
+    def push(self, data: bytes):
+        """Queue client audio. Never blocks; applies the congestion policy when full."""
+        if self._closing or not data:
+            return
+        if self.compressed:
+            self._push_compressed(data)
+            return
+        before = self.buffered_seconds
+        self._partial.extend(data)
+        while len(self._partial) >= self.frame_bytes:
+            frame = bytes(self._partial[: self.frame_bytes])
+            del self._partial[: self.frame_bytes]
+            self._enqueue(frame)
+        AUDIO_BUFFERED_SECONDS.inc(self.buffered_seconds - before)
+        if self._frames:
+            self._ready.set()
+
+    def _push_compressed(self, data: bytes):
+        if self._container_magic is not None:
+            if not data.startswith(self._container_magic):
+                # PCM still in flight from before the switch
+                self._drop(reason="format_switch")
+                return
+            self._container_magic = None
+        before = self.buffered_seconds
+        self._enqueue(data)
+        AUDIO_BUFFERED_SECONDS.inc(self.buffered_seconds - before)
+        self._ready.set()
+
+    def _enqueue(self, frame: bytes):
+        energy = _frame_energy(frame) if self.policy == "drop_quiet" else None
+        if len(self._frames) >= self.max_frames:
+            if self.policy == "drop_newest":
+                self._drop(reason=self.policy)
+                return
+            if self.policy == "drop_quiet":
+                # Compare the incoming frame too: if it is the quietest, it goes
+                quietest = min(range(len(self._frames)), key=lambda i: self._frames[i][1])
+                if energy <= self._frames[quietest][1]:
+                    self._drop(reason=self.policy)
+                    return
+                del self._frames[quietest]
+            else:
+                self._frames.popleft()
+            self._drop(reason=self.policy)
+        self._frames.append((frame, energy))
+
+    def _drop(self, reason: str):
+        self.frames_dropped += 1
+        AUDIO_FRAMES_DROPPED.inc(reason=reason)
+
+    def stats(self) -> dict:
+        """Per-session audio accounting (stored with the session)."""
+        stats = {"frames_sent": self.frames_sent, "frames_dropped": self.frames_dropped}
+        if self.vad is not None:
+            stats["speech_seconds"] = round(self.vad.speech_seconds, 2)
+            stats["vad_saved_seconds"] = round(self.vad.saved_seconds, 2)
+        return stats
+
+    async def _wait_for_frames(self):
+        if self.vad is None or not self.vad.withholding:
+            await self._ready.wait()
+            return
+        # Withholding: the stream sees no audio, so keep it alive while idle
+        loop = asyncio.get_running_loop()
+        while not self._ready.is_set():
+            idle = loop.time() - self._last_sent
+            if idle >= VAD_KEEPALIVE_SECONDS:
+                if await self.processor.send_keepalive():
+                    self._last_sent = loop.time()
+                idle = 0.0
+            try:
+                await asyncio.wait_for(self._ready.wait(), VAD_KEEPALIVE_SECONDS - idle)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _send_loop(self):
+        self._last_sent = asyncio.get_running_loop().time()
+        while True:
+            if not self._frames:
+                if self._closing:
+                    return
+                self._ready.clear()
+                await self._wait_for_frames()
+                continue
+            if not self.processor.connected:
+                if self._closing:
+                    return
+                # Keep audio queued (bounded by the policy) until the processor is back
+                await asyncio.sleep(AUDIO_DISCONNECTED_BACKOFF_SECONDS)
+                continue
+            item = self._frames.popleft()
+            AUDIO_BUFFERED_SECONDS.dec(len(item[0]) / self.bytes_per_second)
+            if self.vad is None:
+                outgoing = [item[0]]
+            else:
+                outgoing, skipped = self.vad.process(item[0])
+                if skipped:
+                    self.processor.skip_audio(skipped)
+                    VAD_SAVED_SECONDS.inc(skipped)
+                if not outgoing and self._last_sent + VAD_KEEPALIVE_SECONDS <= asyncio.get_running_loop().time():
+                    if await self.processor.send_keepalive():
+                        self._last_sent = asyncio.get_running_loop().time()
+            await self._send_frames(outgoing)
+
+    async def _send_frames(self, frames: list):
+        for i, frame in enumerate(frames):
+            with STAGE_SECONDS.time(stage="stt_send"):
+                sent = await self.processor.send_audio(frame)
+            if sent:
+                self.frames_sent += 1
+                self._last_sent = asyncio.get_running_loop().time()
+            elif self.processor.connected:
+                # Transient send failure: this frame is lost, the connection is kept
+                self._drop(reason="send_error")
+            elif not self._closing:
+                # The connection dropped under this frame; keep the rest for when it is back
+                for rest in reversed(frames[i:]):
+                    energy = _frame_energy(rest) if self.policy == "drop_quiet" else None
+                    self._frames.appendleft((rest, energy))
+                    AUDIO_BUFFERED_SECONDS.inc(len(rest) / self.bytes_per_second)
+                return
+
+    async def close(self, timeout: float = 2.0):
+        """Flush queued audio (including a trailing partial frame), bounded by timeout."""
+        if self._partial:
+            self._frames.append((bytes(self._partial), 0.0))
+            self._partial.clear()
+        self._closing = True
+        self._ready.set()
+        if self._task is not None:
+            try:
+                await asyncio.wait_for(self._task, timeout)
+            except asyncio.TimeoutError:
+                logger.warning("Audio ingest did not flush in time; discarding queued audio")
+        AUDIO_BUFFERED_SECONDS.dec(sum(len(f) for f, _ in self._frames) / self.bytes_per_second)
+        self._frames.clear()
+        if self.vad is not None:
+            # Pre-roll still held back was never sent either
+            VAD_SAVED_SECONDS.inc(self.vad.saved_seconds - self.vad.skipped_seconds)
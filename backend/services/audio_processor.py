@@ -2,24 +2,107 @@ import os
 import logging
 import json
 import asyncio
+import bisect
+import contextlib
+import random
+import time
+from collections import deque
 import websockets
 from websockets.exceptions import ConnectionClosed
 
+from core.metrics import STAGE_SECONDS, STT_DOWNTIME_SECONDS, STT_RECONNECTS
+from core.tracing import new_trace_id, record_span
+from services.audio_format import container_header, is_compressed, parse_audio_format, stream_bytes_per_second, stt_stream_params
+from services.stt_pool import KEEPALIVE_MESSAGE
+
 logger = logging.getLogger(__name__)
 
-DEEPGRAM_URL = "wss://api.deepgram.com/v1/listen"
+# Overridable to point at a local stand-in (devtools/fake_deepgram.py) for load tests
+DEEPGRAM_URL = os.getenv("DEEPGRAM_URL", "wss://api.deepgram.com/v1/listen")
+
+# Reconnection after the Deepgram socket drops mid-call: attempts, then exponential backoff
+# (with jitter) between them, capped
+STT_RECONNECT_MAX_ATTEMPTS = int(os.getenv("STT_RECONNECT_MAX_ATTEMPTS", "6"))
+STT_RECONNECT_BASE_SECONDS = float(os.getenv("STT_RECONNECT_BASE_SECONDS", "0.5"))
+STT_RECONNECT_MAX_SECONDS = float(os.getenv("STT_RECONNECT_MAX_SECONDS", "10"))
+# Most recent audio re-sent on a new connection (Deepgram may not have finalized it)
+STT_REPLAY_BUFFER_MS = int(os.getenv("STT_REPLAY_BUFFER_MS", "3000"))
+# Results ending this close to the last emitted one are re-transcriptions of replayed audio
+_DUPLICATE_TOLERANCE_SECONDS = 0.05
+
+
+def listen_url(endpointing_ms: int = 300, stream_params: dict = None) -> str:
+    """Deepgram live URL with the query parameters the processor streams with."""
+    if stream_params is None:
+        stream_params = stt_stream_params(parse_audio_format(None))
+    # Raw audio needs encoding/channels/sample_rate; containers are detected by Deepgram
+    audio = "".join(f"&{key}={value}" for key, value in stream_params.items())
+    # Build the URL with query parameters including diarization
+    return (
+        f"{DEEPGRAM_URL}"
+        f"?model=nova-2"
+        f"&language=en-US"
+        f"&smart_format=true"
+        f"{audio}"
+        f"&endpointing={int(endpointing_ms)}"
+        f"&interim_results=true"
+        f"&diarize=true"  # Enable speaker diarization
+    )
+
+
+class _StreamTimeline:
+    """
+    Maps one connection's stream time (what Deepgram timestamps count: audio actually
+    sent) to session audio time: the connection's start offset, plus any audio withheld
+    before that point (see services/vad.py).
+    """
+    def __init__(self, offset: float = 0.0):
+        self.offset = offset
+        self._at = []  # stream times where audio was withheld
+        self._withheld = []  # total withheld seconds from that point on
+
+    def skip(self, at: float, seconds: float):
+        total = (self._withheld[-1] if self._withheld else 0.0) + seconds
+        if self._at and self._at[-1] == at:
+            self._withheld[-1] = total
+        else:
+            self._at.append(at)
+            self._withheld.append(total)
+
+    def to_session(self, t: float) -> float:
+        i = bisect.bisect_right(self._at, t)
+        return self.offset + t + (self._withheld[i - 1] if i else 0.0)
+
+    def rebase(self, t: float) -> "_StreamTimeline":
+        """Timeline for a new connection whose stream starts at this one's stream time t."""
+        i = bisect.bisect_right(self._at, t)
+        timeline = _StreamTimeline(self.to_session(t))
+        # Withheld points after t (replayed audio spans them) carry over
+        before = self._withheld[i - 1] if i else 0.0
+        for at, total in zip(self._at[i:], self._withheld[i:]):
+            timeline.skip(at - t, total - before)
+            before = total
+        return timeline
+
 
 class AudioProcessor:
     """
     Handles streaming audio to Deepgram using raw WebSockets.
     Now includes speaker diarization support.
     """
-    def __init__(self, transcript_callback, emit_interim: bool = False, endpointing_ms: int = 300):
+    # WebM/Ogg go to Deepgram as-is (see set_stream_format)
+    supports_compressed = True
+
+    def __init__(self, transcript_callback, emit_interim: bool = False, endpointing_ms: int = 300, status_callback=None, pool=None):
         """
         Args:
-            transcript_callback: Function that takes (transcript: str, speaker: int)
+            transcript_callback: Function that takes (transcript: str, speaker: int, trace_id: str)
+            status_callback: Optional async function taking a dict, called on reconnect events
+            pool: Optional DeepgramConnectionPool to take pre-opened connections from
         """
         self.transcript_callback = transcript_callback
+        self.status_callback = status_callback
+        self.pool = pool
         self.api_key = os.getenv("DEEPGRAM_API_KEY")
         # When enabled, emit intermediate finals to the callback for near-real-time analysis.
         self.emit_interim = emit_interim or (os.getenv("DG_EMIT_INTERIM", "").lower() in ("1", "true", "yes"))
@@ -27,37 +110,143 @@ class AudioProcessor:
         self.ws = None
         self._receive_task = None
         self._connected = False
+        # What is streamed to Deepgram: 16 kHz mono linear16 unless set_stream_format()
+        # switched to a compressed container (nominal rate then)
+        self.stream_format = parse_audio_format(None)
+        self.bytes_per_second = stream_bytes_per_second(self.stream_format)
+        # Container streams: initialization segment, re-sent first on a new connection
+        self._stream_header = None
+        self._started = False
+        self._stopping = False
+        self._reconnect_task = None
+        self._redial_task = None
+        # Receive loops of replaced connections, still draining their last results
+        self._draining = set()
+        self.reconnects = 0
+        # Recently sent audio, replayed on reconnect
+        self._replay = deque()
+        self._replay_bytes = 0
+        self._replay_max_bytes = int(self.bytes_per_second * STT_REPLAY_BUFFER_MS / 1000)
+        # Deepgram timestamps restart at 0 on every connection; the timeline maps the current
+        # connection's stream time to session audio time. _sent_bytes counts audio sent on it.
+        self._timeline = _StreamTimeline()
+        self._sent_bytes = 0
+        self._last_end = 0.0
+
+    @property
+    def connected(self) -> bool:
+        return self._connected
 
     def set_emit_interim(self, enabled: bool):
         self.emit_interim = bool(enabled)
         logger.info(f"AudioProcessor emit_interim set to: {self.emit_interim}")
 
     def set_endpointing(self, endpointing_ms: int):
+        changed = int(endpointing_ms) != self.endpointing_ms
         self.endpointing_ms = int(endpointing_ms)
         logger.info(f"AudioProcessor endpointing set to: {self.endpointing_ms}ms")
+        # Query parameters are fixed per connection; switch to one opened with the new value
+        if changed and self._connected and not self._stopping:
+            if self._redial_task is not None:
+                self._redial_task.cancel()
+            self._redial_task = asyncio.create_task(self._redial())
+
+    def _url(self) -> str:
+        return listen_url(self.endpointing_ms, stt_stream_params(self.stream_format))
+
+    async def set_stream_format(self, fmt: dict) -> bool:
+        """
+        Switch what is streamed to Deepgram (see services/audio_format.py). A started
+        processor moves to a connection opened for the new format; audio is held (the
+        processor reports disconnected) until it is open, because bytes of the new
+        format must not reach the old connection. Returns False if that dial failed;
+        the reconnect loop then keeps trying with the new format.
+        """
+        if stt_stream_params(fmt) == stt_stream_params(self.stream_format) and fmt.get("bitrate") == self.stream_format.get("bitrate"):
+            return True
+        stream_seconds = self._sent_bytes / self.bytes_per_second
+        self.stream_format = fmt
+        self.bytes_per_second = stream_bytes_per_second(fmt)
+        self._replay_max_bytes = int(self.bytes_per_second * STT_REPLAY_BUFFER_MS / 1000)
+        self._replay.clear()
+        self._replay_bytes = 0
+        self._stream_header = None
+        logger.info(f"AudioProcessor stream format set to: {fmt}")
+        if not self._started or self._stopping:
+            return True
+        old = self.ws
+        self._connected = False
+        # Later audio starts where the old connection stopped
+        self._timeline = self._timeline.rebase(stream_seconds)
+        self._sent_bytes = 0
+        try:
+            ws = await self._open()
+        except Exception as e:
+            logger.error(f"Deepgram re-dial for new stream format failed: {e}")
+            self._connection_lost(old, "format_change")
+            return False
+        if self._stopping:
+            with contextlib.suppress(Exception):
+                await ws.close()
+            return False
+        self.ws = ws
+        self._connected = True
+        if self._receive_task is not None:
+            self._draining.add(self._receive_task)
+            self._receive_task.add_done_callback(self._draining.discard)
+        self._receive_task = asyncio.create_task(self._receive_messages())
+        if old is not None:
+            with contextlib.suppress(Exception):
+                await old.send(json.dumps({"type": "CloseStream"}))
+        return True
+
+    async def _open(self):
+        # Connect with API key in header
+        headers = {"Authorization": f"Token {self.api_key}"}
+        if self.pool is not None:
+            return await self.pool.acquire(self._url(), headers)
+        return await websockets.connect(self._url(), additional_headers=headers)
+
+    async def _connect(self):
+        self.ws = await self._open()
+        self._sent_bytes = 0
+
+    async def _redial(self):
+        """
+        Moves the stream to a new connection (new parameters) without a gap: audio keeps
+        going to the old one until the new one is open, then the old one is asked to
+        finalize (CloseStream) and drains in the background.
+        """
+        try:
+            ws = await self._open()
+        except Exception as e:
+            logger.error(f"Deepgram re-dial failed, keeping the current connection: {e}")
+            return
+        finally:
+            if self._redial_task is asyncio.current_task():
+                self._redial_task = None
+        if self._stopping or not self._connected:
+            # Stopped, or dropped meanwhile (the reconnect picks up the new parameters)
+            with contextlib.suppress(Exception):
+                await ws.close()
+            return
+        old = self.ws
+        self._timeline = self._timeline.rebase(self._sent_bytes / self.bytes_per_second)
+        self.ws = ws
+        self._sent_bytes = 0
+        if self._receive_task is not None:
+            self._draining.add(self._receive_task)
+            self._receive_task.add_done_callback(self._draining.discard)
+        self._receive_task = asyncio.create_task(self._receive_messages())
+        logger.info(f"Deepgram re-dialed (endpointing={self.endpointing_ms}ms)")
+        with contextlib.suppress(Exception):
+            await old.send(json.dumps({"type": "CloseStream"}))
 
     async def start(self):
         """Initializes the Deepgram WebSocket Connection with diarization."""
+        self._started = True
         try:
-            # Build the URL with query parameters including diarization
-            url = (
-                f"{DEEPGRAM_URL}"
-                f"?model=nova-2"
-                f"&language=en-US"
-                f"&smart_format=true"
-                f"&encoding=linear16"
-                f"&channels=1"
-                f"&sample_rate=16000"
-                f"&endpointing={self.endpointing_ms}"
-                f"&interim_results=true"
-                f"&diarize=true"  # Enable speaker diarization
-            )
-
-            # Connect with API key in header
-            self.ws = await websockets.connect(
-                url,
-                additional_headers={"Authorization": f"Token {self.api_key}"}
-            )
+            await self._connect()
             self._connected = True
             
             logger.info("Deepgram WebSocket Connection Established (diarization enabled)")
@@ -73,8 +262,14 @@ class AudioProcessor:
 
     async def _receive_messages(self):
         """Background task to receive and process transcripts from Deepgram."""
+        ws = self.ws
+        # Results on this connection are mapped with the timeline it started with
+        timeline = self._timeline
+        reason = "closed"
         try:
-            async for message in self.ws:
+            async for message in ws:
+                received_at = time.perf_counter()
+                received_wall = time.time()
                 data = json.loads(message)
                 
                 # Check if this is a transcript result
@@ -94,37 +289,190 @@ class AudioProcessor:
                             # Get the speaker of the first word in this utterance
                             speaker = words[0].get("speaker", 0)
                         
-                        if transcript and speech_final:
+                        if transcript and (speech_final or is_final) and self._realign(data, timeline):
+                            # Re-transcription of audio replayed after a reconnect
+                            logger.info(f"Skipping replayed result: {transcript}")
+                        elif transcript and speech_final:
                             logger.info(f"[Speaker {speaker}] Speech Final: {transcript}")
                             if self.transcript_callback:
-                                self.transcript_callback(transcript, speaker)
+                                self._emit(transcript, speaker, data, received_at, received_wall)
                         elif transcript and is_final:
                             # Emit intermediate finals for near-continuous terminal feedback
                             logger.info(f"[Speaker {speaker}] Intermediate Final: {transcript}")
                             if self.emit_interim and self.transcript_callback:
-                                self.transcript_callback(transcript, speaker)
+                                self._emit(transcript, speaker, data, received_at, received_wall)
                             
         except ConnectionClosed:
             logger.info("Deepgram connection closed")
-            self._connected = False
         except Exception as e:
             logger.error(f"Error receiving from Deepgram: {e}")
-            self._connected = False
+            reason = "error"
+        self._connection_lost(ws, reason)
+
+    def _realign(self, data: dict, timeline: _StreamTimeline) -> bool:
+        """
+        Shifts a result's timestamps from connection time to session audio time (in place).
+        Returns True if it ends where an emitted result already did, i.e. it only covers
+        replayed audio and must be skipped to keep timestamps monotonic.
+        """
+        if "start" not in data:
+            return False
+        stream_start = float(data.get("start") or 0.0)
+        start = timeline.to_session(stream_start)
+        end = timeline.to_session(stream_start + float(data.get("duration") or 0.0))
+        if end <= self._last_end + _DUPLICATE_TOLERANCE_SECONDS:
+            return True
+        data["start"] = round(start, 3)
+        for word in data.get("channel", {}).get("alternatives", [{}])[0].get("words", []):
+            for key in ("start", "end"):
+                if key in word:
+                    word[key] = round(timeline.to_session(word[key]), 3)
+        self._last_end = max(self._last_end, end)
+        return False
+
+    def _connection_lost(self, ws, reason: str):
+        """Marks the processor disconnected and, mid-session, starts reconnecting."""
+        if ws is not self.ws:
+            # A connection that was already replaced
+            return
+        self._connected = False
+        if not self._started or self._stopping or self._reconnect_task is not None:
+            return
+        self._reconnect_task = asyncio.create_task(self._reconnect(reason))
+
+    def _backoff(self, attempt: int) -> float:
+        delay = min(STT_RECONNECT_MAX_SECONDS, STT_RECONNECT_BASE_SECONDS * (2 ** (attempt - 1)))
+        return delay * random.uniform(0.5, 1.0)
+
+    async def _reconnect(self, reason: str):
+        """
+        Re-dials Deepgram with exponential backoff. On success the replay buffer is sent
+        first, and the new connection's timestamps are offset to continue the session's.
+        Client audio arriving meanwhile waits in the ingest buffer (see audio_ingest.py).
+        """
+        lost_at = time.perf_counter()
+        replay = list(self._replay)
+        replay_bytes = sum(len(frame) for frame in replay)
+        if is_compressed(self.stream_format):
+            # Container data is only decodable after the initialization segment; the
+            # decoder resyncs on the next media block, so no audio is replayed
+            replay = [self._stream_header] if self._stream_header else []
+            replay_bytes = 0
+        # The new connection's stream starts with the replay
+        next_timeline = self._timeline.rebase((self._sent_bytes - replay_bytes) / self.bytes_per_second)
+        try:
+            for attempt in range(1, STT_RECONNECT_MAX_ATTEMPTS + 1):
+                if attempt > 1:
+                    await asyncio.sleep(self._backoff(attempt - 1))
+                logger.warning(f"Deepgram connection lost ({reason}); reconnecting (attempt {attempt}/{STT_RECONNECT_MAX_ATTEMPTS})")
+                await self._notify({"status": "reconnecting", "attempt": attempt, "reason": reason})
+                try:
+                    await self._connect()
+                    for frame in replay:
+                        await self.ws.send(frame)
+                    self._sent_bytes = replay_bytes
+                except Exception as e:
+                    logger.error(f"Deepgram reconnect attempt {attempt} failed: {e}")
+                    STT_RECONNECTS.inc(outcome="failure")
+                    with contextlib.suppress(Exception):
+                        await self.ws.close()
+                    continue
+                self._timeline = next_timeline
+                self._connected = True
+                self._receive_task = asyncio.create_task(self._receive_messages())
+                self.reconnects += 1
+                downtime = time.perf_counter() - lost_at
+                STT_RECONNECTS.inc(outcome="success")
+                STT_DOWNTIME_SECONDS.observe(downtime)
+                logger.info(f"Deepgram reconnected after {downtime:.2f}s; replayed {replay_bytes / self.bytes_per_second:.2f}s of audio")
+                await self._notify({
+                    "status": "connected",
+                    "attempts": attempt,
+                    "downtime_seconds": round(downtime, 3),
+                    "replayed_seconds": round(replay_bytes / self.bytes_per_second, 3),
+                })
+                return
+            STT_RECONNECTS.inc(outcome="gave_up")
+            logger.error(f"Deepgram reconnect failed after {STT_RECONNECT_MAX_ATTEMPTS} attempts; transcription stopped")
+            await self._notify({"status": "failed", "attempts": STT_RECONNECT_MAX_ATTEMPTS})
+        finally:
+            self._reconnect_task = None
+
+    async def _notify(self, event: dict):
+        if not self.status_callback:
+            return
+        try:
+            await self.status_callback(event)
+        except Exception as e:
+            logger.warning(f"STT status callback failed: {e}")
+
+    def _emit(self, transcript: str, speaker: int, data: dict, received_at: float, received_wall: float):
+        """Assigns the utterance its trace id and hands it to the callback."""
+        trace_id = new_trace_id()
+        STAGE_SECONDS.observe(time.perf_counter() - received_at, stage="stt_final_to_callback")
+        record_span(
+            "stt.final_to_callback", trace_id, received_wall,
+            speaker=speaker,
+            speech_final=bool(data.get("speech_final")),
+            audio_start=data.get("start"),
+            audio_duration=data.get("duration"),
+        )
+        self.transcript_callback(transcript, speaker, trace_id)
+
+    async def send_audio(self, audio_data: bytes) -> bool:
+        """
+        Sends raw audio bytes to Deepgram. Returns False if the audio was not sent.
+        Only a closed connection marks the processor disconnected; other errors are transient.
+        """
+        if not (self.ws and self._connected):
+            return False
+        ws = self.ws
+        try:
+            await ws.send(audio_data)
+        except ConnectionClosed as e:
+            logger.error(f"Deepgram connection closed while sending audio: {e}")
+            self._connection_lost(ws, "closed")
+            return False
+        except Exception as e:
+            logger.error(f"Error sending audio: {e}")
+            return False
+        self._sent_bytes += len(audio_data)
+        if is_compressed(self.stream_format):
+            if self._stream_header is None:
+                self._stream_header = container_header(self.stream_format, audio_data)
+            return True
+        self._replay.append(audio_data)
+        self._replay_bytes += len(audio_data)
+        while self._replay_bytes > self._replay_max_bytes and len(self._replay) > 1:
+            self._replay_bytes -= len(self._replay.popleft())
+        return True
+
+    def skip_audio(self, seconds: float):
+        """Record audio withheld from Deepgram here, so later timestamps account for it."""
+        self._timeline.skip(self._sent_bytes / self.bytes_per_second, seconds)
 
-    async def send_audio(self, audio_data: bytes):
-        """Sends raw audio bytes to Deepgram."""
-        if self.ws and self._connected:
-            try:
-                await self.ws.send(audio_data)
-            except Exception as e:
-                logger.error(f"Error sending audio: {e}")
-                self._connected = False
+    async def send_keepalive(self) -> bool:
+        """Keeps the stream open while no audio is sent (Deepgram times out after ~10s)."""
+        if not (self.ws and self._connected):
+            return False
+        ws = self.ws
+        try:
+            await ws.send(KEEPALIVE_MESSAGE)
+            return True
+        except ConnectionClosed as e:
+            logger.error(f"Deepgram connection closed while sending KeepAlive: {e}")
+            self._connection_lost(ws, "closed")
+        except Exception as e:
+            logger.error(f"Error sending KeepAlive: {e}")
+        return False
 
     async def stop(self):
         """Closes the connection."""
+        self._stopping = True
         self._connected = False
-        if self._receive_task:
-            self._receive_task.cancel()
+        for task in (self._reconnect_task, self._redial_task, self._receive_task, *self._draining):
+            if task:
+                task.cancel()
         if self.ws:
             await self.ws.close()
             logger.info("Deepgram Connection Closed")
@@ -0,0 +1,89 @@
+"""
+Injectable clocks for the live pipeline.
+
+Coach and AnalysisScheduler read time and sleep through a clock object instead of
+calling time.time()/asyncio.sleep directly, so a recorded session can be replayed on a
+VirtualClock: window, spacing, dedupe and trailing-edge timers then follow the session's
+original timeline no matter how fast the replay runs.
+"""
+
+import asyncio
+import heapq
+import itertools
+import time
+from typing import List, Optional, Tuple
+
+
+class SystemClock:
+    """Wall-clock time and real sleeps (the default)."""
+
+    def time(self) -> float:
+        return time.time()
+
+    async def sleep(self, delay: float):
+        await asyncio.sleep(delay)
+
+
+class VirtualClock:
+    """
+    Time that only moves when advance_to() is called.
+
+    sleep() parks the caller until virtual time reaches its deadline. advance_to() wakes
+    sleepers in deadline order (ties in call order) and lets each woken task run until it
+    finishes or sleeps again before moving on, so the interleaving is reproducible.
+    """
+
+    def __init__(self, start: float = 0.0):
+        self._now = float(start)
+        self._sleepers: List[Tuple[float, int, asyncio.Future, Optional[asyncio.Task]]] = []
+        self._seq = itertools.count()
+
+    def time(self) -> float:
+        return self._now
+
+    async def sleep(self, delay: float):
+        if delay <= 0:
+            await asyncio.sleep(0)
+            return
+        fut = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._sleepers, (self._now + delay, next(self._seq), fut, asyncio.current_task()))
+        try:
+            await fut
+        finally:
+            if not fut.done():
+                fut.cancel()
+
+    def _drop_cancelled(self):
+        while self._sleepers and self._sleepers[0][2].done():
+            heapq.heappop(self._sleepers)
+
+    def next_deadline(self) -> Optional[float]:
+        """Earliest pending sleeper deadline, or None."""
+        self._drop_cancelled()
+        return self._sleepers[0][0] if self._sleepers else None
+
+    def _is_sleeping(self, task: asyncio.Task) -> bool:
+        return any(t is task and not f.done() for _, _, f, t in self._sleepers)
+
+    async def _settle(self, task: Optional[asyncio.Task]):
+        # Let the woken task run to completion (or to its next virtual sleep). Real awaits
+        # inside it (e.g. an LLM call) are waited for in real time.
+        spins = 0
+        while task is not None and not task.done() and not self._is_sleeping(task):
+            await asyncio.sleep(0 if spins < 100 else 0.001)
+            spins += 1
+
+    async def advance_to(self, target: float):
+        """Move virtual time forward to target, firing every sleeper due on the way."""
+        while True:
+            self._drop_cancelled()
+            if not self._sleepers or self._sleepers[0][0] > target:
+                break
+            deadline, _, fut, task = heapq.heappop(self._sleepers)
+            self._now = max(self._now, deadline)
+            fut.set_result(None)
+            await self._settle(task)
+        self._now = max(self._now, target)
+
+    async def advance(self, delta: float):
+        await self.advance_to(self._now + delta)
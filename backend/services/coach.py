@@ -1,30 +1,41 @@
 import logging
+import os
 import time
 import json
-from typing import List, Optional, Dict, Literal
+from typing import Awaitable, Callable, List, Optional, Dict, Literal
 from core.analysis_engine.tactic_detection import TacticDetector
-from core.analysis_engine.tactic_detection_v2 import TacticDetectorV2
+from core.analysis_engine.tactic_detection_v2 import TacticDetectorV2, is_priority_cue
 from core.analysis_engine.schemas import TranscriptSegment, AnalysisResult
+from services.segment_buffer import SegmentRingBuffer
+from services.analysis_scheduler import AnalysisScheduler
+from services.line_gate import LineGate
+from services.clock import SystemClock
+from core.metrics import GATE_DECISIONS
+from core.tracing import record_span, span
 
 USE_TACTIC_DETECTOR_V2 = True
+# Priority cues bypass the analysis window but are still spaced at least this far apart
+PRIORITY_MIN_SPACING_SECONDS = float(os.getenv("PRIORITY_MIN_SPACING_SECONDS", "2"))
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class Coach:
-    def __init__(self, mode: Literal["debrief", "live"] = "debrief", negotiation_type: str = "General", user_speaker_id: int = 0):
+    def __init__(self, mode: Literal["debrief", "live"] = "debrief", negotiation_type: str = "General", user_speaker_id: int = 0, clock=None, tactic_engine: Optional[str] = None):
         self.mode = mode
+        # All window/spacing/dedupe timing reads this clock (a VirtualClock for replays)
+        self.clock = clock or SystemClock()
         self.negotiation_type = negotiation_type
         self.user_speaker_id = user_speaker_id # Default 0 is User
-        self.detector = TacticDetector() # Core engine V1
-        self.detector_v2 = TacticDetectorV2() # Core engine V2
+        self._detector = None # Core engine V1 (built on first use; it always needs an OpenAI key)
+        self.detector_v2 = TacticDetectorV2(engine=tactic_engine) # Core engine V2 (TACTIC_ENGINE unless given)
         self.last_analyzed_index = 0
         
-        # Buffer for windowed analysis
-        self.audio_buffer: List[TranscriptSegment] = []
+        # Buffer for windowed analysis (bounded; full history is in the SessionRecorder)
+        self.audio_buffer = SegmentRingBuffer()
         self.window_size_seconds = 15.0 
-        self.last_analysis_time = time.time()
+        self.last_analysis_time = self.clock.time()
         
         # Test Mode Logic
         self.test_mode_counterparty = False
@@ -33,10 +44,33 @@ class Coach:
         self._last_emit_key = None
         self._last_emit_ts = 0.0
         
+        # Trailing edge: counterparty lines skipped by the window are analyzed once the
+        # conversation settles. Results go to advice_callback (set by the WebSocket handler).
+        self.advice_callback: Optional[Callable[[dict], Awaitable[None]]] = None
+        self.scheduler = AnalysisScheduler(self._analyze_pending, clock=self.clock)
+        self._pending_target: Optional[int] = None
+        self._pending_priority = False
+        
+        # Pre-call gate (filler / low-information / near-duplicate lines) and skip-reason counts
+        self.line_gate = LineGate()
+        self.gate_counts = self.line_gate.counts
+        
         logger.info(f"Coach initialized | Mode: {mode} | Type: {negotiation_type} | User Speaker ID: {user_speaker_id}")
 
+    @property
+    def detector(self) -> TacticDetector:
+        if self._detector is None:
+            self._detector = TacticDetector()
+        return self._detector
+
+    @detector.setter
+    def detector(self, value: TacticDetector):
+        self._detector = value
+
     def set_mode(self, mode: Literal["debrief", "live"]):
         self.mode = mode
+        if mode != "live":
+            self.scheduler.clear()
         logger.info(f"Coach mode set to: {mode}")
 
     def set_negotiation_type(self, negotiation_type: str):
@@ -94,22 +128,28 @@ class Coach:
         # Default all others to COUNTERPARTY
         return "COUNTERPARTY"
 
-    async def process_transcript(self, transcript: str, speaker: str | int) -> Optional[str]:
+    def map_speaker(self, speaker) -> str:
+        """Role for a raw speaker as used in the analysis buffer (honors test mode)."""
+        if self.test_mode_counterparty:
+            return "COUNTERPARTY"
+        return self._role_label(speaker)
+
+    async def process_transcript(self, transcript: str, speaker: str | int, trace_id: Optional[str] = None) -> Optional[str]:
         """
         Ingests a new transcript line.
         Returns advice string ONLY if in Live Mode and a signal is detected.
         Otherwise buffers and returns None.
+        trace_id (from the STT stage) is kept on the segment and echoed in the advice.
         """
         # Map Role properly
-        mapped_role = self._role_label(speaker)
-        if self.test_mode_counterparty:
-            mapped_role = "COUNTERPARTY"
+        mapped_role = self.map_speaker(speaker)
         
         # Add to buffer with MAPPED speaker
         segment = TranscriptSegment(
             speaker=mapped_role,
             text=transcript,
-            timestamp=time.time()
+            timestamp=self.clock.time(),
+            trace_id=trace_id
         )
         self.audio_buffer.append(segment)
         
@@ -131,28 +171,99 @@ class Coach:
 
         # CHECK MODE: LIVE
         # Check window conditions
-        current_time = time.time()
+        current_time = self.clock.time()
         time_diff = current_time - self.last_analysis_time
         
+        # Trigger stage: high-value counterparty cues (amounts, deadlines, "my manager",
+        # "if you sign") skip the window; everything else waits for it
+        priority = mapped_role == "COUNTERPARTY" and is_priority_cue(transcript)
+        if priority and time_diff >= PRIORITY_MIN_SPACING_SECONDS:
+             logger.info(f"PRIORITY CUE: analyzing immediately ({time_diff:.1f}s since last analysis)")
+             self._clear_pending()
+             return await self._analyze_window()
+        
         # Only analyze if sufficient time passed OR this is the first eligible segment
         if time_diff >= self.window_size_seconds or self.last_analyzed_index == 0:
-             return await self._analyze_window()
+             # A user reply would gate the window; analyze the pending counterparty line instead
+             target = None
+             if mapped_role != "COUNTERPARTY" and not self.test_mode_counterparty:
+                 target = self._pending_target
+             self._clear_pending()
+             return await self._analyze_window(target_index=target)
+        
+        # Inside the window: schedule a trailing analysis of this line instead of dropping it
+        # (filler does not replace a pending substantive line)
+        if mapped_role == "COUNTERPARTY" and self.advice_callback is not None and \
+                self.line_gate.low_information_reason(transcript, priority=priority) is None:
+            self._pending_target = self.audio_buffer.total - 1
+            self._pending_priority = self._pending_priority or priority
+            spacing = PRIORITY_MIN_SPACING_SECONDS if self._pending_priority else self.window_size_seconds
+            self.scheduler.note_pending(current_time, self.last_analysis_time + spacing)
         
         return None
 
-    async def _analyze_window(self) -> Optional[str]:
+    def _count_gate(self, reason: str, trace_id: Optional[str] = None):
+        self.gate_counts[reason] += 1
+        GATE_DECISIONS.inc(reason=reason)
+        now = time.time()  # spans stay on wall-clock time
+        record_span("coach.gate", trace_id, now, now, decision=reason)
+
+    def _clear_pending(self):
+        self.scheduler.clear()
+        self._pending_target = None
+        self._pending_priority = False
+
+    async def _analyze_pending(self):
+        """
+        Scheduler callback: analyze the latest pending counterparty line (earlier pending
+        lines are in its context) and deliver any advice through advice_callback.
+        """
+        target = self._pending_target
+        self._pending_target = None
+        self._pending_priority = False
+        if target is None or self.mode != "live":
+            return
+        advice = await self._analyze_window(target_index=target)
+        if advice and self.advice_callback is not None:
+            await self.advice_callback(advice)
+
+    def close(self):
+        self.scheduler.clear()
+
+    async def _analyze_window(self, target_index: Optional[int] = None) -> Optional[str]:
         """
         Internal: Sends current buffer to Core Engine for analysis.
+        target_index (absolute segment index) analyzes that segment instead of the newest one.
         """
-        if not self.audio_buffer:
+        if target_index is None:
+            buffer_segments = self.audio_buffer[:]
+        else:
+            offset = target_index - self.audio_buffer.first_index
+            if offset < 0:
+                logger.info("Pending segment already left the analysis window; skipping")
+                return None
+            buffer_segments = self.audio_buffer[:offset + 1]
+        if not buffer_segments:
             return None
             
-        logger.info(f"Analyzing window: {len(self.audio_buffer)} segments")
+        logger.info(f"Analyzing window: {len(buffer_segments)} segments")
 
-        newest_segment = self.audio_buffer[-1]
+        newest_segment = buffer_segments[-1]
         if not self.test_mode_counterparty and newest_segment.speaker != "COUNTERPARTY":
             logger.info("GATED: newest segment is USER (no analysis)")
+            self._count_gate("user_line", newest_segment.trace_id)
+            return None
+        
+        # Pre-call gate: skip filler, low-information and repeated lines before paying for a call
+        gate_time = self.clock.time()
+        skip_reason = self.line_gate.check(newest_segment.text, gate_time, priority=is_priority_cue(newest_segment.text))
+        if skip_reason:
+            logger.info(f"GATED: {skip_reason} (no analysis) text=\"{newest_segment.text[:30]}\"")
+            now = time.time()
+            record_span("coach.gate", newest_segment.trace_id, now, now, decision=skip_reason)
             return None
+        self.line_gate.remember(newest_segment.text, gate_time)
+        self._count_gate("analyzed", newest_segment.trace_id)
         
         signals = []
         if USE_TACTIC_DETECTOR_V2:
@@ -160,7 +271,7 @@ class Coach:
             # Context = last ~12 lines
             # New = EXACTLY the last line (most recent)
             
-            context_segments = self.audio_buffer[-12:] 
+            context_segments = buffer_segments[-12:] 
             if not context_segments:
                 return None
                 
@@ -179,19 +290,20 @@ class Coach:
             
             logger.info(f"Coach V2 Analysis: 1 new segment (last-line), {len(context_segments)} context")
             
-            signals = await self.detector_v2.detect_tactics(
-                segments=context_segments, 
-                negotiation_type=self.negotiation_type,
-                new_segments=new_segments
-            )
+            with span("coach.detect", newest_segment.trace_id, context=len(context_segments)):
+                signals = await self.detector_v2.detect_tactics(
+                    segments=context_segments, 
+                    negotiation_type=self.negotiation_type,
+                    new_segments=new_segments
+                )
         else:
             # V1 Logic (Legacy)
-            window_segments = self.audio_buffer[-15:] 
+            window_segments = buffer_segments[-15:] 
             signals = await self.detector.detect_tactics(window_segments, self.negotiation_type)
         
         # Update last analysis time and index
-        self.last_analysis_time = time.time()
-        self.last_analyzed_index = len(self.audio_buffer)
+        self.last_analysis_time = self.clock.time()
+        self.last_analyzed_index = self.audio_buffer.total
         
         if signals:
             top_signal = max(signals, key=lambda s: s.confidence)
@@ -199,14 +311,16 @@ class Coach:
             # Silence "NONE" category signals (Explicit Gate)
             if top_signal.category == "NONE":
                 logger.info(f"GATED: NONE (silent)")
+                self._count_gate("none", newest_segment.trace_id)
                 return None
             
             # Dedupe Check
             dedupe_key = (top_signal.category, top_signal.subtype)
-            curr_time = time.time()
+            curr_time = self.clock.time()
             
             if dedupe_key == self._last_emit_key and (curr_time - self._last_emit_ts < 45.0):
                 logger.info(f"DEDUPED: {top_signal.category}({top_signal.subtype}) - Suppressed")
+                self._count_gate("deduped", newest_segment.trace_id)
                 return None
 
             # Update Dedupe State
@@ -223,7 +337,8 @@ class Coach:
                 "best_question": top_signal.best_question,
                 "options": top_signal.options,
                 "evidence": top_signal.evidence,
-                "timestamp": top_signal.timestamp
+                "timestamp": top_signal.timestamp,
+                "trace_id": newest_segment.trace_id
             }
             
             logger.info(f"Live Advice Generated: {top_signal.category} ({top_signal.subtype})")
@@ -231,9 +346,11 @@ class Coach:
             
         return None
 
-    async def generate_summary(self, transcript_text: str, outcome: dict, expanded: bool = False) -> dict:
+    async def generate_summary(self, transcript_text: str, outcome: dict, expanded: bool = False, on_progress: Optional[Callable[[int, int], None]] = None, prior_state: Optional[dict] = None) -> dict:
         """
         Delegate to Core Engine.
+        on_progress(analyzed, total) reports V2 signal aggregation progress.
+        prior_state is the session's running debrief state (V2 only).
         """
         if USE_TACTIC_DETECTOR_V2:
              # Pass the current coach context (e.g. 'Renewal', 'Vendor Pricing') to the engine
@@ -241,7 +358,9 @@ class Coach:
                  transcript_text, 
                  outcome, 
                  user_speaker_id=self.user_speaker_id,
-                 negotiation_type=self.coach_type
+                 negotiation_type=self.negotiation_type,
+                 on_progress=on_progress,
+                 prior_state=prior_state
              )
              return result.dict()
         else:
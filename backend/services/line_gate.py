@@ -0,0 +1,125 @@
+"""
+Pre-call gate for live analysis.
+
+Cheap local checks that run before a line is sent to the tactic detector: filler
+("okay", "mm-hmm"), lines with too few content words, and near-duplicates of lines
+analyzed moments ago. Skip reasons are counted so the savings are visible.
+
+Short lines can still be tactics ("No flexibility here.", "That is too expensive."), so
+priority cues and lines with a refusal, authority/policy or price-judgement word skip
+the content-word minimum.
+"""
+
+import logging
+import os
+import re
+import time
+from collections import Counter, deque
+from typing import Optional
+
+from core.analysis_engine.tactic_detection_v2 import is_priority_cue
+from core.metrics import GATE_DECISIONS
+
+logger = logging.getLogger(__name__)
+
+# Minimum content words (numbers count) for a line without priority cues
+GATE_MIN_CONTENT_WORDS = int(os.getenv("GATE_MIN_CONTENT_WORDS", "2"))
+# Character-trigram Jaccard similarity at which a line counts as a repeat
+GATE_SIMILARITY_THRESHOLD = float(os.getenv("GATE_SIMILARITY_THRESHOLD", "0.85"))
+# How long analyzed lines are remembered for near-duplicate checks
+GATE_DUPLICATE_WINDOW_SECONDS = float(os.getenv("GATE_DUPLICATE_WINDOW_SECONDS", "60"))
+
+# Backchannel only: answers ("yes"/"no") and judgements ("fine", "good") carry content
+_FILLER_WORDS = {
+    "ok", "okay", "k", "mm", "mmm", "hmm", "hm", "mhm", "mm-hmm", "mmhmm", "uh-huh", "uh", "um",
+    "er", "ah", "oh", "yeah", "yep", "yup", "right", "sure", "cool", "alright",
+    "got", "it", "i", "thanks", "thank", "you", "so", "well",
+    "totally", "exactly", "absolutely",
+}
+
+# Refusal, authority/policy and price-judgement words: a short line with one of these is
+# worth analyzing ("I cannot do that.", "No flexibility here.", "That is too expensive.")
+_FIRM_POSITION_WORDS = {
+    "no", "nope", "not", "never", "nothing", "cannot", "can't", "won't", "don't", "unable", "impossible",
+    "manager", "boss", "supervisor", "approval", "approve", "authority", "authorized", "policy",
+    "flexibility", "flexible", "final", "firm", "budget",
+    "expensive", "pricey", "costly", "steep", "cheap", "overpriced", "unfair", "fair", "reasonable",
+}
+
+_STOP_WORDS = {
+    "a", "an", "the", "and", "or", "but", "if", "of", "to", "in", "on", "at", "for", "with", "from",
+    "is", "are", "was", "were", "be", "been", "am", "it", "its", "it's", "this", "that", "these",
+    "those", "i", "you", "we", "they", "he", "she", "me", "my", "your", "our", "us", "them",
+    "do", "does", "did", "just", "so", "um", "uh", "yeah", "okay", "ok", "oh", "well", "like",
+    "then", "there", "here", "thing", "things", "think", "that's", "what", "really", "very", "too",
+    "all", "not", "have", "has", "had", "can", "will", "would", "could", "get", "know", "mean",
+}
+
+_TOKEN_RE = re.compile(r"[a-z0-9$][a-z0-9$'\-,.]*")
+
+
+def _tokens(text: str) -> list:
+    return [t.strip(".,'-") for t in _TOKEN_RE.findall(text.lower()) if t.strip(".,'-")]
+
+
+def _normalize(text: str) -> str:
+    return " ".join(_tokens(text))
+
+
+def _trigrams(normalized: str) -> set:
+    padded = f" {normalized} "
+    return {padded[i:i + 3] for i in range(max(1, len(padded) - 2))}
+
+
+class LineGate:
+    """Per-session pre-call gate with a short memory of analyzed lines."""
+
+    def __init__(self, min_content_words: Optional[int] = None, similarity_threshold: Optional[float] = None, window_seconds: Optional[float] = None, history: int = 8):
+        self.min_content_words = GATE_MIN_CONTENT_WORDS if min_content_words is None else min_content_words
+        self.similarity_threshold = GATE_SIMILARITY_THRESHOLD if similarity_threshold is None else similarity_threshold
+        self.window_seconds = GATE_DUPLICATE_WINDOW_SECONDS if window_seconds is None else window_seconds
+        self.counts: Counter = Counter()
+        self._recent: deque = deque(maxlen=history)
+
+    def low_information_reason(self, text: str, priority: Optional[bool] = None) -> Optional[str]:
+        """
+        'filler' / 'low_content' for lines not worth a call, else None. Does not count.
+        priority defaults to is_priority_cue(text).
+        """
+        tokens = _tokens(text)
+        if not tokens or all(t in _FILLER_WORDS for t in tokens):
+            return "filler"
+        if priority is None:
+            priority = is_priority_cue(text)
+        if priority or any(t in _FIRM_POSITION_WORDS for t in tokens):
+            # Amounts, deadlines, refusals etc. are worth a call even when short ("$40k.")
+            return None
+        content = [t for t in tokens if t not in _STOP_WORDS and t not in _FILLER_WORDS]
+        if len(content) < self.min_content_words:
+            return "low_content"
+        return None
+
+    def near_duplicate(self, text: str, now: Optional[float] = None) -> bool:
+        now = time.time() if now is None else now
+        grams = _trigrams(_normalize(text))
+        for ts, seen in self._recent:
+            if now - ts > self.window_seconds:
+                continue
+            union = len(grams | seen)
+            if union and len(grams & seen) / union >= self.similarity_threshold:
+                return True
+        return False
+
+    def check(self, text: str, now: Optional[float] = None, priority: Optional[bool] = None) -> Optional[str]:
+        """Returns the skip reason (and counts it), or None if the line should be analyzed."""
+        reason = self.low_information_reason(text, priority=priority)
+        if reason is None and self.near_duplicate(text, now):
+            reason = "near_duplicate"
+        if reason:
+            self.counts[reason] += 1
+            GATE_DECISIONS.inc(reason=reason)
+        return reason
+
+    def remember(self, text: str, now: Optional[float] = None):
+        """Record a line that was sent for analysis."""
+        self._recent.append((time.time() if now is None else now, _trigrams(_normalize(text))))
@@ -0,0 +1,299 @@
+"""
+Offline speech-to-text behind the AudioProcessor interface.
+
+LocalAudioProcessor takes the same 16 kHz mono linear16 frames as AudioProcessor and
+calls transcript_callback(text, speaker, trace_id) the same way, with no network:
+
+- Segmentation: frames are cut into utterances at LOCAL_STT_ENDPOINT_MS of non-speech
+  (the VAD's speech test), at audio the VAD withheld, or at LOCAL_STT_MAX_SEGMENT_SECONDS.
+- Inference: each utterance is transcribed by a whisper-family model (faster-whisper,
+  optional: pip install faster-whisper) in a process pool shared by all sessions.
+  A session keeps at most LOCAL_STT_MAX_INFLIGHT utterances in the pool and queues the
+  rest itself, so one busy session cannot fill the pool ahead of the others. Results
+  are emitted in utterance order.
+- Speakers: there is no diarization, so utterances are assigned to one of two speakers
+  by level and zero-crossing rate (a close mic and call audio usually differ in both).
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Callable, List, Optional
+
+import numpy as np
+
+from core.metrics import LOCAL_STT_DROPPED, LOCAL_STT_SECONDS
+from core.tracing import new_trace_id, record_span
+from services.audio_format import is_compressed
+from services.vad import VoiceActivityDetector, frame_features
+
+logger = logging.getLogger(__name__)
+
+# Default engine for new sessions; the config frame can choose with "stt_engine"
+STT_ENGINE = os.getenv("STT_ENGINE", "deepgram")
+STT_ENGINES = ("deepgram", "local")
+
+LOCAL_STT_MODEL = os.getenv("LOCAL_STT_MODEL", "base.en")
+LOCAL_STT_WORKERS = int(os.getenv("LOCAL_STT_WORKERS", str(max(1, (os.cpu_count() or 2) - 1))))
+# Threads per worker process; workers x threads should not exceed the cores
+LOCAL_STT_THREADS = int(os.getenv("LOCAL_STT_THREADS", "1"))
+LOCAL_STT_ENDPOINT_MS = int(os.getenv("LOCAL_STT_ENDPOINT_MS", "600"))
+LOCAL_STT_MAX_SEGMENT_SECONDS = float(os.getenv("LOCAL_STT_MAX_SEGMENT_SECONDS", "15"))
+LOCAL_STT_MAX_INFLIGHT = int(os.getenv("LOCAL_STT_MAX_INFLIGHT", "1"))
+# Utterances a session may queue behind its in-flight ones before the oldest is dropped
+LOCAL_STT_MAX_BACKLOG = int(os.getenv("LOCAL_STT_MAX_BACKLOG", "8"))
+# Utterances shorter than this (speech only) are noise, not worth a model call
+_MIN_SPEECH_SECONDS = 0.3
+
+_pool: Optional[ProcessPoolExecutor] = None
+# Loaded once per worker process
+_model = None
+
+
+def _load_model():
+    global _model
+    if _model is None:
+        from faster_whisper import WhisperModel
+        _model = WhisperModel(LOCAL_STT_MODEL, device="cpu", compute_type="int8", cpu_threads=LOCAL_STT_THREADS)
+    return _model
+
+
+def transcribe_pcm(pcm: bytes) -> str:
+    """Runs in a worker process: 16 kHz mono linear16 -> text."""
+    model = _load_model()
+    if not pcm:
+        return ""
+    audio = np.frombuffer(pcm, dtype="<i2").astype(np.float32) / 32768.0
+    segments, _ = model.transcribe(audio, language="en", beam_size=1, condition_on_previous_text=False)
+    return " ".join(segment.text.strip() for segment in segments).strip()
+
+
+def shared_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=LOCAL_STT_WORKERS)
+    return _pool
+
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+class EnergySpeakerTracker:
+    """
+    Two-speaker assignment from per-utterance (level dB, zero-crossing rate). The first
+    utterance defines speaker 0; one far enough from it starts speaker 1; after that each
+    utterance goes to the nearer profile, which drifts toward it.
+    """
+    # ZCR is scaled so 0.01 of ZCR weighs like 1 dB of level
+    ZCR_SCALE = 100.0
+    CHANGE_DISTANCE = 6.0
+    ADAPT = 0.2
+
+    def __init__(self):
+        self.profiles: List[np.ndarray] = []
+
+    def assign(self, level_db: float, zcr: float) -> int:
+        feature = np.array([level_db, zcr * self.ZCR_SCALE])
+        if not self.profiles:
+            self.profiles.append(feature)
+            return 0
+        distances = [float(np.linalg.norm(feature - p)) for p in self.profiles]
+        nearest = int(np.argmin(distances))
+        if len(self.profiles) < 2 and distances[nearest] > self.CHANGE_DISTANCE:
+            self.profiles.append(feature)
+            return 1
+        self.profiles[nearest] += self.ADAPT * (feature - self.profiles[nearest])
+        return nearest
+
+
+class LocalAudioProcessor:
+    """Drop-in for AudioProcessor (see main.py) that transcribes on this machine."""
+    # Compressed containers would need decoding first; clients fall back to PCM
+    supports_compressed = False
+
+    def __init__(self, transcript_callback, emit_interim: bool = False, endpointing_ms: Optional[int] = None, status_callback=None,
+                 executor: Optional[Executor] = None, transcriber: Callable[[bytes], str] = transcribe_pcm, max_inflight: Optional[int] = None):
+        self.transcript_callback = transcript_callback
+        self.status_callback = status_callback
+        self.emit_interim = emit_interim
+        self.endpointing_ms = LOCAL_STT_ENDPOINT_MS if endpointing_ms is None else int(endpointing_ms)
+        self.executor = executor
+        self.transcriber = transcriber
+        self.max_inflight = LOCAL_STT_MAX_INFLIGHT if max_inflight is None else max_inflight
+        self.bytes_per_second = 16000 * 2
+        self.vad = VoiceActivityDetector(bytes_per_second=self.bytes_per_second)
+        self.speakers = EnergySpeakerTracker()
+        self._connected = False
+        # Session audio time (received + withheld) and the utterance being collected
+        self._audio_seconds = 0.0
+        self._segment = bytearray()
+        self._segment_start = 0.0
+        self._speech_frames = []  # (seconds, level, zcr) of speech frames in the segment
+        self._silence_seconds = 0.0
+        # Utterances waiting for a pool slot, and in-flight/finished ones in order
+        self._backlog: deque = deque()
+        self._pending: deque = deque()
+        self._inflight = 0
+        self._results = asyncio.Event()
+        self._emit_task: Optional[asyncio.Task] = None
+        self.segments_transcribed = 0
+        self.segments_dropped = 0
+
+    @property
+    def connected(self) -> bool:
+        return self._connected
+
+    def set_emit_interim(self, enabled: bool):
+        # Utterances are only transcribed once complete; kept for interface parity
+        self.emit_interim = bool(enabled)
+
+    def set_endpointing(self, endpointing_ms: int):
+        self.endpointing_ms = int(endpointing_ms)
+        logger.info(f"LocalAudioProcessor endpointing set to: {self.endpointing_ms}ms")
+
+    async def set_stream_format(self, fmt: dict) -> bool:
+        return not is_compressed(fmt)
+
+    async def start(self) -> bool:
+        """Loads the model in a worker (first session pays for it). False if unavailable."""
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(self._executor(), self.transcriber, b"")
+        except ImportError as e:
+            logger.error(f"Local STT unavailable ({e}); install faster-whisper to use stt_engine=local")
+            return False
+        except Exception as e:
+            logger.error(f"Error starting local STT: {e}")
+            return False
+        self._connected = True
+        self._emit_task = asyncio.create_task(self._emit_loop())
+        logger.info(f"Local STT ready (model={LOCAL_STT_MODEL})")
+        return True
+
+    def _executor(self) -> Executor:
+        return self.executor if self.executor is not None else shared_pool()
+
+    async def send_audio(self, audio_data: bytes) -> bool:
+        if not self._connected:
+            return False
+        seconds = len(audio_data) / self.bytes_per_second
+        start = self._audio_seconds
+        self._audio_seconds += seconds
+        if self.vad.is_speech(audio_data):
+            if not self._speech_frames:
+                self._segment_start = start
+            self._speech_frames.append((seconds, *frame_features(audio_data)))
+            self._silence_seconds = 0.0
+        elif not self._speech_frames:
+            # Leading silence is not worth a model's time
+            return True
+        else:
+            self._silence_seconds += seconds
+        self._segment.extend(audio_data)
+        segment_seconds = len(self._segment) / self.bytes_per_second
+        if self._silence_seconds * 1000 >= self.endpointing_ms or segment_seconds >= LOCAL_STT_MAX_SEGMENT_SECONDS:
+            self._end_segment()
+        return True
+
+    def skip_audio(self, seconds: float):
+        """Audio withheld upstream (VAD) is silence: it ends the current utterance."""
+        self._end_segment()
+        self._audio_seconds += seconds
+
+    async def send_keepalive(self) -> bool:
+        return self._connected
+
+    def _end_segment(self):
+        speech = self._speech_frames
+        pcm = bytes(self._segment)
+        start = self._segment_start
+        self._segment.clear()
+        self._speech_frames = []
+        self._silence_seconds = 0.0
+        if sum(seconds for seconds, _, _ in speech) < _MIN_SPEECH_SECONDS:
+            return
+        level, zcr = np.mean(np.array([(l, z) for _, l, z in speech]), axis=0)
+        item = {
+            "pcm": pcm,
+            "start": start,
+            "duration": len(pcm) / self.bytes_per_second,
+            "speaker": self.speakers.assign(float(level), float(zcr)),
+            "future": None,
+        }
+        self._pending.append(item)
+        self._backlog.append(item)
+        while len(self._backlog) > LOCAL_STT_MAX_BACKLOG:
+            dropped = self._backlog.popleft()
+            self._pending.remove(dropped)
+            self.segments_dropped += 1
+            LOCAL_STT_DROPPED.inc()
+            logger.warning(f"Local STT falling behind; dropped a {dropped['duration']:.1f}s utterance")
+        self._submit()
+
+    def _submit(self, limit: Optional[int] = None):
+        loop = asyncio.get_running_loop()
+        limit = self.max_inflight if limit is None else limit
+        while self._backlog and self._inflight < limit:
+            item = self._backlog.popleft()
+            item["submitted"] = time.perf_counter()
+            item["future"] = loop.run_in_executor(self._executor(), self.transcriber, item["pcm"])
+            item["future"].add_done_callback(self._on_done)
+            self._inflight += 1
+
+    def _on_done(self, _future):
+        self._inflight -= 1
+        self._results.set()
+        if self._connected:
+            self._submit()
+
+    async def _emit_loop(self):
+        while True:
+            while not (self._pending and self._pending[0]["future"] is not None and self._pending[0]["future"].done()):
+                self._results.clear()
+                await self._results.wait()
+            item = self._pending.popleft()
+            try:
+                text = item["future"].result()
+            except Exception as e:
+                logger.error(f"Local STT inference failed: {e}")
+                continue
+            LOCAL_STT_SECONDS.observe(time.perf_counter() - item["submitted"])
+            self.segments_transcribed += 1
+            if text and self.transcript_callback:
+                self._emit(text, item)
+
+    def _emit(self, text: str, item: dict):
+        trace_id = new_trace_id()
+        logger.info(f"[Speaker {item['speaker']}] Local Final: {text}")
+        record_span(
+            "stt.final_to_callback", trace_id, time.time(),
+            speaker=item["speaker"],
+            speech_final=True,
+            audio_start=round(item["start"], 3),
+            audio_duration=round(item["duration"], 3),
+            engine="local",
+        )
+        self.transcript_callback(text, item["speaker"], trace_id)
+
+    async def stop(self, timeout: float = 5.0):
+        """Transcribes the last utterance and waits (bounded) for queued ones."""
+        if self._segment and self._connected:
+            self._end_segment()
+        self._connected = False
+        if self._emit_task is None:
+            return
+        # Everything still queued gets submitted; emit what finishes in time
+        self._submit(limit=self._inflight + len(self._backlog))
+        deadline = time.monotonic() + timeout
+        while self._pending and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        self._emit_task.cancel()
+        self._emit_task = None
+
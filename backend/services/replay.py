@@ -0,0 +1,153 @@
+"""
+Deterministic replay of a recorded session through Coach.
+
+Transcript lines from a session JSON (sessions/<id>.json) are fed to a live-mode Coach
+with their original inter-arrival gaps on a VirtualClock. speed scales the real time
+spent per virtual second (1 = real time, 10 = 10x, None = as fast as possible); the
+coach sees the same timeline either way, so with the local tactic engine the advice
+stream and gating decisions are identical across speeds.
+"""
+
+import asyncio
+import json
+import logging
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+
+from services.clock import VirtualClock
+from services.coach import Coach
+
+logger = logging.getLogger(__name__)
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, max(0, int(round(pct / 100 * (len(sorted_values) - 1)))))
+    return sorted_values[idx]
+
+
+def latency_stats(values_ms: List[float]) -> dict:
+    ordered = sorted(values_ms)
+    return {
+        "count": len(ordered),
+        "p50_ms": round(_percentile(ordered, 50), 3),
+        "p95_ms": round(_percentile(ordered, 95), 3),
+        "max_ms": round(ordered[-1], 3) if ordered else 0.0,
+    }
+
+
+def load_session_events(session_data: dict) -> List[dict]:
+    """
+    (offset_seconds, text, speaker) events from a session's transcripts, in order.
+    Offsets are relative to the first line; unparseable timestamps reuse the previous one.
+    """
+    events = []
+    first = None
+    prev = 0.0
+    for entry in session_data.get("transcripts", []):
+        text = (entry.get("text") or "").strip()
+        if not text:
+            continue
+        try:
+            ts = datetime.fromisoformat(entry.get("timestamp")).timestamp()
+            first = ts if first is None else first
+            offset = max(prev, ts - first)
+        except (TypeError, ValueError):
+            offset = prev
+        speaker = entry.get("speaker")
+        # The recorder stores speaker 0 as "unknown" (see SessionRecorder.add_transcript)
+        if speaker in (None, "unknown"):
+            speaker = 0
+        events.append({"offset": offset, "text": text, "speaker": speaker, "trace_id": entry.get("trace_id")})
+        prev = offset
+    return events
+
+
+class SessionReplay:
+    """Drives one Coach through a recorded session and collects what it produced."""
+
+    def __init__(self, session_data: dict, speed: Optional[float] = None, engine: str = "local", user_speaker_id: int = 0, negotiation_type: Optional[str] = None):
+        if speed is not None and speed <= 0:
+            raise ValueError("speed must be positive (or None for unbounded)")
+        self.session_data = session_data
+        self.speed = speed
+        self.events = load_session_events(session_data)
+        self.clock = VirtualClock(start=0.0)
+        self.coach = Coach(
+            mode="live",
+            negotiation_type=negotiation_type or session_data.get("negotiation_type", "General"),
+            user_speaker_id=user_speaker_id,
+            clock=self.clock,
+            tactic_engine=engine,
+        )
+        self.coach.advice_callback = self._on_scheduled_advice
+        self.advice: List[dict] = []
+        self._line_latencies_ms: List[float] = []
+        self._current_line = -1
+
+    async def _on_scheduled_advice(self, advice: dict):
+        self._record_advice(advice, source="trailing")
+
+    def _record_advice(self, advice: dict, source: str):
+        self.advice.append({
+            "offset": round(self.clock.time(), 3),
+            "line": self._current_line,
+            "source": source,
+            **advice,
+        })
+
+    async def _pace(self, target: float):
+        # Real-time pacing only; virtual time is moved by the clock
+        if self.speed is not None:
+            delay = (target - self.clock.time()) / self.speed
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+    async def _advance_to(self, target: float):
+        """Advance virtual time, firing trailing analyses that fall due on the way."""
+        while True:
+            deadline = self.clock.next_deadline()
+            if deadline is None or deadline > target:
+                break
+            await self._pace(deadline)
+            await self.clock.advance_to(deadline)
+        await self._pace(target)
+        await self.clock.advance_to(target)
+
+    async def run(self) -> dict:
+        wall_start = time.perf_counter()
+        for i, event in enumerate(self.events):
+            await self._advance_to(event["offset"])
+            self._current_line = i
+            start = time.perf_counter()
+            advice = await self.coach.process_transcript(event["text"], event["speaker"], trace_id=event["trace_id"])
+            self._line_latencies_ms.append((time.perf_counter() - start) * 1000)
+            if advice:
+                self._record_advice(advice, source="immediate")
+            # Let a trailing timer armed by this line register its (virtual) sleep
+            await asyncio.sleep(0)
+
+        # Let any trailing analysis still pending after the last line fire
+        while (deadline := self.clock.next_deadline()) is not None:
+            await self._advance_to(deadline)
+        self.coach.close()
+
+        return {
+            "session_id": self.session_data.get("session_id"),
+            "lines": len(self.events),
+            "speed": self.speed,
+            "virtual_seconds": round(self.clock.time(), 3),
+            "wall_seconds": round(time.perf_counter() - wall_start, 3),
+            "advice": self.advice,
+            "gate_counts": dict(self.coach.gate_counts),
+            "latency": latency_stats(self._line_latencies_ms),
+        }
+
+
+async def replay_session(session_path: str, speed: Optional[float] = None, engine: str = "local", user_speaker_id: int = 0) -> dict:
+    with open(Path(session_path)) as f:
+        session_data = json.load(f)
+    return await SessionReplay(session_data, speed=speed, engine=engine, user_speaker_id=user_speaker_id).run()
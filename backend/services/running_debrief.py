@@ -0,0 +1,182 @@
+"""
+Running debrief: builds the post-call analysis incrementally while the session is live.
+
+A low-priority background loop walks the recorded transcript with a cursor, classifies new
+opponent lines into a tactic timeline and folds them into rolling notes. The state is
+persisted with the session so the final summary only needs a short finalization call.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from typing import List, Optional
+
+from core.analysis_engine.schemas import TranscriptSegment
+
+logger = logging.getLogger(__name__)
+
+# Seconds between background updates
+RUNNING_DEBRIEF_INTERVAL = float(os.getenv("RUNNING_DEBRIEF_INTERVAL", "20"))
+# Updates wait until the conversation has been quiet this long (live advice goes first)...
+RUNNING_DEBRIEF_IDLE_SECONDS = float(os.getenv("RUNNING_DEBRIEF_IDLE_SECONDS", "2"))
+# ...unless this many lines are waiting
+RUNNING_DEBRIEF_MAX_BACKLOG = int(os.getenv("RUNNING_DEBRIEF_MAX_BACKLOG", "40"))
+# Upper bound on the catch-up step when the session closes
+RUNNING_DEBRIEF_FLUSH_TIMEOUT = float(os.getenv("RUNNING_DEBRIEF_FLUSH_TIMEOUT", "15"))
+
+
+def transcript_digest(transcripts: List[dict]) -> str:
+    """Hash of the recorded transcript entries a running debrief state covers."""
+    h = hashlib.sha256()
+    for t in transcripts:
+        h.update(f"{str(t.get('speaker', '')).strip().lower()}\x1f{str(t.get('text', '')).strip()}\x1e".encode("utf-8"))
+    return h.hexdigest()
+
+
+def usable_running_debrief(session_data: dict) -> Optional[dict]:
+    """
+    Returns the stored running debrief state if it still matches the session transcript,
+    i.e. nothing it covered was edited (e.g. a speaker swap) since it was built.
+    """
+    state = session_data.get("running_debrief")
+    if not state or not state.get("covered_lines"):
+        return None
+    transcripts = session_data.get("transcripts", [])
+    covered = state["covered_lines"]
+    if covered > len(transcripts):
+        return None
+    if state.get("negotiation_type", "General") != session_data.get("negotiation_type", "General"):
+        return None
+    if state.get("digest") != transcript_digest(transcripts[:covered]):
+        logger.info("Running debrief is stale (transcript edited); falling back to full summary")
+        return None
+    return state
+
+
+class RunningDebrief:
+    """Background incremental debrief for one live session."""
+
+    def __init__(self, coach, recorder, interval_seconds: Optional[float] = None):
+        self.coach = coach
+        self.recorder = recorder
+        self.interval_seconds = RUNNING_DEBRIEF_INTERVAL if interval_seconds is None else interval_seconds
+        self.state = {
+            "covered_lines": 0,
+            "summary_lines": 0,
+            "timeline": [],
+            "rolling_summary": "",
+            "digest": transcript_digest([]),
+            "negotiation_type": coach.negotiation_type,
+            "updated_at": None,
+        }
+        self._task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+            logger.info(f"Running debrief started (every {self.interval_seconds}s)")
+
+    async def stop(self, flush: bool = True):
+        """Stops the loop; with flush=True, catches up on remaining lines first."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if flush:
+            try:
+                await asyncio.wait_for(self.step(), timeout=RUNNING_DEBRIEF_FLUSH_TIMEOUT)
+            except asyncio.TimeoutError:
+                logger.warning("Running debrief flush timed out; final summary will cover the rest")
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            try:
+                if self._should_defer():
+                    continue
+                await self.step()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Running debrief update failed: {e}")
+
+    def _should_defer(self) -> bool:
+        # Low priority: let live analysis have the conversation's busy moments
+        backlog = len(self.recorder.transcripts) - self.state["covered_lines"]
+        if backlog <= 0:
+            return True
+        if backlog >= RUNNING_DEBRIEF_MAX_BACKLOG:
+            return False
+        buffer = self.coach.audio_buffer
+        last_ts = buffer[-1].timestamp if buffer else 0.0
+        return time.time() - last_ts < RUNNING_DEBRIEF_IDLE_SECONDS
+
+    def _segments(self, start: int, end: int) -> List[TranscriptSegment]:
+        segments = []
+        for t in self.recorder.transcripts[start:end]:
+            speaker = t.get("speaker")
+            # The recorder stores speaker 0 as "unknown" (same rule as the summary normalization)
+            if speaker == "unknown" and self.coach.user_speaker_id == 0:
+                speaker = 0
+            segments.append(TranscriptSegment(speaker=self.coach.map_speaker(speaker), text=t.get("text", "")))
+        return segments
+
+    async def step(self) -> int:
+        """
+        Processes lines added since the last update. Returns the number of lines covered.
+        """
+        async with self._lock:
+            start = self.state["covered_lines"]
+            # The coach only keeps a short window; read history from the recorder so line
+            # numbers match the saved transcript
+            end = len(self.recorder.transcripts)
+            if end <= start:
+                return 0
+            new_segments = self._segments(start, end)
+            detector = self.coach.detector_v2
+            negotiation_type = self.coach.negotiation_type
+
+            opponent = [(start + i, seg) for i, seg in enumerate(new_segments) if seg.speaker != "USER"]
+            timeline = []
+            if opponent:
+                results = await detector.detect_tactics_batch([seg for _, seg in opponent], negotiation_type=negotiation_type)
+                for (line, seg), signals in zip(opponent, results):
+                    for sig in signals:
+                        if sig.category != "NONE":
+                            timeline.append({
+                                "line": line,
+                                "category": sig.category,
+                                "subtype": sig.subtype,
+                                "confidence": sig.confidence,
+                                "snippet": seg.text[:60] + "..." if len(seg.text) > 60 else seg.text,
+                            })
+
+            # Notes only advance when the update succeeds; summary_lines records how far they reach,
+            # so a failed update is caught up on the next step
+            summary_lines = self.state["summary_lines"]
+            notes = await detector.update_running_summary(
+                self.state["rolling_summary"], self._segments(summary_lines, end), negotiation_type=negotiation_type
+            )
+            if notes is not None:
+                summary_lines = end
+            else:
+                notes = self.state["rolling_summary"]
+
+            self.state = {
+                "covered_lines": end,
+                "summary_lines": summary_lines,
+                "timeline": self.state["timeline"] + timeline,
+                "rolling_summary": notes,
+                "digest": transcript_digest(self.recorder.transcripts[:end]),
+                "negotiation_type": negotiation_type,
+                "updated_at": time.time(),
+            }
+            self.recorder.set_running_debrief(self.state)
+            logger.info(f"Running debrief covered lines {start}-{end} ({len(timeline)} signals)")
+            return end - start
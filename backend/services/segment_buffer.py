@@ -0,0 +1,69 @@
+"""
+Fixed-capacity ring buffer for the Coach analysis window.
+
+Live analysis only reads the last few segments, so the buffer keeps O(window) segments
+per session instead of the whole call. Full history lives in the SessionRecorder; evicted
+segments can additionally be handed to a spill callback.
+"""
+
+import logging
+import os
+from collections import deque
+from typing import Callable, Iterator, List, Optional, Union
+
+from core.analysis_engine.schemas import TranscriptSegment
+
+logger = logging.getLogger(__name__)
+
+# Segments kept for analysis (V2 reads the last 12, V1 the last 15)
+COACH_BUFFER_CAPACITY = int(os.getenv("COACH_BUFFER_CAPACITY", "32"))
+
+
+class SegmentRingBuffer:
+    """
+    List-like window over the most recent segments.
+    Indexing and slicing are relative to the retained segments (buffer[-1] is the newest);
+    `total` counts every segment ever appended.
+    """
+
+    def __init__(self, capacity: Optional[int] = None, on_spill: Optional[Callable[[TranscriptSegment], None]] = None):
+        self.capacity = max(1, int(capacity or COACH_BUFFER_CAPACITY))
+        self.on_spill = on_spill
+        self.total = 0
+        self._items: deque = deque(maxlen=self.capacity)
+
+    def append(self, segment: TranscriptSegment):
+        if len(self._items) == self.capacity and self.on_spill is not None:
+            try:
+                self.on_spill(self._items[0])
+            except Exception as e:
+                logger.warning(f"Segment spill failed: {e}")
+        self._items.append(segment)
+        self.total += 1
+
+    @property
+    def first_index(self) -> int:
+        """Absolute index (0-based over the whole session) of the oldest retained segment."""
+        return self.total - len(self._items)
+
+    def since(self, index: int) -> List[TranscriptSegment]:
+        """Retained segments with absolute index >= index."""
+        offset = max(0, index - self.first_index)
+        return list(self._items)[offset:]
+
+    def clear(self):
+        self._items.clear()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __bool__(self) -> bool:
+        return bool(self._items)
+
+    def __iter__(self) -> Iterator[TranscriptSegment]:
+        return iter(self._items)
+
+    def __getitem__(self, key: Union[int, slice]):
+        if isinstance(key, slice):
+            return list(self._items)[key]
+        return self._items[key]
@@ -7,13 +7,34 @@ Saves transcripts and advice to local JSON files for user review.
 import os
 import json
 import logging
+import time
 from datetime import datetime
 from pathlib import Path
 from typing import Optional
 
+from services.summary_cache import invalidate_summary_cache
+from core.metrics import STAGE_SECONDS
+from core.tracing import span
+
 logger = logging.getLogger(__name__)
 
 
+def sessions_root() -> Path:
+    """
+    Directory holding session JSON files: SESSIONS_DIR if set, else <project root>/sessions.
+    Read on every call so tests and benchmarks can point it at a scratch directory.
+    """
+    override = os.getenv("SESSIONS_DIR")
+    if override:
+        return Path(override)
+    # Resolve project root from this file: backend/services/session_recorder.py -> .../equalizer
+    return Path(__file__).resolve().parent.parent.parent / "sessions"
+
+
+def session_path(session_id: str) -> Path:
+    return sessions_root() / f"{session_id}.json"
+
+
 class SessionRecorder:
     """Records session transcripts and advice to local JSON files."""
     
@@ -25,6 +46,9 @@ class SessionRecorder:
         self.advice_given: list[dict] = []
         # Outcome data
         self.outcome: Optional[dict] = None
+        # Incremental debrief state (only when the running debrief is enabled)
+        self.running_debrief: Optional[dict] = None
+        self.audio_stats: Optional[dict] = None
         
         self.session_start = datetime.now().isoformat()
         
@@ -36,23 +60,35 @@ class SessionRecorder:
         self._save()  # Create initial file
     
     def _get_sessions_dir(self) -> Path:
-        """Get or create the sessions directory in the project root."""
-        # Resolve project root from this file: backend/services/session_recorder.py -> .../equalizer
-        project_root = Path(__file__).resolve().parent.parent.parent
-        sessions_dir = project_root / "sessions"
+        """Get or create the sessions directory (see sessions_root)."""
+        sessions_dir = sessions_root()
         sessions_dir.mkdir(parents=True, exist_ok=True)
         return sessions_dir
     
-    def add_transcript(self, transcript: str, speaker: Optional[str] = None):
-        """Add a transcript entry to the session."""
+    def _transcript_entry(self, transcript: str, speaker: Optional[str], trace_id: Optional[str]) -> dict:
         entry = {
             "timestamp": datetime.now().isoformat(),
             "text": transcript,
             "speaker": speaker or "unknown"
         }
-        self.transcripts.append(entry)
-        self._save()
+        if trace_id:
+            entry["trace_id"] = trace_id
+        return entry
+
+    def add_transcript(self, transcript: str, speaker: Optional[str] = None, trace_id: Optional[str] = None):
+        """Add a transcript entry to the session."""
+        self.transcripts.append(self._transcript_entry(transcript, speaker, trace_id))
+        with span("recorder.flush", trace_id, transcripts=len(self.transcripts)):
+            self._save()
         logger.debug(f"Transcript added: {transcript[:50]}...")
+
+    def add_transcripts(self, lines: list):
+        """Add several (transcript, speaker, trace_id) entries with a single write."""
+        for transcript, speaker, trace_id in lines:
+            self.transcripts.append(self._transcript_entry(transcript, speaker, trace_id))
+        with span("recorder.flush", lines[-1][2] if lines else None, transcripts=len(self.transcripts), batch=len(lines)):
+            self._save()
+        logger.debug(f"{len(lines)} transcripts added")
     
     def add_advice(self, advice: str):
         """Add an advice entry to the session."""
@@ -70,6 +106,15 @@ class SessionRecorder:
         self.personality = personality
         self._save()
     
+    def set_running_debrief(self, state: dict):
+        """Store the latest running debrief state with the session."""
+        self.running_debrief = state
+        self._save()
+
+    def set_audio_stats(self, stats: dict):
+        """Store audio ingestion stats (VAD savings etc.); written with the next save."""
+        self.audio_stats = stats
+
     def set_outcome(self, result: str, confidence: int, notes: str = ""):
         """
         Set the outcome of the negotiation.
@@ -103,12 +148,18 @@ class SessionRecorder:
                 "total_advice": len(self.advice_given)
             }
         }
+        if self.running_debrief is not None:
+            session_data["running_debrief"] = self.running_debrief
+        if self.audio_stats is not None:
+            session_data["audio"] = self.audio_stats
         
+        start = time.perf_counter()
         try:
             with open(self.session_file, 'w') as f:
                 json.dump(session_data, f, indent=2)
         except Exception as e:
             logger.error(f"Error saving session: {e}")
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage="recorder_flush")
     
     def close(self):
         """Finalize and save the session."""
@@ -124,15 +175,13 @@ class SessionRecorder:
         Retains negotiation_type from existing file if present, or defaults to "General".
         """
         try:
-            # Resolve project root: backend/services/session_recorder.py -> .../equalizer
-            project_root = Path(__file__).resolve().parent.parent.parent
-            session_path = project_root / "sessions" / f"{session_id}.json"
+            path = session_path(session_id)
             
-            if not session_path.exists():
-                logger.error(f"Session file not found: {session_path}")
+            if not path.exists():
+                logger.error(f"Session file not found: {path}")
                 return False
 
-            with open(session_path, 'r') as f:
+            with open(path, 'r') as f:
                 data = json.load(f)
             
             # Source negotiation_type from session context (file data), or default
@@ -145,8 +194,9 @@ class SessionRecorder:
                 "negotiation_type": negotiation_type,
                 "timestamp": datetime.now().isoformat()
             }
+            invalidate_summary_cache(data)
             
-            with open(session_path, 'w') as f:
+            with open(path, 'w') as f:
                 json.dump(data, f, indent=2)
                 
             logger.info(f"Outcome updated for session {session_id}")
@@ -162,9 +212,7 @@ class SessionRecorder:
         Returns list sorted by date descending (newest first).
         """
         try:
-            # Resolve project root: backend/services/session_recorder.py -> .../equalizer
-            project_root = Path(__file__).resolve().parent.parent.parent
-            sessions_dir = project_root / "sessions"
+            sessions_dir = sessions_root()
             
             if not sessions_dir.exists():
                 return []
@@ -214,9 +262,7 @@ class SessionRecorder:
     def get_session(session_id: str) -> Optional[dict]:
         """Retrieve full session data by ID."""
         try:
-            # Resolve project root
-            project_root = Path(__file__).resolve().parent.parent.parent
-            session_file = project_root / "sessions" / f"{session_id}.json"
+            session_file = session_path(session_id)
             
             if not session_file.exists():
                 return None
@@ -236,8 +282,7 @@ class SessionRecorder:
             transcript_index: The index in the 'transcripts' array to swap
         """
         try:
-            project_root = Path(__file__).resolve().parent.parent.parent
-            session_file = project_root / "sessions" / f"{session_id}.json"
+            session_file = session_path(session_id)
             
             if not session_file.exists():
                 logger.error(f"Session {session_id} not found")
@@ -267,6 +312,7 @@ class SessionRecorder:
                 
             transcripts[transcript_index]["speaker"] = new_speaker
             data["transcripts"] = transcripts
+            invalidate_summary_cache(data)
             
             with open(session_file, 'w') as f:
                 json.dump(data, f, indent=2)
@@ -0,0 +1,175 @@
+"""
+Pre-opened Deepgram connections, so a new session does not pay DNS + TLS + handshake
+before its first audio.
+
+Idle connections are kept open with KeepAlive messages (Deepgram closes a stream that
+gets neither audio nor KeepAlive for ~10s) and recycled after STT_POOL_MAX_IDLE_SECONDS.
+The pool is sized from recent demand: an EWMA of sessions started per maintenance tick,
+rounded up and clamped to [STT_POOL_MIN_SIZE, STT_POOL_SIZE].
+
+If pre-opening fails (bad key, no network) the pool retries with exponential backoff,
+capped at STT_POOL_RETRY_MAX_SECONDS, instead of on every tick.
+
+A pooled connection is only handed out for the exact URL it was opened with; a session
+asking for other parameters (e.g. a different endpointing) gets a fresh dial.
+"""
+
+import asyncio
+import json
+import logging
+import math
+import os
+import time
+from collections import deque
+from typing import Optional
+
+import websockets
+from websockets.protocol import State
+
+from core.metrics import STT_POOL_ACQUIRES, STT_POOL_IDLE
+
+logger = logging.getLogger(__name__)
+
+# Max idle connections kept open (0 disables the pool) and the floor kept warm
+STT_POOL_SIZE = int(os.getenv("STT_POOL_SIZE", "2"))
+STT_POOL_MIN_SIZE = int(os.getenv("STT_POOL_MIN_SIZE", "1"))
+# Maintenance tick: KeepAlive to idle connections, demand update, resize
+STT_KEEPALIVE_SECONDS = float(os.getenv("STT_KEEPALIVE_SECONDS", "5"))
+STT_POOL_MAX_IDLE_SECONDS = float(os.getenv("STT_POOL_MAX_IDLE_SECONDS", "300"))
+# Backoff between failed pre-opens: 1s, 2s, 4s, ... up to this
+STT_POOL_RETRY_MAX_SECONDS = float(os.getenv("STT_POOL_RETRY_MAX_SECONDS", "60"))
+_RETRY_BASE_SECONDS = 1.0
+# Weight of the latest tick in the demand average
+_DEMAND_ALPHA = 0.3
+
+KEEPALIVE_MESSAGE = json.dumps({"type": "KeepAlive"})
+
+
+def _is_open(ws) -> bool:
+    return getattr(ws, "state", None) is State.OPEN
+
+
+class DeepgramConnectionPool:
+    def __init__(self, url: str, headers: dict, max_size: Optional[int] = None, min_size: Optional[int] = None, keepalive_seconds: Optional[float] = None, max_idle_seconds: Optional[float] = None):
+        self.url = url
+        self.headers = headers
+        self.max_size = STT_POOL_SIZE if max_size is None else max_size
+        self.min_size = min(self.max_size, STT_POOL_MIN_SIZE if min_size is None else min_size)
+        self.keepalive_seconds = STT_KEEPALIVE_SECONDS if keepalive_seconds is None else keepalive_seconds
+        self.max_idle_seconds = STT_POOL_MAX_IDLE_SECONDS if max_idle_seconds is None else max_idle_seconds
+        self._idle: deque = deque()  # (ws, opened_at)
+        self._task: Optional[asyncio.Task] = None
+        self._wake = asyncio.Event()
+        self._acquired_since_tick = 0
+        # EWMA of pooled-URL acquisitions per tick
+        self.demand = 0.0
+        self.hits = 0
+        self.misses = 0
+        # Consecutive failed fills, and when the next one may be tried
+        self.fill_failures = 0
+        self._retry_at = 0.0
+
+    @property
+    def idle(self) -> int:
+        return len(self._idle)
+
+    @property
+    def target_size(self) -> int:
+        return min(self.max_size, max(self.min_size, math.ceil(self.demand)))
+
+    def start(self):
+        """Start filling and maintaining the pool on the running loop (idempotent)."""
+        if self.max_size <= 0 or (self._task is not None and not self._task.done()):
+            return
+        self._task = asyncio.get_running_loop().create_task(self._maintain())
+
+    async def acquire(self, url: str, headers: Optional[dict] = None):
+        """An open connection for url: a pooled one if it matches, otherwise dialed now."""
+        if url == self.url:
+            self._acquired_since_tick += 1
+            while self._idle:
+                ws, _ = self._idle.popleft()
+                self._update_idle_gauge()
+                if _is_open(ws):
+                    self.hits += 1
+                    STT_POOL_ACQUIRES.inc(result="hit")
+                    # Replace it in the background
+                    self._wake.set()
+                    return ws
+                await self._discard(ws)
+        self.misses += 1
+        STT_POOL_ACQUIRES.inc(result="miss")
+        return await websockets.connect(url, additional_headers=headers or self.headers)
+
+    async def _maintain(self):
+        next_tick = time.monotonic() + self.keepalive_seconds
+        while True:
+            if time.monotonic() >= self._retry_at:
+                try:
+                    await self._fill()
+                    self.fill_failures = 0
+                except Exception as e:
+                    self.fill_failures += 1
+                    delay = min(STT_POOL_RETRY_MAX_SECONDS, _RETRY_BASE_SECONDS * 2 ** (self.fill_failures - 1))
+                    self._retry_at = time.monotonic() + delay
+                    logger.warning(f"STT pool could not pre-open a connection (attempt {self.fill_failures}, retry in {delay:.0f}s): {e}")
+            wake_at = min(next_tick, self._retry_at) if self.fill_failures else next_tick
+            try:
+                await asyncio.wait_for(self._wake.wait(), max(0.0, wake_at - time.monotonic()))
+                self._wake.clear()
+                continue
+            except asyncio.TimeoutError:
+                pass
+            if time.monotonic() < next_tick:
+                # Woke up for a retry, not a tick
+                continue
+            next_tick = time.monotonic() + self.keepalive_seconds
+            try:
+                await self._tick()
+            except Exception as e:
+                logger.error(f"STT pool maintenance error: {e}")
+
+    async def _fill(self):
+        while len(self._idle) < self.target_size:
+            ws = await websockets.connect(self.url, additional_headers=self.headers)
+            self._idle.append((ws, time.monotonic()))
+            self._update_idle_gauge()
+
+    async def _tick(self):
+        self.demand = _DEMAND_ALPHA * self._acquired_since_tick + (1 - _DEMAND_ALPHA) * self.demand
+        self._acquired_since_tick = 0
+        now = time.monotonic()
+        kept = deque()
+        while self._idle:
+            ws, opened_at = self._idle.popleft()
+            if not _is_open(ws) or now - opened_at > self.max_idle_seconds:
+                await self._discard(ws)
+                continue
+            try:
+                await ws.send(KEEPALIVE_MESSAGE)
+            except Exception:
+                await self._discard(ws)
+                continue
+            kept.append((ws, opened_at))
+        # Shrink from the oldest end when demand has dropped
+        while len(kept) > self.target_size:
+            await self._discard(kept.popleft()[0])
+        self._idle = kept
+        self._update_idle_gauge()
+
+    async def _discard(self, ws):
+        try:
+            await ws.close()
+        except Exception:
+            pass
+
+    def _update_idle_gauge(self):
+        STT_POOL_IDLE.set(len(self._idle))
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        while self._idle:
+            await self._discard(self._idle.popleft()[0])
+        self._update_idle_gauge()
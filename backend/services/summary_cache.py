@@ -0,0 +1,46 @@
+"""
+Content-addressed cache for post-session reflections.
+
+The cache key hashes everything the summary depends on (normalized transcript,
+outcome, negotiation type, expanded flag, prompt version), so a stored reflection
+is reused only while none of those inputs have changed.
+"""
+
+import hashlib
+import json
+from typing import Optional
+
+from core.analysis_engine.tactic_detection_v2 import SUMMARY_PROMPT_VERSION
+
+
+def summary_cache_key(transcripts: list[dict], outcome: Optional[dict], negotiation_type: str, expanded: bool) -> str:
+    """SHA-256 over the normalized summary inputs."""
+    outcome = outcome or {}
+    payload = {
+        "transcripts": [
+            [str(t.get("speaker", "unknown")).strip().lower(), " ".join(str(t.get("text", "")).split())]
+            for t in transcripts
+        ],
+        # Outcome timestamp is bookkeeping only; re-saving the same outcome keeps the key
+        "outcome": {k: outcome.get(k) for k in ("result", "confidence", "notes")},
+        "negotiation_type": negotiation_type,
+        "expanded": bool(expanded),
+        "prompt_version": SUMMARY_PROMPT_VERSION,
+    }
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def get_cached_summary(session_data: dict, cache_key: str) -> Optional[dict]:
+    """Return the stored reflection if it was generated for this exact key."""
+    details = session_data.get("summary_details") or {}
+    if details.get("cache_key") == cache_key and session_data.get("reflection"):
+        return session_data["reflection"]
+    return None
+
+
+def invalidate_summary_cache(session_data: dict):
+    """Drop the cache key so the next summary request regenerates the reflection."""
+    details = session_data.get("summary_details")
+    if isinstance(details, dict):
+        details.pop("cache_key", None)
@@ -0,0 +1,111 @@
+"""
+Background job queue for post-session summaries.
+
+Summary generation is submitted as a job and runs off the request path, so clients
+poll for status/progress instead of holding the HTTP request open. Submissions for a
+session that is already queued or running return the existing job.
+"""
+
+import asyncio
+import logging
+import os
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Awaitable, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Finished jobs kept around for polling before the oldest are dropped
+MAX_FINISHED_JOBS = 200
+
+
+class SummaryJobQueue:
+    """In-process summary job queue with bounded concurrency and per-session dedupe."""
+
+    def __init__(self, runner: Callable[..., Awaitable[dict]], max_concurrency: Optional[int] = None):
+        """
+        Args:
+            runner: async (session_id, expanded=..., on_progress=...) -> summary dict
+            max_concurrency: jobs generating at once (default SUMMARY_JOB_CONCURRENCY or 2)
+        """
+        self.runner = runner
+        self.max_concurrency = max(1, int(max_concurrency or os.getenv("SUMMARY_JOB_CONCURRENCY", "2")))
+        self.jobs: "OrderedDict[str, dict]" = OrderedDict()
+        self._active: dict[tuple, str] = {}
+        self._tasks: dict[str, asyncio.Task] = {}
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def submit(self, session_id: str, expanded: bool = False) -> dict:
+        """Queue a summary job, or return the queued/running job for the same request."""
+        key = (session_id, bool(expanded))
+        existing = self._active.get(key)
+        if existing:
+            logger.info(f"Summary job deduped for session {session_id}: {existing}")
+            return self.jobs[existing]
+
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        job = {
+            "job_id": uuid.uuid4().hex,
+            "session_id": session_id,
+            "expanded": bool(expanded),
+            "status": "queued",
+            "progress": {"analyzed": 0, "total": 0},
+            "result": None,
+            "error": None,
+            "submitted_at": datetime.now().isoformat(),
+            "started_at": None,
+            "finished_at": None,
+        }
+        self.jobs[job["job_id"]] = job
+        self._active[key] = job["job_id"]
+        self._tasks[job["job_id"]] = asyncio.create_task(self._run(job, key))
+        logger.info(f"Summary job queued: {job['job_id']} (session {session_id})")
+        return job
+
+    def get(self, job_id: str) -> Optional[dict]:
+        return self.jobs.get(job_id)
+
+    async def wait(self, job: dict) -> dict:
+        """Wait for a job to finish; the job keeps running if the waiter is cancelled."""
+        task = self._tasks.get(job["job_id"])
+        if task is not None:
+            await asyncio.shield(task)
+        return job
+
+    @staticmethod
+    def describe(job: dict, include_result: bool = False) -> dict:
+        """JSON-safe view of a job for API responses."""
+        view = {k: v for k, v in job.items() if k != "result"}
+        view["progress"] = dict(job["progress"])
+        if include_result:
+            view["result"] = job["result"]
+        return view
+
+    async def _run(self, job: dict, key: tuple):
+        try:
+            async with self._semaphore:
+                job["status"] = "running"
+                job["started_at"] = datetime.now().isoformat()
+
+                def on_progress(analyzed: int, total: int):
+                    job["progress"] = {"analyzed": analyzed, "total": total}
+
+                job["result"] = await self.runner(job["session_id"], expanded=job["expanded"], on_progress=on_progress)
+                job["status"] = "done"
+        except Exception as e:
+            logger.error(f"Summary job {job['job_id']} failed: {e}")
+            job["status"] = "failed"
+            job["error"] = str(e)
+        finally:
+            job["finished_at"] = datetime.now().isoformat()
+            self._active.pop(key, None)
+            self._tasks.pop(job["job_id"], None)
+            self._prune()
+
+    def _prune(self):
+        finished = [jid for jid, j in self.jobs.items() if j["status"] in ("done", "failed")]
+        for jid in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            self.jobs.pop(jid, None)
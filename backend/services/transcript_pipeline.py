@@ -0,0 +1,146 @@
+"""
+Per-connection transcript pipeline.
+
+The STT callback only enqueues. Two consumers run per WebSocket connection:
+
+- analysis: a single task that feeds lines to Coach strictly in arrival order (one
+  process_transcript at a time), runs trailing-edge analyses in the same queue, and
+  delivers advice. Coach state (buffer, last_analysis_time, dedupe) is never touched
+  concurrently.
+- persistence: appends lines to the SessionRecorder and writes the session file once per
+  drained batch instead of once per line.
+
+The analysis queue is bounded. When it is full the oldest queued line is dropped (and
+counted): stale lines are worth less to live advice than fresh ones, and the recorder
+still gets every line because persistence has its own unbounded queue.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from typing import Awaitable, Callable, Optional
+
+from core.metrics import PIPELINE_DROPPED, PIPELINE_QUEUE_DEPTH, STAGE_SECONDS
+from core.tracing import record_span
+
+logger = logging.getLogger(__name__)
+
+# Lines waiting for analysis per connection before the oldest is dropped
+TRANSCRIPT_QUEUE_SIZE = int(os.getenv("TRANSCRIPT_QUEUE_SIZE", "32"))
+# Upper bound on draining both queues when the connection closes
+PIPELINE_DRAIN_TIMEOUT = float(os.getenv("PIPELINE_DRAIN_TIMEOUT", "10"))
+
+# Queue item that runs the coach's pending trailing-edge analysis
+_TRAILING = object()
+# Queue item that stops a consumer
+_STOP = object()
+
+
+class TranscriptPipeline:
+    def __init__(self, coach, recorder, deliver: Callable[[dict], Awaitable[None]], maxsize: Optional[int] = None):
+        self.coach = coach
+        self.recorder = recorder
+        self.deliver = deliver
+        self.maxsize = TRANSCRIPT_QUEUE_SIZE if maxsize is None else maxsize
+        self._analysis: asyncio.Queue = asyncio.Queue()
+        self._persist: asyncio.Queue = asyncio.Queue()
+        self._tasks = []
+        self.dropped = 0
+        self.processed = 0
+        # Trailing analyses go through the queue too, so they are ordered with new lines
+        coach.scheduler.run = self._enqueue_trailing
+
+    @property
+    def depth(self) -> int:
+        return self._analysis.qsize()
+
+    def start(self):
+        self._tasks = [
+            asyncio.create_task(self._analysis_loop()),
+            asyncio.create_task(self._persist_loop()),
+        ]
+
+    def submit(self, transcript: str, speaker, trace_id: Optional[str] = None):
+        """Called from the STT callback (on the event loop). Never blocks."""
+        now = time.time()
+        self._persist.put_nowait((transcript, speaker, trace_id))
+        self._put((transcript, speaker, trace_id, now))
+
+    def _put(self, item):
+        if self._analysis.qsize() >= self.maxsize:
+            dropped = self._analysis.get_nowait()
+            self._analysis.task_done()
+            PIPELINE_QUEUE_DEPTH.dec()
+            self.dropped += 1
+            PIPELINE_DROPPED.inc()
+            if dropped is not _TRAILING:
+                logger.warning(f"Transcript queue full ({self.maxsize}); dropped oldest line from analysis: \"{dropped[0][:30]}\"")
+        self._analysis.put_nowait(item)
+        PIPELINE_QUEUE_DEPTH.inc()
+
+    async def _enqueue_trailing(self):
+        self._put(_TRAILING)
+
+    async def _analysis_loop(self):
+        while True:
+            item = await self._analysis.get()
+            PIPELINE_QUEUE_DEPTH.dec()
+            try:
+                if item is _STOP:
+                    return
+                if item is _TRAILING:
+                    await self.coach._analyze_pending()
+                else:
+                    await self._analyze(*item)
+            except Exception as e:
+                logger.error(f"Transcript pipeline error: {e}")
+            finally:
+                self._analysis.task_done()
+
+    async def _analyze(self, transcript: str, speaker, trace_id: Optional[str], queued_at: float):
+        STAGE_SECONDS.observe(max(0.0, time.time() - queued_at), stage="callback_to_coach")
+        record_span("callback_to_coach", trace_id, queued_at, queue_depth=self._analysis.qsize())
+        logger.info(f"Processing [{speaker}]: {transcript}")
+        # Coach handles buffering and mode logic internally.
+        # Returns advice only if live mode triggers a signal.
+        advice = await self.coach.process_transcript(transcript, speaker, trace_id=trace_id)
+        self.processed += 1
+        if advice:
+            await self.deliver(advice)
+
+    async def _persist_loop(self):
+        while True:
+            batch = [await self._persist.get()]
+            while not self._persist.empty():
+                batch.append(self._persist.get_nowait())
+            stop = _STOP in batch
+            lines = [item for item in batch if item is not _STOP]
+            try:
+                if lines:
+                    self.recorder.add_transcripts(lines)
+            except Exception as e:
+                logger.error(f"Transcript persistence error: {e}")
+            finally:
+                for _ in batch:
+                    self._persist.task_done()
+            if stop:
+                return
+            # Let other work run between batches; lines arriving meanwhile share the next write
+            await asyncio.sleep(0)
+
+    async def close(self, timeout: Optional[float] = None):
+        """Process what is queued (bounded by timeout), then stop both consumers."""
+        if not self._tasks:
+            return
+        self._analysis.put_nowait(_STOP)
+        PIPELINE_QUEUE_DEPTH.inc()
+        self._persist.put_nowait(_STOP)
+        done, pending = await asyncio.wait(self._tasks, timeout=PIPELINE_DRAIN_TIMEOUT if timeout is None else timeout)
+        for task in pending:
+            logger.warning("Transcript pipeline did not drain in time; cancelling")
+            task.cancel()
+        if pending:
+            # Keep the shared depth gauge honest for items that will never be consumed
+            PIPELINE_QUEUE_DEPTH.dec(self._analysis.qsize())
+        self._tasks = []
@@ -0,0 +1,116 @@
+"""
+Server-side voice activity detection on outgoing STT frames.
+
+Each linear16 frame gets two vectorized features: RMS level (dBFS) and zero-crossing
+rate. A frame is speech when it is clearly above the noise floor, or a bit above it with
+a high zero-crossing rate (unvoiced consonants like "s"/"f" are quiet but noisy).
+The noise floor follows the quietest recent frames: it drops at once and rises slowly
+(0.5 dB/s) on non-speech frames only, so quiet steady noise (fans, hum) raises the bar
+for speech over tens of seconds, while a long stretch of speech-level audio never turns
+into "noise" and gets withheld.
+
+Decisions are smoothed: after speech, VAD_HANGOVER_MS more frames are sent regardless
+(Deepgram needs the trailing silence to endpoint), and the last VAD_PREROLL_MS of
+withheld audio is sent just before speech resumes so onsets are not clipped. Everything
+else is withheld; AudioIngestBuffer reports the withheld time to the AudioProcessor so
+transcript timestamps still line up with the session audio.
+"""
+
+import logging
+import os
+from collections import deque
+from typing import List, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Per-session default; the config frame can override it with "vad": true/false
+VAD_ENABLED = os.getenv("VAD_ENABLED", "1").lower() in ("1", "true", "yes")
+# Absolute floor for speech, and required margin over the tracked noise floor
+VAD_THRESHOLD_DB = float(os.getenv("VAD_THRESHOLD_DB", "-50"))
+VAD_MARGIN_DB = float(os.getenv("VAD_MARGIN_DB", "10"))
+VAD_HANGOVER_MS = int(os.getenv("VAD_HANGOVER_MS", "800"))
+VAD_PREROLL_MS = int(os.getenv("VAD_PREROLL_MS", "300"))
+# Frames this far below the speech threshold still count when their ZCR is high
+_FRICATIVE_DB = 8.0
+_FRICATIVE_ZCR = 0.3
+# Noise floor rise per second (dB) while no quieter frame is seen
+_FLOOR_RISE_DB_PER_SECOND = 0.5
+_SILENCE_DB = -100.0
+
+
+def frame_features(frame: bytes) -> Tuple[float, float]:
+    """(RMS level in dBFS, zero-crossing rate) of a linear16 frame."""
+    samples = np.frombuffer(frame[: len(frame) - len(frame) % 2], dtype="<i2").astype(np.float32)
+    if samples.size < 2:
+        return _SILENCE_DB, 0.0
+    rms = float(np.sqrt(np.mean(samples * samples)))
+    level = 20.0 * np.log10(rms / 32768.0) if rms > 0 else _SILENCE_DB
+    signs = np.signbit(samples)
+    zcr = float(np.count_nonzero(signs[1:] != signs[:-1])) / (samples.size - 1)
+    return level, zcr
+
+
+class VoiceActivityDetector:
+    def __init__(self, bytes_per_second: int = 32000, threshold_db: float = None, margin_db: float = None, hangover_ms: int = None, preroll_ms: int = None):
+        self.bytes_per_second = bytes_per_second
+        self.threshold_db = VAD_THRESHOLD_DB if threshold_db is None else threshold_db
+        self.margin_db = VAD_MARGIN_DB if margin_db is None else margin_db
+        self.hangover_seconds = (VAD_HANGOVER_MS if hangover_ms is None else hangover_ms) / 1000.0
+        self.preroll_bytes = int(bytes_per_second * (VAD_PREROLL_MS if preroll_ms is None else preroll_ms) / 1000)
+        self.noise_floor_db = self.threshold_db - self.margin_db
+        self._hangover_left = 0.0
+        self._preroll: deque = deque()
+        self._preroll_size = 0
+        self.speech_seconds = 0.0
+        # Audio that never went to STT
+        self.skipped_seconds = 0.0
+
+    @property
+    def withholding(self) -> bool:
+        return self._hangover_left <= 0
+
+    @property
+    def saved_seconds(self) -> float:
+        """Withheld so far, including pre-roll that was never needed."""
+        return self.skipped_seconds + self._preroll_size / self.bytes_per_second
+
+    def is_speech(self, frame: bytes) -> bool:
+        level, zcr = frame_features(frame)
+        seconds = len(frame) / self.bytes_per_second
+        threshold = max(self.threshold_db, self.noise_floor_db + self.margin_db)
+        speech = level >= threshold or (level >= threshold - _FRICATIVE_DB and zcr >= _FRICATIVE_ZCR)
+        if level < self.noise_floor_db:
+            # Below threshold - margin the floor no longer affects decisions
+            self.noise_floor_db = max(level, self.threshold_db - self.margin_db)
+        elif not speech:
+            self.noise_floor_db += _FLOOR_RISE_DB_PER_SECOND * seconds
+        return speech
+
+    def process(self, frame: bytes) -> Tuple[List[bytes], float]:
+        """
+        Returns (frames to send now, seconds of audio dropped for good). Sent frames may
+        include buffered pre-roll ahead of this one.
+        """
+        seconds = len(frame) / self.bytes_per_second
+        if self.is_speech(frame):
+            self.speech_seconds += seconds
+            self._hangover_left = self.hangover_seconds
+            out = list(self._preroll)
+            out.append(frame)
+            self._preroll.clear()
+            self._preroll_size = 0
+            return out, 0.0
+        if self._hangover_left > 0:
+            self._hangover_left -= seconds
+            return [frame], 0.0
+        self._preroll.append(frame)
+        self._preroll_size += len(frame)
+        skipped = 0.0
+        while self._preroll_size > self.preroll_bytes and self._preroll:
+            dropped = self._preroll.popleft()
+            self._preroll_size -= len(dropped)
+            skipped += len(dropped) / self.bytes_per_second
+        self.skipped_seconds += skipped
+        return [], skipped
@@ -0,0 +1,106 @@
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from core.analysis_engine.schemas import TacticSignal
+from services.analysis_scheduler import AnalysisScheduler
+from services.coach import Coach
+
+
+def signal(evidence):
+    # Distinct subtype per line so the 45s dedupe does not hide trailing advice
+    return TacticSignal(category="URGENCY", subtype=evidence, confidence=0.9, evidence=evidence,
+                        options=["Ask what changes after the deadline."])
+
+
+@pytest.fixture
+def coach():
+    with patch("services.coach.TacticDetector"), \
+         patch("services.coach.TacticDetectorV2") as mock_v2_cls:
+        mock_v2_cls.return_value.detect_tactics = AsyncMock(
+            side_effect=lambda segments, negotiation_type="General", new_segments=None: [signal(new_segments[-1].text)]
+        )
+        c = Coach(mode="live")
+        c.window_size_seconds = 0.2
+        c.scheduler.debounce_seconds = 0.05
+        c.scheduler.max_latency_seconds = 1.0
+        c.delivered = []
+
+        async def deliver(advice):
+            c.delivered.append(advice)
+        c.advice_callback = deliver
+        yield c
+        c.close()
+
+
+@pytest.mark.asyncio
+async def test_fire_time_respects_debounce_latency_and_spacing():
+    sched = AnalysisScheduler(AsyncMock(), debounce_seconds=2.0, max_latency_seconds=5.0)
+    assert sched.fire_at() is None
+
+    sched.note_pending(100.0, not_before=0.0)
+    assert sched.fire_at() == 102.0
+    # More lines push the debounce out, but never past the max latency of the first line
+    sched.note_pending(101.5, not_before=0.0)
+    assert sched.fire_at() == 103.5
+    sched.note_pending(104.0, not_before=0.0)
+    assert sched.fire_at() == 105.0
+    # Minimum spacing between LLM calls wins over both
+    sched.note_pending(104.5, not_before=110.0)
+    assert sched.fire_at() == 110.0
+    sched.clear()
+    assert not sched.pending
+
+
+@pytest.mark.asyncio
+async def test_line_inside_window_is_analyzed_on_trailing_edge(coach):
+    first = await coach.process_transcript("Price is $50k.", 1)
+    assert first["evidence"] == "Price is $50k."
+
+    # Arrives inside the window: nothing now, advice delivered once things settle
+    assert await coach.process_transcript("We work with a lot of teams like yours.", 1) is None
+    assert coach.scheduler.pending
+    await asyncio.sleep(0.4)
+
+    assert [a["evidence"] for a in coach.delivered] == ["We work with a lot of teams like yours."]
+    assert coach.detector_v2.detect_tactics.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_trailing_edge_targets_counterparty_line_after_user_reply(coach):
+    await coach.process_transcript("Price is $50k.", 1)
+    await coach.process_transcript("Here are the three service tiers we offer.", 1)
+    await coach.process_transcript("Let me think.", 0)
+    await asyncio.sleep(0.4)
+
+    call = coach.detector_v2.detect_tactics.call_args.kwargs
+    assert [s.text for s in call["new_segments"]] == ["Here are the three service tiers we offer."]
+    assert call["segments"][-1].text == "Here are the three service tiers we offer."
+    assert [a["evidence"] for a in coach.delivered] == ["Here are the three service tiers we offer."]
+
+
+@pytest.mark.asyncio
+async def test_leading_edge_clears_pending_analysis(coach):
+    coach.window_size_seconds = 0.1
+    coach.scheduler.debounce_seconds = 0.5
+    await coach.process_transcript("Price is $50k.", 1)
+    await coach.process_transcript("Here are the three service tiers we offer.", 1)
+    assert coach.scheduler.pending
+
+    await asyncio.sleep(0.15)
+    advice = await coach.process_transcript("Final offer.", 1)
+    assert advice["evidence"] == "Final offer."
+    assert not coach.scheduler.pending
+
+    await asyncio.sleep(0.6)
+    assert coach.delivered == []
+    assert coach.detector_v2.detect_tactics.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_no_trailing_edge_without_callback(coach):
+    coach.advice_callback = None
+    await coach.process_transcript("Price is $50k.", 1)
+    await coach.process_transcript("Here are the three service tiers we offer.", 1)
+    assert not coach.scheduler.pending
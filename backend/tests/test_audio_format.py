@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from services.audio_format import AudioNormalizer, parse_audio_format
+
+
+def _tone(rate, seconds=1.0, freq=440.0, amplitude=0.5):
+    t = np.arange(int(rate * seconds)) / rate
+    return (amplitude * np.sin(2 * np.pi * freq * t)).astype(np.float32)
+
+
+def _chunked(normalizer, data, size):
+    return b"".join(normalizer.process(data[i:i + size]) for i in range(0, len(data), size))
+
+
+def test_canonical_format_passes_through():
+    normalizer = AudioNormalizer()
+    data = b"\x01\x02" * 100
+    assert normalizer.passthrough
+    assert normalizer.process(data) is data
+
+
+def test_float32_stereo_48k_becomes_16k_mono_linear16():
+    tone = _tone(48000)
+    # Right channel silent: the mean halves the amplitude
+    stereo = np.stack([tone, np.zeros_like(tone)], axis=1).astype("<f4").tobytes()
+    out = np.frombuffer(AudioNormalizer("float32", 48000, 2).process(stereo), dtype="<i2")
+
+    assert len(out) == 16000
+    expected = 0.25 * 32767 * np.sin(2 * np.pi * 440 * np.arange(16000) / 16000)
+    # Moving-average anti-aliasing attenuates 440 Hz only slightly
+    assert np.abs(out[100:-100] - expected[100:-100]).max() < 0.03 * 32767
+
+
+def test_chunk_boundaries_do_not_change_output():
+    data = (_tone(44100) * 32767).astype("<i2")
+    stereo = np.stack([data, data], axis=1).tobytes()
+    whole = np.frombuffer(AudioNormalizer("int16", 44100, 2).process(stereo), dtype="<i2")
+    # Odd chunk sizes split frames and samples mid-way; only float rounding may differ
+    chunked = np.frombuffer(_chunked(AudioNormalizer("int16", 44100, 2), stereo, 1001), dtype="<i2")
+    assert len(chunked) == len(whole) == 16000
+    assert np.abs(chunked.astype(int) - whole).max() <= 1
+
+
+def test_upsampling_8k():
+    data = (_tone(8000, freq=300) * 32767).astype("<i2").tobytes()
+    out = _chunked(AudioNormalizer("linear16", 8000, 1), data, 333)
+    assert len(out) // 2 == pytest.approx(16000, abs=2)
+
+
+@pytest.mark.parametrize("spec", [
+    {"encoding": "mp3"},
+    {"sample_rate": 1000},
+    {"channels": 0},
+    "float32",
+])
+def test_rejects_unsupported_formats(spec):
+    with pytest.raises(ValueError):
+        parse_audio_format(spec)
+
+
+def test_defaults_fill_missing_fields():
+    assert parse_audio_format({"encoding": "float32"}) == {"encoding": "float32", "sample_rate": 16000, "channels": 1}
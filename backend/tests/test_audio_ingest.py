@@ -0,0 +1,122 @@
+import asyncio
+import struct
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from websockets.exceptions import ConnectionClosed
+
+from core import metrics
+from services.audio_ingest import AudioIngestBuffer
+from services.audio_processor import AudioProcessor
+
+
+class FakeProcessor:
+    def __init__(self, delay=0.0, connected=True):
+        self.delay = delay
+        self.connected = connected
+        self.frames = []
+
+    async def send_audio(self, data):
+        await asyncio.sleep(self.delay)
+        if not self.connected:
+            return False
+        self.frames.append(data)
+        return True
+
+
+def tone(n_samples, amplitude):
+    return struct.pack(f"<{n_samples}h", *([amplitude] * n_samples))
+
+
+@pytest.mark.asyncio
+async def test_chunks_are_coalesced_into_fixed_frames():
+    proc = FakeProcessor()
+    # 100ms frames at 16 kHz linear16 = 3200 bytes
+    ingest = AudioIngestBuffer(proc, frame_ms=100, max_buffer_ms=2000)
+    ingest.start()
+    for _ in range(10):
+        ingest.push(b"\x01\x00" * 500)  # 1000-byte client chunks
+    await asyncio.sleep(0.01)
+    assert [len(f) for f in proc.frames] == [3200, 3200, 3200]
+
+    await ingest.close()
+    # The trailing partial frame is flushed on close
+    assert [len(f) for f in proc.frames] == [3200, 3200, 3200, 400]
+    assert b"".join(proc.frames) == b"\x01\x00" * 5000
+
+
+@pytest.mark.asyncio
+async def test_push_never_waits_and_drop_oldest_bounds_the_queue():
+    proc = FakeProcessor(delay=1.0)
+    ingest = AudioIngestBuffer(proc, frame_ms=100, max_buffer_ms=300, policy="drop_oldest")
+    ingest.start()
+    before = metrics.AUDIO_FRAMES_DROPPED.value(reason="drop_oldest")
+    frames = [bytes([i]) * 3200 for i in range(8)]
+    ingest.push(frames[0])
+    await asyncio.sleep(0)
+    for frame in frames[1:]:
+        ingest.push(frame)
+    # frame 0 is in flight; the queue holds at most 3 frames, the newest ones
+    assert [f[0] for f, _ in ingest._frames] == [5, 6, 7]
+    assert ingest.frames_dropped == 4
+    assert metrics.AUDIO_FRAMES_DROPPED.value(reason="drop_oldest") == before + 4
+    await ingest.close(timeout=0.05)
+
+
+@pytest.mark.asyncio
+async def test_drop_newest_keeps_queued_audio():
+    proc = FakeProcessor(connected=False)
+    ingest = AudioIngestBuffer(proc, frame_ms=100, max_buffer_ms=200, policy="drop_newest")
+    for i in range(5):
+        ingest.push(bytes([i]) * 3200)
+    assert [f[0] for f, _ in ingest._frames] == [0, 1]
+    assert ingest.frames_dropped == 3
+
+
+@pytest.mark.asyncio
+async def test_drop_quiet_sacrifices_low_energy_frames():
+    proc = FakeProcessor(connected=False)
+    ingest = AudioIngestBuffer(proc, frame_ms=100, max_buffer_ms=300, policy="drop_quiet")
+    loud, quiet = tone(1600, 8000), tone(1600, 10)
+    for frame in (loud, quiet, loud, loud, quiet):
+        ingest.push(frame)
+    # The first quiet frame made room for the third loud one; the last quiet one was discarded
+    assert [f for f, _ in ingest._frames] == [loud, loud, loud]
+    assert ingest.frames_dropped == 2
+
+
+@pytest.mark.asyncio
+async def test_audio_waits_while_disconnected_and_gauge_settles():
+    proc = FakeProcessor(connected=False)
+    gauge_before = metrics.AUDIO_BUFFERED_SECONDS.value()
+    ingest = AudioIngestBuffer(proc, frame_ms=100, max_buffer_ms=1000)
+    ingest.start()
+    ingest.push(b"\x00\x00" * 4800)  # 300ms
+    await asyncio.sleep(0.05)
+    assert proc.frames == [] and len(ingest._frames) == 3
+    assert metrics.AUDIO_BUFFERED_SECONDS.value() == pytest.approx(gauge_before + 0.3)
+
+    proc.connected = True
+    await asyncio.sleep(0.2)
+    assert len(proc.frames) == 3
+    await ingest.close()
+    assert metrics.AUDIO_BUFFERED_SECONDS.value() == pytest.approx(gauge_before)
+
+
+@pytest.mark.asyncio
+async def test_send_audio_only_disconnects_on_closed_connection():
+    proc = AudioProcessor(transcript_callback=lambda *a: None)
+    proc.ws = MagicMock()
+    proc._connected = True
+
+    proc.ws.send = AsyncMock(side_effect=RuntimeError("buffer full"))
+    assert await proc.send_audio(b"x") is False
+    assert proc.connected
+
+    proc.ws.send = AsyncMock(side_effect=ConnectionClosed(None, None))
+    assert await proc.send_audio(b"x") is False
+    assert not proc.connected
+
+    proc.ws.send = AsyncMock()
+    assert await proc.send_audio(b"x") is False
+    proc.ws.send.assert_not_awaited()
@@ -0,0 +1,101 @@
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from devtools.fake_deepgram import FakeDeepgram
+from main import negotiate_audio_format
+from services import audio_processor
+from services.audio_format import AudioNormalizer, container_header, parse_audio_format, stt_stream_params
+from services.audio_ingest import AudioIngestBuffer
+from services.audio_processor import AudioProcessor, listen_url
+
+EBML = b"\x1a\x45\xdf\xa3"
+CLUSTER = b"\x1f\x43\xb6\x75"
+WEBM_HEADER = EBML + b"\x9f\x42\x86\x81\x01" + b"tracks-and-info"
+WEBM_FIRST_CHUNK = WEBM_HEADER + CLUSTER + b"opus-frames"
+
+
+def ogg_page(payload: bytes) -> bytes:
+    return b"OggS" + bytes(22) + bytes([1]) + bytes([len(payload)]) + payload
+
+
+def test_container_header_stops_before_media():
+    fmt = parse_audio_format({"encoding": "audio/webm;codecs=opus"})
+    assert fmt == {"encoding": "webm", "container": True, "bitrate": 32000}
+    assert container_header(fmt, WEBM_FIRST_CHUNK) == WEBM_HEADER
+
+    head, tags, audio = ogg_page(b"OpusHead...."), ogg_page(b"OpusTags"), ogg_page(b"audio")
+    ogg = parse_audio_format({"encoding": "ogg"})
+    assert container_header(ogg, head + tags + audio) == head + tags
+
+
+def test_container_url_lets_deepgram_detect_the_format():
+    fmt = parse_audio_format({"encoding": "webm"})
+    url = listen_url(300, stt_stream_params(fmt))
+    assert "encoding=" not in url and "sample_rate=" not in url
+    assert "encoding=linear16" in listen_url(300)
+
+
+@pytest.mark.asyncio
+async def test_ingest_forwards_container_chunks_whole():
+    proc = MagicMock()
+    proc.connected = True
+    proc.send_audio = AsyncMock(return_value=True)
+    ingest = AudioIngestBuffer(proc, frame_ms=100)
+    ingest.push(b"\x01\x00" * 100)  # PCM partial before the switch
+    ingest.set_compressed("webm", 4000)
+    ingest.start()
+    ingest.push(b"\x00\x00" * 300)  # late PCM: dropped
+    ingest.push(WEBM_FIRST_CHUNK)
+    ingest.push(b"more-opus")
+    await ingest.close()
+    assert [c.args[0] for c in proc.send_audio.await_args_list] == [WEBM_FIRST_CHUNK, b"more-opus"]
+    assert ingest.frames_dropped == 1
+
+
+@pytest.mark.asyncio
+async def test_format_switch_redials_and_keeps_the_header():
+    fake = FakeDeepgram(utterance_seconds=10, latency_ms=0)
+    async with fake.serve(port=0) as server:
+        port = list(server.sockets)[0].getsockname()[1]
+        with patch.object(audio_processor, "DEEPGRAM_URL", f"ws://127.0.0.1:{port}/v1/listen"):
+            processor = AudioProcessor(transcript_callback=None)
+            assert await processor.start()
+            assert await processor.send_audio(b"\x00\x00" * 1600)
+
+            fmt = parse_audio_format({"encoding": "webm", "bitrate": 24000})
+            assert await processor.set_stream_format(fmt)
+            assert processor.connected and fake.connections == 2
+            assert "encoding=" not in processor.ws.request.path
+            assert processor.bytes_per_second == 3000
+
+            assert await processor.send_audio(WEBM_FIRST_CHUNK)
+            assert await processor.send_audio(b"more-opus")
+            assert processor._stream_header == WEBM_HEADER
+            assert not processor._replay
+            await processor.stop()
+
+
+@pytest.mark.asyncio
+async def test_negotiation_acks():
+    processor = MagicMock()
+    processor.set_stream_format = AsyncMock(return_value=True)
+    ingest = AudioIngestBuffer(processor)
+    current = AudioNormalizer()
+
+    normalizer, ack = await negotiate_audio_format({"encoding": "float32", "sample_rate": 48000}, current, ingest, processor)
+    assert ack["status"] == "accepted" and ack["transport"] == "pcm"
+    processor.set_stream_format.assert_not_awaited()
+
+    normalizer, ack = await negotiate_audio_format({"encoding": "webm"}, normalizer, ingest, processor)
+    assert ack["status"] == "accepted" and ack["transport"] == "passthrough"
+    assert normalizer.passthrough and ingest.compressed
+    processor.set_stream_format.assert_awaited_once()
+
+    # Same declaration again is a no-op; switching back is not allowed
+    _, ack = await negotiate_audio_format({"encoding": "webm"}, normalizer, ingest, processor)
+    assert ack["status"] == "accepted" and processor.set_stream_format.await_count == 1
+    _, ack = await negotiate_audio_format({"encoding": "linear16"}, normalizer, ingest, processor)
+    assert ack["status"] == "rejected"
+    _, ack = await negotiate_audio_format({"encoding": "mp3"}, normalizer, ingest, processor)
+    assert ack["status"] == "rejected" and "mp3" in ack["reason"]
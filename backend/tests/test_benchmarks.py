@@ -0,0 +1,28 @@
+from benchmarks import run as bench
+
+
+def test_compare_scales_baseline_and_flags_regressions():
+    baseline = {"calibration": 1.0, "cases": {"fast": 1.0, "slow": 1.0}}
+    verdicts = {v["case"]: v for v in bench.compare({"fast": 1.2, "slow": 1.6, "brand_new": 3.0}, baseline, threshold=0.25, scale=1.0)}
+    assert verdicts["fast"]["status"] == "ok"
+    assert verdicts["slow"]["status"] == "regressed"
+    assert verdicts["brand_new"]["status"] == "new"
+
+    # On a machine half as fast the same timings are within budget
+    verdicts = {v["case"]: v for v in bench.compare({"slow": 1.6}, baseline, threshold=0.25, scale=2.0)}
+    assert verdicts["slow"]["status"] == "ok"
+
+
+def test_every_case_runs_offline(monkeypatch, tmp_path):
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    assert bench.main(["--quick"]) == 0
+    assert set(bench.CASES) >= {"coach_role_label", "recorder_save_10k", "list_sessions_500", "summary_normalize_2k_lines"}
+
+
+def test_baselines_cover_all_cases():
+    import json
+    from benchmarks import cases  # noqa: F401
+    with open(bench.BASELINE_PATH) as f:
+        baseline = json.load(f)
+    assert set(bench.CASES) <= set(baseline["cases"])
+
@@ -0,0 +1,123 @@
+import asyncio
+import json
+import time
+from unittest.mock import patch
+
+import pytest
+import websockets
+from websockets.exceptions import InvalidStatus
+
+from devtools.fake_deepgram import FakeDeepgram, load_script
+from services import audio_processor
+from services.audio_ingest import AudioIngestBuffer
+from services.audio_processor import AudioProcessor
+
+SILENCE = b"\x00\x00" * 1600  # 100 ms of 16 kHz linear16
+
+
+async def wait_for(condition, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        await asyncio.sleep(0.02)
+
+
+def url(server, path="/v1/listen"):
+    return f"ws://127.0.0.1:{list(server.sockets)[0].getsockname()[1]}{path}"
+
+
+@pytest.mark.asyncio
+async def test_protocol_params():
+    fake = FakeDeepgram(script=[(1, "one two three four")], utterance_seconds=0.4, latency_ms=0, interim_seconds=0.2)
+    async with fake.serve(port=0) as server:
+        with pytest.raises(InvalidStatus) as e:
+            await websockets.connect(url(server, "/v1/listen?encoding=mp3&sample_rate=16000"))
+        assert e.value.response.status_code == 400
+
+        # No diarize: no speaker labels. Interim partials come before the final.
+        async with websockets.connect(url(server, "/v1/listen?encoding=linear16&sample_rate=8000&interim_results=true")) as ws:
+            await ws.send(SILENCE)  # 0.2s at 8 kHz
+            partial = json.loads(await ws.recv())
+            await ws.send(SILENCE)
+            final = json.loads(await ws.recv())
+            await ws.send(json.dumps({"type": "CloseStream"}))
+            metadata = json.loads(await ws.recv())
+
+    assert (partial["is_final"], partial["channel"]["alternatives"][0]["transcript"]) == (False, "one two")
+    assert final["is_final"] and final["speech_final"]
+    assert "speaker" not in final["channel"]["alternatives"][0]["words"][0]
+    assert metadata["type"] == "Metadata" and metadata["duration"] == 0.4
+    assert fake.requests[-1]["sample_rate"] == "8000"
+
+
+@pytest.mark.asyncio
+async def test_idle_connections_time_out_unless_kept_alive():
+    fake = FakeDeepgram(idle_timeout_seconds=0.2)
+    async with fake.serve(port=0) as server:
+        async with websockets.connect(url(server)) as idle, websockets.connect(url(server)) as kept:
+            for _ in range(4):
+                await kept.send(json.dumps({"type": "KeepAlive"}))
+                await asyncio.sleep(0.1)
+            await idle.wait_closed()
+            assert idle.close_code == 1011 and kept.close_code is None
+    assert fake.idle_timeouts == 1 and fake.keepalives == 4
+
+
+@pytest.mark.asyncio
+async def test_long_lines_arrive_as_several_finals_in_order_despite_jitter():
+    script = [(1, "the price is firm and it will not move this quarter", 2.0), (0, "understood", 0.5)]
+    fake = FakeDeepgram(script=script, latency_ms=20, jitter_ms=80, final_seconds=0.8, seed=3)
+    received = []
+    async with fake.serve(port=0) as server:
+        with patch.object(audio_processor, "DEEPGRAM_URL", url(server)):
+            processor = AudioProcessor(transcript_callback=lambda *args: received.append(args[:2]), emit_interim=True)
+            assert await processor.start()
+            for _ in range(25):
+                await processor.send_audio(SILENCE)
+            await wait_for(lambda: len(received) == 4)
+            await processor.stop()
+
+    assert received == [
+        ("the price is firm and", 1), ("it will not move this", 1), ("quarter", 1), ("understood", 0),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_audio_path_survives_disconnects_and_diarization_errors():
+    script = [(1, f"Counterparty line {i}.", 0.5) for i in range(6)]
+    fake = FakeDeepgram(script=script, latency_ms=10, jitter_ms=20, disconnect_after_seconds=1.2, max_disconnects=1,
+                        diarization_error_rate=0.3, seed=7)
+    lines = []
+    async with fake.serve(port=0) as server:
+        with patch.object(audio_processor, "DEEPGRAM_URL", url(server)), \
+                patch.object(audio_processor, "STT_RECONNECT_BASE_SECONDS", 0.01):
+            processor = AudioProcessor(transcript_callback=lambda *args: lines.append(args[:2]))
+            assert await processor.start()
+            ingest = AudioIngestBuffer(processor, frame_ms=100, max_buffer_ms=5000)
+            ingest.start()
+            for _ in range(30):
+                ingest.push(SILENCE)
+                await asyncio.sleep(0.005)
+            await wait_for(lambda: len(lines) >= 6)
+            await ingest.close()
+            await processor.stop()
+
+    assert fake.disconnects == 1 and fake.connections == 2 and processor.reconnects == 1
+    # Replayed audio is re-transcribed by the fake; the processor drops the duplicates
+    texts = [text for text, _ in lines]
+    assert texts == sorted(set(texts), key=texts.index) and len(texts) == 6
+    # Wrong word labels pass through; the processor takes the first word's speaker
+    assert fake.diarization_errors > 0
+    assert {speaker for _, speaker in lines} <= {0, 1}
+
+
+def test_script_from_a_recorded_session(tmp_path):
+    session = {"transcripts": [
+        {"timestamp": "2026-01-01T10:00:00", "text": "Hello there, thanks for joining.", "speaker": 0},
+        {"timestamp": "2026-01-01T10:00:04", "text": "Happy to be here.", "speaker": 1},
+        {"timestamp": "2026-01-01T10:00:40", "text": "So, the price.", "speaker": 1},
+    ]}
+    path = tmp_path / "session.json"
+    path.write_text(json.dumps(session))
+    assert load_script(str(path)) == [
+        (0, "Hello there, thanks for joining.", 2.0), (1, "Happy to be here.", 4.0), (1, "So, the price.", 15.0),
+    ]
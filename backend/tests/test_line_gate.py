@@ -0,0 +1,94 @@
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from services.coach import Coach
+from services.line_gate import LineGate
+
+
+@pytest.mark.parametrize("text", ["okay", "Mm-hmm.", "Yeah, yeah.", "Right, got it.", "uh", ""])
+def test_filler_is_skipped(text):
+    assert LineGate().check(text) == "filler"
+
+
+@pytest.mark.parametrize("text", ["Sure thing then.", "It is what it is.", "Hello"])
+def test_low_content_is_skipped(text):
+    assert LineGate().check(text) == "low_content"
+
+
+@pytest.mark.parametrize("text", ["Time is up.", "Context 1", "We can hold the slot until Friday."])
+def test_substantive_lines_pass(text):
+    assert LineGate().check(text) is None
+
+
+@pytest.mark.parametrize("text", [
+    "No flexibility here.",
+    "I cannot do that.",
+    "That is too expensive.",
+    "I'd need my manager's approval.",
+    "That's company policy.",
+    "No.",
+])
+def test_short_firm_positions_pass(text):
+    assert LineGate(min_content_words=2).check(text) is None
+
+
+def test_answers_and_judgements_are_not_filler():
+    gate = LineGate()
+    assert gate.check("Yes.") == "low_content"
+    assert gate.check("Sounds good, I like it.") is None
+    assert gate.check("Yeah, right, okay.") == "filler"
+
+
+def test_priority_cues_are_detected_when_not_passed():
+    # A deadline is a priority cue; the caller's verdict wins when given
+    gate = LineGate(min_content_words=5)
+    assert gate.check("Offer ends Friday.") is None
+    assert gate.check("Offer ends Friday.", priority=False) == "low_content"
+    assert gate.check("Offer stands.") == "low_content"
+
+
+def test_priority_lines_bypass_content_threshold_but_not_filler():
+    gate = LineGate()
+    assert gate.check("$40k.", priority=True) is None
+    assert gate.check("okay", priority=True) == "filler"
+
+
+def test_near_duplicates_within_window():
+    gate = LineGate(window_seconds=60)
+    gate.remember("The price is $50,000, take it or leave it.", now=100.0)
+
+    assert gate.check("the price is $50,000 -- take it or leave it", now=110.0) == "near_duplicate"
+    assert gate.check("The price is $45,000 if you sign this week.", now=110.0) is None
+    # Outside the memory window the repeat is analyzed again
+    assert gate.check("The price is $50,000, take it or leave it.", now=200.0) is None
+    assert gate.counts == {"near_duplicate": 1}
+
+
+@pytest.mark.asyncio
+async def test_coach_skips_calls_and_counts_reasons():
+    with patch("services.coach.TacticDetector"), \
+         patch("services.coach.TacticDetectorV2") as mock_v2_cls:
+        mock_v2_cls.return_value.detect_tactics = AsyncMock(return_value=[])
+        coach = Coach(mode="live")
+        coach.window_size_seconds = 0.0
+
+        lines = [
+            "Our standard package includes installation.",
+            "Mm-hmm.",
+            "okay",
+            "Our standard package includes installation.",
+            "Sure thing then.",
+            "Installation is usually two weeks out.",
+            "I think that's right.",
+        ]
+        for text in lines:
+            await coach.process_transcript(text, 1)
+        await coach.process_transcript("What about support?", 0)
+
+    assert mock_v2_cls.return_value.detect_tactics.await_count == 2
+    assert coach.gate_counts["filler"] == 2
+    assert coach.gate_counts["near_duplicate"] == 1
+    assert coach.gate_counts["low_content"] == 2
+    assert coach.gate_counts["user_line"] == 1
+    assert coach.gate_counts["analyzed"] == 2
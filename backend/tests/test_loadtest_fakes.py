@@ -0,0 +1,82 @@
+import asyncio
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from core.analysis_engine.schemas import TranscriptSegment
+from core.analysis_engine.tactic_detection_v2 import TacticDetectorV2
+from devtools.fake_deepgram import FakeDeepgram
+from devtools.fake_openai import completion_content
+from scripts.loadtest import histogram_delta, histogram_quantile, parse_metrics, percentile
+from services import audio_processor
+from services.audio_processor import AudioProcessor
+
+
+@pytest.mark.asyncio
+async def test_audio_processor_against_fake_deepgram():
+    fake = FakeDeepgram(script=[(1, "The price is $48,000 for the year.")], utterance_seconds=0.5, latency_ms=0)
+    received = []
+    async with fake.serve(port=0) as server:
+        port = list(server.sockets)[0].getsockname()[1]
+        with patch.object(audio_processor, "DEEPGRAM_URL", f"ws://127.0.0.1:{port}/v1/listen"):
+            processor = AudioProcessor(transcript_callback=lambda *args: received.append(args))
+            assert await processor.start()
+            # 1s of 16 kHz linear16 -> two utterances
+            for _ in range(10):
+                await processor.send_audio(b"\x00\x00" * 1600)
+            for _ in range(50):
+                if len(received) >= 2:
+                    break
+                await asyncio.sleep(0.02)
+            await processor.stop()
+
+    assert [r[:2] for r in received] == [("The price is $48,000 for the year.", 1)] * 2
+    assert fake.connections == 1
+
+
+@pytest.mark.asyncio
+async def test_fake_openai_content_drives_detector():
+    user = "PASSED CONTEXT (Do not classify this):\n\nNEW SECTIONS (Classify this):\n[COUNTERPARTY]: The price is $48,000 and that's final.\n"
+    content = completion_content([{"role": "system", "content": "x"}, {"role": "user", "content": user}])
+    assert json.loads(content)["signals"][0]["evidence"] == "The price is $48,000 and that's final."
+
+    with patch("core.analysis_engine.tactic_detection_v2.AsyncOpenAI"):
+        det = TacticDetectorV2(api_key="fake")
+    response = MagicMock()
+    response.choices = [MagicMock()]
+    response.choices[0].message.content = content
+    det.client.chat.completions.create = AsyncMock(return_value=response)
+    seg = TranscriptSegment(speaker="COUNTERPARTY", text="The price is $48,000 and that's final.")
+    signals = await det.detect_tactics([seg], new_segments=[seg])
+    assert signals and signals[0].category == "ANCHORING"
+
+
+def test_batch_prompt_gets_per_line_results():
+    user = "NEW LINES (Classify each line independently):\n[LINE 1] [COUNTERPARTY]: Only valid until Friday.\n[LINE 2] [USER]: Let me think.\n"
+    results = json.loads(completion_content([{"role": "user", "content": user}]))["results"]
+    assert [r["line"] for r in results] == [1, 2]
+    assert results[1]["signals"][0]["category"] == "NONE"
+
+
+def test_metrics_parsing_and_quantiles():
+    before = parse_metrics(
+        'equalizer_event_loop_lag_seconds_bucket{le="0.01"} 5\n'
+        'equalizer_event_loop_lag_seconds_bucket{le="0.1"} 5\n'
+        'equalizer_event_loop_lag_seconds_bucket{le="+Inf"} 5\n'
+        'equalizer_event_loop_lag_seconds_sum 0.01\n'
+        'equalizer_event_loop_lag_seconds_count 5\n'
+    )
+    after = parse_metrics(
+        '# TYPE equalizer_event_loop_lag_seconds histogram\n'
+        'equalizer_event_loop_lag_seconds_bucket{le="0.01"} 100\n'
+        'equalizer_event_loop_lag_seconds_bucket{le="0.1"} 105\n'
+        'equalizer_event_loop_lag_seconds_bucket{le="+Inf"} 105\n'
+        'equalizer_event_loop_lag_seconds_sum 0.31\n'
+        'equalizer_event_loop_lag_seconds_count 105\n'
+    )
+    buckets, total, count = histogram_delta(before, after, "equalizer_event_loop_lag_seconds")
+    assert count == 100 and total == pytest.approx(0.3)
+    assert histogram_quantile(buckets, 0.5) == 0.01
+    assert histogram_quantile(buckets, 0.99) == 0.1
+    assert percentile([1, 2, 3, 4], 50) == 2.5
@@ -0,0 +1,127 @@
+import json
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import numpy as np
+import pytest
+
+from core.analysis_engine import local_classifier
+from core.analysis_engine.local_classifier import (
+    LocalTacticClassifier,
+    get_default_classifier,
+    load_seed_examples,
+    load_session_examples,
+)
+from core.analysis_engine.schemas import TranscriptSegment
+from core.analysis_engine.tactic_detection_v2 import TacticDetectorV2
+
+
+def mock_openai_response(content_json):
+    mock_response = MagicMock()
+    mock_response.choices = [MagicMock()]
+    mock_response.choices[0].message.content = json.dumps(content_json)
+    return mock_response
+
+
+def make_segment(text):
+    return TranscriptSegment(speaker="COUNTERPARTY", text=text, timestamp=1.0)
+
+
+@pytest.mark.parametrize("text,category,subtype", [
+    ("I need to check with my manager.", "AUTHORITY", "manager_deferral"),
+    ("That's company policy.", "AUTHORITY", "policy_shield"),
+    ("This offer is only valid today.", "URGENCY", "deadline"),
+    ("We only have one slot left.", "URGENCY", "scarcity"),
+    ("The price is $50,000.", "ANCHORING", "numeric_anchor"),
+    ("Can you walk me through what's included?", "NONE", "none"),
+])
+def test_default_classifier_fits_fixture_lines(text, category, subtype):
+    prediction = get_default_classifier().predict(text)
+    assert prediction.category == category
+    assert prediction.subtype == subtype
+
+
+def test_predict_is_sub_millisecond():
+    clf = get_default_classifier()
+    start = time.perf_counter()
+    for _ in range(200):
+        clf.predict("I'd need to get approval from my supervisor before we go further.")
+    assert (time.perf_counter() - start) / 200 < 0.001
+
+
+def test_save_load_roundtrip(tmp_path):
+    clf = LocalTacticClassifier.train(load_seed_examples(), epochs=50)
+    path = tmp_path / "model.npz"
+    clf.save(path)
+    loaded = LocalTacticClassifier.load(path)
+    text = "This expires today."
+    assert loaded.labels == clf.labels
+    assert loaded.predict(text) == clf.predict(text)
+
+
+def test_load_session_examples_reads_advice(tmp_path):
+    (tmp_path / "s1.json").write_text(json.dumps({
+        "advice_given": [
+            {"advice": {"category": "URGENCY", "subtype": "deadline", "evidence": "Sign by Friday."}},
+            {"advice": {"category": "NONE", "subtype": "none", "evidence": "Hello."}},
+            {"advice": "legacy string advice"},
+        ]
+    }))
+    assert load_session_examples(tmp_path) == [("Sign by Friday.", "URGENCY", "deadline")]
+
+
+@pytest.mark.asyncio
+async def test_local_engine_runs_without_llm(monkeypatch):
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    det = TacticDetectorV2(engine="local")
+    assert det.client is None
+
+    signals = await det.detect_tactics([], new_segments=[make_segment("I need to check with my manager.")])
+    assert signals[0].category == "AUTHORITY"
+    assert signals[0].subtype == "manager_deferral"
+    assert signals[0].options
+
+
+@pytest.mark.asyncio
+async def test_gated_engine_escalates_only_ambiguous_lines(monkeypatch):
+    from core.analysis_engine import tactic_detection_v2
+
+    with patch("core.analysis_engine.tactic_detection_v2.AsyncOpenAI"):
+        det = TacticDetectorV2(api_key="fake", engine="gated")
+    det.client.chat.completions.create = AsyncMock(return_value=mock_openai_response({
+        "results": [{"line": 2, "signals": [{"category": "LOSS_AVERSION", "subtype": "loss_warning", "confidence": 0.9, "evidence": "x"}]}]
+    }))
+    monkeypatch.setattr(tactic_detection_v2, "LOCAL_GATE_CONFIDENCE", 0.6)
+
+    lines = [
+        make_segment("I need to check with my manager."),
+        make_segment("Honestly the roadmap slipped twice last quarter."),
+    ]
+    results = await det.detect_tactics_batch(lines)
+
+    assert results[0][0].category == "AUTHORITY"
+    assert det.client.chat.completions.create.call_count == 1
+    user_content = det.client.chat.completions.create.call_args.kwargs["messages"][1]["content"]
+    assert "check with my manager" not in user_content
+    assert "[LINE 2]" in user_content
+    assert results[1][0].category == "LOSS_AVERSION"
+
+
+def test_unknown_engine_rejected():
+    with pytest.raises(ValueError):
+        TacticDetectorV2(api_key="fake", engine="bogus")
+
+
+def test_sparse_training_matches_dense():
+    examples = load_seed_examples() + [("", "NONE", "none")]
+    dense = LocalTacticClassifier.train(examples, epochs=50)
+    # Large exports train on coordinate arrays instead of a dense matrix
+    with patch.object(local_classifier, "_DENSE_TRAIN_MAX_ENTRIES", 0), \
+            patch.object(local_classifier.np, "zeros", wraps=np.zeros) as zeros:
+        sparse = LocalTacticClassifier.train(examples, epochs=50)
+    shapes = [call.args[0] for call in zeros.call_args_list if isinstance(call.args[0], tuple)]
+    # The only per-example arrays are label-sized (targets, scores)
+    assert all(shape[0] != len(examples) or shape[1] == len(sparse.labels) for shape in shapes)
+    assert sparse.labels == dense.labels
+    np.testing.assert_allclose(sparse.weights, dense.weights, atol=1e-5)
+    np.testing.assert_allclose(sparse.bias, dense.bias, atol=1e-5)
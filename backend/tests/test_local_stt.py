@@ -0,0 +1,139 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import AsyncMock, MagicMock
+
+import numpy as np
+import pytest
+
+from main import negotiate_audio_format, switch_stt_engine
+from services.audio_format import AudioNormalizer
+from services.audio_ingest import AudioIngestBuffer
+from services.local_stt import EnergySpeakerTracker, LocalAudioProcessor
+
+RATE = 16000
+SILENCE = b"\x00\x00" * 1600  # 100 ms
+
+
+def tone(seconds=0.5, amplitude=8000, freq=220):
+    t = np.arange(int(RATE * seconds)) / RATE
+    return (amplitude * np.sin(2 * np.pi * freq * t)).astype("<i2").tobytes()
+
+
+def frames(data, size=3200):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+async def feed(processor, data):
+    for frame in frames(data):
+        await processor.send_audio(frame)
+
+
+def fake_transcriber(delay=0.0):
+    def transcribe(pcm):
+        time.sleep(delay)
+        return f"{len(pcm) // 3200} frames" if pcm else ""
+    return transcribe
+
+
+async def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        await asyncio.sleep(0.01)
+
+
+def test_speaker_tracker_splits_by_level_and_zcr():
+    tracker = EnergySpeakerTracker()
+    assert tracker.assign(-15, 0.03) == 0
+    assert tracker.assign(-16, 0.03) == 0
+    assert tracker.assign(-35, 0.08) == 1
+    assert tracker.assign(-14, 0.02) == 0
+    assert tracker.assign(-33, 0.07) == 1
+
+
+@pytest.mark.asyncio
+async def test_utterances_end_at_silence_and_keep_order():
+    lines = []
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        processor = LocalAudioProcessor(lambda *args: lines.append(args), endpointing_ms=300, executor=executor,
+                                        transcriber=fake_transcriber(), max_inflight=2)
+        assert await processor.start() and processor.connected
+        # Loud, low voice; then a quieter, brighter one; a lone blip is ignored
+        await feed(processor, tone(1.0) + SILENCE * 3)
+        await feed(processor, tone(0.1) + SILENCE * 5)
+        await feed(processor, tone(0.5, amplitude=800, freq=900) + SILENCE * 3)
+        await wait_for(lambda: len(lines) == 2)
+        # The last utterance has no trailing silence: stop() flushes it
+        await feed(processor, tone(0.4))
+        await processor.stop()
+
+    assert [(text, speaker) for text, speaker, _ in lines] == [("13 frames", 0), ("8 frames", 1), ("4 frames", 0)]
+    assert all(trace_id for _, _, trace_id in lines)
+    assert processor.segments_transcribed == 3
+
+
+@pytest.mark.asyncio
+async def test_withheld_audio_ends_the_utterance():
+    lines = []
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        processor = LocalAudioProcessor(lambda *args: lines.append(args), executor=executor, transcriber=fake_transcriber())
+        await processor.start()
+        ingest = AudioIngestBuffer(processor, frame_ms=100)
+        await feed(processor, tone(0.5))
+        processor.skip_audio(2.0)
+        await wait_for(lambda: lines)
+        assert lines[0][0] == "5 frames"
+        assert processor._audio_seconds == pytest.approx(2.5)
+        await ingest.close()
+        await processor.stop()
+
+
+@pytest.mark.asyncio
+async def test_busy_session_does_not_starve_another():
+    done = []
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        busy = LocalAudioProcessor(lambda text, *a: done.append(("busy", text)), endpointing_ms=200, executor=executor,
+                                   transcriber=fake_transcriber(0.05))
+        quiet = LocalAudioProcessor(lambda text, *a: done.append(("quiet", text)), endpointing_ms=200, executor=executor,
+                                    transcriber=fake_transcriber(0.05))
+        await busy.start()
+        await quiet.start()
+        for _ in range(4):
+            await feed(busy, tone(0.5) + SILENCE * 2)
+        await feed(quiet, tone(0.5) + SILENCE * 2)
+        await wait_for(lambda: len(done) == 5)
+        await busy.stop()
+        await quiet.stop()
+
+    # One in flight per session: the quiet session's utterance goes second, not last
+    assert [who for who, _ in done].index("quiet") == 1
+
+
+@pytest.mark.asyncio
+async def test_missing_model_fails_start():
+    def transcribe(pcm):
+        raise ImportError("No module named 'faster_whisper'")
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        processor = LocalAudioProcessor(lambda *args: None, executor=executor, transcriber=transcribe)
+        assert not await processor.start()
+        assert not await processor.send_audio(SILENCE)
+        await processor.stop()
+
+
+@pytest.mark.asyncio
+async def test_engine_switch_and_compressed_rejection():
+    old = MagicMock(emit_interim=True, stop=AsyncMock())
+    new = MagicMock(supports_compressed=False, start=AsyncMock(return_value=True), stop=AsyncMock())
+    ingest = AudioIngestBuffer(old)
+
+    processor, ack = await switch_stt_engine("whisper", old, ingest, lambda engine: new)
+    assert processor is old and ack["status"] == "rejected"
+
+    processor, ack = await switch_stt_engine("local", old, ingest, lambda engine: new)
+    assert processor is new and ingest.processor is new
+    assert ack == {"type": "stt_engine", "status": "accepted", "engine": "local"}
+    new.set_emit_interim.assert_called_once_with(True)
+    old.stop.assert_awaited_once()
+
+    _, ack = await negotiate_audio_format({"encoding": "webm"}, AudioNormalizer(), ingest, new)
+    assert ack["status"] == "rejected" and not ingest.compressed
@@ -0,0 +1,96 @@
+import json
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from core import metrics
+from core.analysis_engine.schemas import TranscriptSegment
+from core.analysis_engine.tactic_detection_v2 import TacticDetectorV2
+from services.coach import Coach
+
+
+def mock_openai_response(content):
+    mock_response = MagicMock()
+    mock_response.choices = [MagicMock()]
+    mock_response.choices[0].message.content = content
+    return mock_response
+
+
+def test_text_exposition_format():
+    counter = metrics.Counter("t_requests_total", "Requests", ("reason",), register=False)
+    counter.inc(reason="user_line")
+    counter.inc(2, reason="user_line")
+    hist = metrics.Histogram("t_stage_seconds", "Stage latency", ("stage",), buckets=(0.1, 1.0), register=False)
+    hist.observe(0.05, stage="llm")
+    hist.observe(0.5, stage="llm")
+    hist.observe(5.0, stage="llm")
+
+    assert counter.render() == [
+        "# HELP t_requests_total Requests",
+        "# TYPE t_requests_total counter",
+        't_requests_total{reason="user_line"} 3',
+    ]
+    lines = hist.render()
+    assert 't_stage_seconds_bucket{stage="llm",le="0.1"} 1' in lines
+    assert 't_stage_seconds_bucket{stage="llm",le="1"} 2' in lines
+    assert 't_stage_seconds_bucket{stage="llm",le="+Inf"} 3' in lines
+    assert 't_stage_seconds_sum{stage="llm"} 5.55' in lines
+    assert 't_stage_seconds_count{stage="llm"} 3' in lines
+
+
+def test_label_mismatch_rejected():
+    counter = metrics.Counter("t_bad_total", "x", ("reason",), register=False)
+    with pytest.raises(ValueError):
+        counter.inc(stage="oops")
+
+
+def test_observe_is_cheap():
+    hist = metrics.Histogram("t_cheap_seconds", "x", ("stage",), register=False)
+    start = time.perf_counter()
+    for _ in range(10000):
+        hist.observe(0.003, stage="postprocess")
+    assert (time.perf_counter() - start) / 10000 < 20e-6
+
+
+@pytest.mark.asyncio
+async def test_detector_records_attempts_and_retries():
+    with patch("core.analysis_engine.tactic_detection_v2.AsyncOpenAI"):
+        det = TacticDetectorV2(api_key="fake")
+    det.client.chat.completions.create = AsyncMock(side_effect=[
+        mock_openai_response("not json"),
+        mock_openai_response(json.dumps({"signals": []})),
+    ])
+    first_attempts = metrics.LLM_CALL_SECONDS.count(operation="detect", attempt=1, retry=0)
+    second_attempts = metrics.LLM_CALL_SECONDS.count(operation="detect", attempt=2, retry=0)
+    retries = metrics.LLM_RETRIES.value(operation="detect", reason="invalid_json")
+    builds = metrics.STAGE_SECONDS.count(stage="prompt_build")
+
+    seg = TranscriptSegment(speaker="COUNTERPARTY", text="We need an answer by Friday.")
+    await det.detect_tactics([seg], new_segments=[seg])
+
+    assert metrics.LLM_CALL_SECONDS.count(operation="detect", attempt=1, retry=0) == first_attempts + 1
+    assert metrics.LLM_CALL_SECONDS.count(operation="detect", attempt=2, retry=0) == second_attempts + 1
+    assert metrics.LLM_RETRIES.value(operation="detect", reason="invalid_json") == retries + 1
+    assert metrics.STAGE_SECONDS.count(stage="prompt_build") == builds + 1
+
+
+@pytest.mark.asyncio
+async def test_gating_counters_and_endpoint():
+    import main
+
+    with patch("services.coach.TacticDetector"), \
+         patch("services.coach.TacticDetectorV2") as mock_v2_cls:
+        mock_v2_cls.return_value.detect_tactics = AsyncMock(return_value=[])
+        coach = Coach(mode="live")
+        coach.window_size_seconds = 0.0
+        before = metrics.GATE_DECISIONS.value(reason="user_line")
+        await coach.process_transcript("What does the warranty cover?", 0)
+
+    assert metrics.GATE_DECISIONS.value(reason="user_line") == before + 1
+
+    response = await main.get_metrics()
+    body = response.body.decode()
+    assert response.media_type.startswith("text/plain")
+    assert "# TYPE equalizer_stage_seconds histogram" in body
+    assert 'equalizer_gate_decisions_total{reason="user_line"}' in body
@@ -0,0 +1,79 @@
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from core.analysis_engine.schemas import TacticSignal
+from core.analysis_engine.tactic_detection_v2 import is_priority_cue
+from services import coach as coach_module
+from services.coach import Coach
+
+
+@pytest.mark.parametrize("text", [
+    "The total comes to $42,500.",
+    "We can do 38k if that helps.",
+    "This price is today only.",
+    "The offer expires at the end of the month.",
+    "I'd have to run it by my manager.",
+    "That's company policy, I'm afraid.",
+    "If you sign now I can throw in the mats.",
+    "If we agree on the term, would you commit to two years?",
+    "The other dealer quoted something similar.",
+])
+def test_priority_cues_match(text):
+    assert is_priority_cue(text)
+
+
+@pytest.mark.parametrize("text", [
+    "How was the drive over?",
+    "Let me show you the different trims.",
+    "I paid $300 for this jacket last year.",
+    "Use code SAVE20 at checkout, this episode is sponsored.",
+])
+def test_small_talk_is_not_a_cue(text):
+    assert not is_priority_cue(text)
+
+
+@pytest.fixture
+def coach(monkeypatch):
+    monkeypatch.setattr(coach_module, "PRIORITY_MIN_SPACING_SECONDS", 0.0)
+    with patch("services.coach.TacticDetector"), \
+         patch("services.coach.TacticDetectorV2") as mock_v2_cls:
+        mock_v2_cls.return_value.detect_tactics = AsyncMock(side_effect=lambda segments, negotiation_type="General", new_segments=None: [
+            TacticSignal(category="ANCHORING", subtype=new_segments[-1].text, confidence=0.9, evidence=new_segments[-1].text, options=["Ask how they got there."])
+        ])
+        c = Coach(mode="live")
+        c.window_size_seconds = 15.0
+        yield c
+        c.close()
+
+
+@pytest.mark.asyncio
+async def test_cue_bypasses_window_small_talk_does_not(coach):
+    await coach.process_transcript("Welcome in, glad you made it.", 1)
+    assert coach.detector_v2.detect_tactics.await_count == 1
+
+    assert await coach.process_transcript("Nice weather today.", 1) is None
+    assert coach.detector_v2.detect_tactics.await_count == 1
+
+    advice = await coach.process_transcript("The best I can do is $31,000.", 1)
+    assert advice["evidence"] == "The best I can do is $31,000."
+    assert coach.detector_v2.detect_tactics.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_user_cues_do_not_trigger(coach):
+    await coach.process_transcript("Welcome in, glad you made it.", 1)
+    assert await coach.process_transcript("My budget is $30,000.", 0) is None
+    assert coach.detector_v2.detect_tactics.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_cue_inside_priority_spacing_is_scheduled_soon(coach, monkeypatch):
+    monkeypatch.setattr(coach_module, "PRIORITY_MIN_SPACING_SECONDS", 2.0)
+    coach.advice_callback = AsyncMock()
+    await coach.process_transcript("Welcome in, glad you made it.", 1)
+    await coach.process_transcript("If you sign today I can hold this price.", 1)
+
+    # Not analyzed inline (spacing), but due at the priority spacing instead of the 15s window
+    assert coach.detector_v2.detect_tactics.await_count == 1
+    assert coach.scheduler.fire_at() <= coach.last_analysis_time + 2.0
@@ -0,0 +1,105 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from services.clock import VirtualClock
+from services.replay import SessionReplay, load_session_events
+
+
+def make_session(lines):
+    start = datetime(2026, 10, 1, 12, 0, 0)
+    return {
+        "session_id": "replay-test",
+        "negotiation_type": "General",
+        "transcripts": [
+            {"timestamp": (start + timedelta(seconds=offset)).isoformat(), "text": text, "speaker": speaker}
+            for offset, speaker, text in lines
+        ],
+    }
+
+
+SESSION = make_session([
+    (0.0, "unknown", "Thanks for making the time today."),
+    (4.0, 1, "The price is $50,000 and that's our final offer."),
+    (9.0, 1, "This discount is only available until Friday."),
+    (11.0, "unknown", "Let me think about it."),
+    (13.0, 1, "Other customers signed up immediately at this price."),
+    (30.0, 1, "My manager has to approve anything lower than that."),
+    (31.0, 1, "Okay."),
+])
+
+
+@pytest.mark.asyncio
+async def test_virtual_clock_wakes_sleepers_in_order():
+    clock = VirtualClock()
+    woke = []
+
+    async def sleeper(name, delay):
+        await clock.sleep(delay)
+        woke.append((name, clock.time()))
+
+    tasks = [asyncio.create_task(sleeper("b", 5)), asyncio.create_task(sleeper("a", 2))]
+    await asyncio.sleep(0)
+    assert clock.next_deadline() == 2
+    await clock.advance_to(3)
+    assert woke == [("a", 2)] and clock.time() == 3
+    await clock.advance_to(10)
+    assert woke == [("a", 2), ("b", 5)]
+    await asyncio.gather(*tasks)
+
+
+def test_events_keep_gaps_and_map_unknown_speaker():
+    events = load_session_events(SESSION)
+    assert [e["offset"] for e in events] == [0.0, 4.0, 9.0, 11.0, 13.0, 30.0, 31.0]
+    assert events[0]["speaker"] == 0 and events[1]["speaker"] == 1
+
+
+@pytest.mark.asyncio
+async def test_replay_is_deterministic_across_speeds():
+    unbounded = await SessionReplay(SESSION, speed=None, engine="local").run()
+    fast = await SessionReplay(SESSION, speed=1000, engine="local").run()
+
+    def stream(result):
+        return [(a["offset"], a["source"], a["category"], a["subtype"]) for a in result["advice"]]
+
+    assert stream(unbounded) == stream(fast)
+    assert unbounded["gate_counts"] == fast["gate_counts"]
+    assert unbounded["virtual_seconds"] >= 31.0
+    assert unbounded["lines"] == 7 and unbounded["latency"]["count"] == 7
+    # A 31s session replays far faster than real time when unbounded
+    assert unbounded["wall_seconds"] < 5
+
+
+@pytest.mark.asyncio
+async def test_trailing_analysis_fires_on_virtual_time():
+    session = make_session([
+        (0.0, 1, "The price is $50,000 and that's our final offer."),
+        (6.0, 1, "We include installation and two years of support."),
+    ])
+    replay = SessionReplay(session, speed=None, engine="local")
+    result = await replay.run()
+
+    # The second line lands inside the 15s window and is analyzed by the trailing edge
+    # once the minimum spacing has passed: 0 + 15s, on the virtual clock
+    assert result["gate_counts"]["analyzed"] == 2
+    assert replay.coach.last_analysis_time == pytest.approx(15.0)
+    assert result["virtual_seconds"] == pytest.approx(15.0)
+
+
+@pytest.mark.asyncio
+async def test_user_reply_after_the_window_does_not_drop_a_pending_line():
+    session = make_session([
+        (0.0, 1, "The price is $50,000 and that's our final offer."),
+        (14.0, 1, "We include installation and two years of support."),
+        (15.2, 0, "Let me think about it."),
+    ])
+    replay = SessionReplay(session, speed=None, engine="local")
+    result = await replay.run()
+
+    # The 14s line was due at 15.5s; the user reply at 15.2s opens the window and the
+    # leading edge analyzes the pending counterparty line instead of gating on the reply
+    assert result["gate_counts"]["analyzed"] == 2
+    assert "user_line" not in result["gate_counts"]
+    assert replay.coach.last_analysis_time == pytest.approx(15.2)
@@ -0,0 +1,168 @@
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from core.analysis_engine.schemas import TacticSignal
+from core.analysis_engine.tactic_detection_v2 import TacticDetectorV2
+from services.coach import Coach
+from services.running_debrief import RunningDebrief, transcript_digest, usable_running_debrief
+from services.session_recorder import SessionRecorder
+
+
+def mock_openai_response(content):
+    mock_response = MagicMock()
+    mock_response.choices = [MagicMock()]
+    mock_response.choices[0].message.content = content if isinstance(content, str) else json.dumps(content)
+    return mock_response
+
+
+def urgency(seg):
+    if "today" in seg.text:
+        return [TacticSignal(category="URGENCY", subtype="deadline", confidence=0.9, evidence=seg.text)]
+    return [TacticSignal(category="NONE", subtype="none", confidence=0.9, evidence=seg.text)]
+
+
+@pytest.fixture
+def live_session():
+    with patch("services.coach.TacticDetector"), \
+         patch("services.coach.TacticDetectorV2") as mock_v2_cls:
+        detector = mock_v2_cls.return_value
+        detector.detect_tactics_batch = AsyncMock(side_effect=lambda segs, negotiation_type="General": [urgency(s) for s in segs])
+        detector.update_running_summary = AsyncMock(side_effect=lambda prev, segs, negotiation_type="General": (prev + " " + " | ".join(s.text for s in segs)).strip())
+
+        coach = Coach(mode="debrief", negotiation_type="Vendor")
+        recorder = SessionRecorder(negotiation_type="Vendor")
+        yield coach, recorder, detector
+        if recorder.session_file.exists():
+            recorder.session_file.unlink()
+
+
+async def say(coach, recorder, text, speaker):
+    recorder.add_transcript(text, speaker=speaker)
+    await coach.process_transcript(text, speaker)
+
+
+@pytest.mark.asyncio
+async def test_step_builds_timeline_and_persists_state(live_session):
+    coach, recorder, detector = live_session
+    debrief = RunningDebrief(coach, recorder)
+
+    await say(coach, recorder, "What is the price?", 0)
+    await say(coach, recorder, "It is $40,000 and only valid today.", 1)
+    assert await debrief.step() == 2
+
+    # Only the opponent line is classified; line numbers match the recorded transcript
+    assert [s.text for s in detector.detect_tactics_batch.call_args.args[0]] == ["It is $40,000 and only valid today."]
+    assert debrief.state["timeline"] == [{
+        "line": 1, "category": "URGENCY", "subtype": "deadline", "confidence": 0.9,
+        "snippet": "It is $40,000 and only valid today.",
+    }]
+
+    await say(coach, recorder, "Let me think about it.", 0)
+    assert await debrief.step() == 1
+    assert await debrief.step() == 0
+    assert detector.update_running_summary.await_count == 2
+
+    saved = SessionRecorder.get_session(recorder.session_id)["running_debrief"]
+    assert saved["covered_lines"] == 3
+    assert saved["summary_lines"] == 3
+    assert saved["digest"] == transcript_digest(recorder.transcripts)
+    assert usable_running_debrief(SessionRecorder.get_session(recorder.session_id)) == saved
+
+
+@pytest.mark.asyncio
+async def test_failed_notes_update_is_caught_up(live_session):
+    coach, recorder, detector = live_session
+    debrief = RunningDebrief(coach, recorder)
+    detector.update_running_summary.side_effect = [None, "notes for all lines"]
+
+    await say(coach, recorder, "First offer is $10.", 1)
+    await debrief.step()
+    assert debrief.state["covered_lines"] == 1
+    assert debrief.state["summary_lines"] == 0
+
+    await say(coach, recorder, "Second line.", 0)
+    await debrief.step()
+    caught_up = detector.update_running_summary.call_args.args[1]
+    assert [s.text for s in caught_up] == ["First offer is $10.", "Second line."]
+    assert debrief.state["summary_lines"] == 2
+
+
+@pytest.mark.asyncio
+async def test_stop_flushes_remaining_lines(live_session):
+    coach, recorder, _ = live_session
+    debrief = RunningDebrief(coach, recorder, interval_seconds=3600)
+    debrief.start()
+    await say(coach, recorder, "Only valid today.", 1)
+    await debrief.stop()
+    assert debrief.state["covered_lines"] == 1
+
+
+def test_stale_state_is_ignored_after_edit():
+    transcripts = [{"speaker": 0, "text": "Hi"}, {"speaker": 1, "text": "Price is $5."}]
+    state = {"covered_lines": 2, "digest": transcript_digest(transcripts), "negotiation_type": "General"}
+    session = {"negotiation_type": "General", "transcripts": transcripts, "running_debrief": state}
+    assert usable_running_debrief(session) == state
+
+    swapped = dict(session, transcripts=[transcripts[0], dict(transcripts[1], speaker="user")])
+    assert usable_running_debrief(swapped) is None
+    assert usable_running_debrief(dict(session, negotiation_type="Renewal")) is None
+    assert usable_running_debrief(dict(session, transcripts=transcripts[:1])) is None
+
+
+@pytest.fixture
+def detector():
+    with patch("core.analysis_engine.tactic_detection_v2.AsyncOpenAI"):
+        det = TacticDetectorV2(api_key="fake")
+        det.detect_tactics_batch = AsyncMock(side_effect=lambda segs, negotiation_type="General": [urgency(s) for s in segs])
+        det.client.chat.completions.create = AsyncMock(return_value=mock_openai_response({
+            "strong_move": "a", "missed_opportunity": "b", "improvement_tip": "c", "negotiation_score": 70
+        }))
+        yield det
+
+
+@pytest.mark.asyncio
+async def test_summary_reuses_prior_state(detector):
+    transcript = "\n".join([
+        "[0]: What is the price?",
+        "[1]: Only valid today.",
+        "[0]: Hmm.",
+        "[1]: Also expires today.",
+    ])
+    prior = {
+        "covered_lines": 2, "summary_lines": 2, "rolling_summary": "notes",
+        "timeline": [{"line": 1, "category": "URGENCY", "subtype": "deadline", "snippet": "Only valid today."}],
+    }
+    await detector.generate_summary(transcript, {"result": "won"}, prior_state=prior)
+
+    # Only the uncovered tail is classified; covered signals come from the timeline
+    classified = [s.text for call in detector.detect_tactics_batch.call_args_list for s in call.args[0]]
+    assert classified == ["Also expires today."]
+    prompt = detector.client.chat.completions.create.call_args.kwargs["messages"][1]["content"]
+    assert '[LINE 2] URGENCY (deadline): "Only valid today."' in prompt
+    assert '[LINE 4] URGENCY (deadline): "Also expires today."' in prompt
+
+
+@pytest.mark.asyncio
+async def test_long_session_finalizes_from_notes_in_one_call(detector):
+    lines = [f"[{i % 2}]: line {i} " + "we discussed terms and delivery " * 3 for i in range(300)]
+    prior = {"covered_lines": 290, "summary_lines": 290, "rolling_summary": "ROLLING NOTES TEXT", "timeline": []}
+    await detector.generate_summary("\n".join(lines), {"result": "won"}, prior_state=prior)
+
+    assert detector.client.chat.completions.create.call_count == 1
+    prompt = detector.client.chat.completions.create.call_args.kwargs["messages"][1]["content"]
+    assert "ROLLING NOTES TEXT" in prompt
+    assert "line 299" in prompt
+    assert "line 10 " not in prompt
+
+
+@pytest.mark.asyncio
+async def test_update_running_summary_reports_failure(detector):
+    detector.client.chat.completions.create = AsyncMock(side_effect=RuntimeError("down"))
+    from core.analysis_engine.schemas import TranscriptSegment
+    segs = [TranscriptSegment(speaker="COUNTERPARTY", text="Only today.")]
+    assert await detector.update_running_summary("old", segs) is None
+
+    detector.client.chat.completions.create = AsyncMock(return_value=mock_openai_response("new notes"))
+    assert await detector.update_running_summary("old", segs) == "new notes"
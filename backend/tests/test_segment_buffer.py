@@ -0,0 +1,59 @@
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from core.analysis_engine.schemas import TranscriptSegment
+from services.coach import Coach
+from services.segment_buffer import SegmentRingBuffer
+
+
+def seg(i):
+    return TranscriptSegment(speaker="COUNTERPARTY", text=f"line {i}", timestamp=float(i))
+
+
+def test_ring_buffer_keeps_last_segments_and_spills_oldest():
+    spilled = []
+    buf = SegmentRingBuffer(capacity=3, on_spill=spilled.append)
+    assert not buf
+
+    for i in range(5):
+        buf.append(seg(i))
+
+    assert len(buf) == 3
+    assert buf.total == 5
+    assert buf.first_index == 2
+    assert buf[-1].text == "line 4"
+    assert buf[0].text == "line 2"
+    assert [s.text for s in buf[-12:]] == ["line 2", "line 3", "line 4"]
+    assert [s.text for s in spilled] == ["line 0", "line 1"]
+    assert [s.text for s in buf.since(3)] == ["line 3", "line 4"]
+    assert [s.text for s in buf.since(0)] == ["line 2", "line 3", "line 4"]
+
+
+def test_spill_errors_do_not_drop_segments():
+    def boom(_):
+        raise IOError("disk full")
+
+    buf = SegmentRingBuffer(capacity=1, on_spill=boom)
+    buf.append(seg(0))
+    buf.append(seg(1))
+    assert [s.text for s in buf] == ["line 1"]
+
+
+@pytest.mark.asyncio
+async def test_coach_buffer_is_bounded_for_long_calls():
+    with patch("services.coach.TacticDetector"), \
+         patch("services.coach.TacticDetectorV2") as mock_v2_cls:
+        mock_v2_cls.return_value.detect_tactics = AsyncMock(return_value=[])
+        coach = Coach(mode="live")
+        coach.window_size_seconds = 0.0
+
+        for i in range(200):
+            await coach.process_transcript(f"line {i}", 1)
+
+    assert len(coach.audio_buffer) == coach.audio_buffer.capacity
+    assert coach.audio_buffer.total == 200
+    assert coach.last_analyzed_index == 200
+    # The analysis window still sees the most recent 12 segments
+    context = coach.detector_v2.detect_tactics.call_args.kwargs["segments"]
+    assert [s.text for s in context] == [f"line {i}" for i in range(188, 200)]
@@ -0,0 +1,11 @@
+from services.session_recorder import SessionRecorder, session_path, sessions_root
+
+
+def test_sessions_dir_override(monkeypatch, tmp_path):
+    monkeypatch.setenv("SESSIONS_DIR", str(tmp_path))
+    assert sessions_root() == tmp_path
+    recorder = SessionRecorder()
+    recorder.add_transcript("Hello there.", speaker=1)
+    assert recorder.session_file == session_path(recorder.session_id)
+    assert SessionRecorder.get_session(recorder.session_id)["transcripts"][0]["text"] == "Hello there."
+    assert [s["session_id"] for s in SessionRecorder.list_sessions()] == [recorder.session_id]
@@ -0,0 +1,151 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from websockets.protocol import State
+
+from devtools.fake_deepgram import FakeDeepgram
+from services import audio_processor
+from services.audio_processor import AudioProcessor, listen_url
+from main import create_stt_pool
+from services import stt_pool
+from services.stt_pool import KEEPALIVE_MESSAGE, DeepgramConnectionPool
+
+# 100 ms of 16 kHz linear16
+FRAME = b"\x00\x00" * 1600
+
+
+async def _wait_for(predicate, timeout=2.0):
+    for _ in range(int(timeout / 0.02)):
+        if predicate():
+            return
+        await asyncio.sleep(0.02)
+    raise AssertionError("condition not met in time")
+
+
+@pytest.mark.asyncio
+async def test_sessions_take_prewarmed_connections():
+    fake = FakeDeepgram(utterance_seconds=10, latency_ms=0)
+    async with fake.serve(port=0) as server:
+        port = list(server.sockets)[0].getsockname()[1]
+        with patch.object(audio_processor, "DEEPGRAM_URL", f"ws://127.0.0.1:{port}/v1/listen"):
+            pool = DeepgramConnectionPool(listen_url(), {}, max_size=2, min_size=1, keepalive_seconds=60)
+            pool.start()
+            await _wait_for(lambda: pool.idle == 1)
+            assert fake.connections == 1
+
+            processor = AudioProcessor(transcript_callback=None, pool=pool)
+            assert await processor.start()
+            assert pool.hits == 1 and fake.connections == 1
+            assert await processor.send_audio(FRAME)
+            # Taken connection is replaced in the background
+            await _wait_for(lambda: pool.idle == 1)
+            assert fake.connections == 2
+
+            # Other parameters cannot use a pooled connection
+            other = AudioProcessor(transcript_callback=None, endpointing_ms=800, pool=pool)
+            assert await other.start()
+            assert pool.misses == 1 and pool.idle == 1
+
+            await processor.stop()
+            await other.stop()
+            await pool.close()
+            assert pool.idle == 0
+
+
+@pytest.mark.asyncio
+async def test_tick_keeps_alive_and_sizes_from_demand():
+    pool = DeepgramConnectionPool("ws://x", {}, max_size=3, min_size=1)
+
+    def conn(state=State.OPEN):
+        ws = MagicMock()
+        ws.state = state
+        ws.send = AsyncMock()
+        ws.close = AsyncMock()
+        return ws
+    live = [conn(), conn(), conn()]
+    dead = conn(State.CLOSED)
+    pool._idle.extend((ws, 0.0) for ws in [dead] + live)
+
+    with patch("services.stt_pool.time.monotonic", return_value=1.0):
+        pool._acquired_since_tick = 10
+        await pool._tick()
+    # Busy tick: demand well above the max, everything live is kept and pinged
+    assert pool.target_size == 3
+    assert pool.idle == 3
+    dead.close.assert_awaited()
+    for ws in live:
+        ws.send.assert_awaited_with(KEEPALIVE_MESSAGE)
+
+    # Quiet ticks decay demand; the pool shrinks from the oldest end to the floor
+    with patch("services.stt_pool.time.monotonic", return_value=2.0):
+        for _ in range(12):
+            await pool._tick()
+    assert pool.target_size == 1
+    assert [ws for ws, _ in pool._idle] == [live[2]]
+    live[0].close.assert_awaited()
+
+
+@pytest.mark.asyncio
+async def test_endpointing_change_redials_without_breaking_timestamps():
+    fake = FakeDeepgram(script=[(1, "One."), (1, "Two.")], utterance_seconds=0.5, latency_ms=0)
+    starts = []
+    async with fake.serve(port=0) as server:
+        port = list(server.sockets)[0].getsockname()[1]
+        with patch.object(audio_processor, "DEEPGRAM_URL", f"ws://127.0.0.1:{port}/v1/listen"):
+            processor = AudioProcessor(transcript_callback=lambda *args: None)
+            emit = processor._emit
+            processor._emit = lambda t, s, data, *a: (starts.append(data["start"]), emit(t, s, data, *a))
+            assert await processor.start()
+            for _ in range(5):
+                await processor.send_audio(FRAME)
+            await _wait_for(lambda: len(starts) == 1)
+
+            processor.set_endpointing(800)
+            await _wait_for(lambda: fake.connections == 2 and processor._redial_task is None)
+            assert "endpointing=800" in processor.ws.request.path
+            for _ in range(5):
+                await processor.send_audio(FRAME)
+            await _wait_for(lambda: len(starts) == 2)
+            assert processor.connected
+            await processor.stop()
+
+    assert starts == [0.0, 0.5]
+
+
+def test_pool_only_for_deepgram_with_a_key():
+    with patch.dict("os.environ", {"DEEPGRAM_API_KEY": ""}):
+        assert create_stt_pool("deepgram") is None
+    with patch.dict("os.environ", {"DEEPGRAM_API_KEY": "key"}):
+        assert create_stt_pool("local") is None
+        pool = create_stt_pool("deepgram")
+        assert pool.headers == {"Authorization": "Token key"}
+
+
+@pytest.mark.asyncio
+async def test_failed_fills_back_off():
+    attempts = []
+
+    async def refuse(*args, **kwargs):
+        attempts.append(asyncio.get_running_loop().time())
+        raise OSError("connection refused")
+
+    pool = DeepgramConnectionPool("ws://x", {}, max_size=1, min_size=1, keepalive_seconds=60)
+    with patch.object(stt_pool.websockets, "connect", refuse), \
+            patch.object(stt_pool, "_RETRY_BASE_SECONDS", 0.05), \
+            patch.object(stt_pool, "STT_POOL_RETRY_MAX_SECONDS", 0.2):
+        pool.start()
+        await asyncio.sleep(0.1)
+        # Wake-ups (sessions taking connections) do not skip the backoff
+        for _ in range(5):
+            pool._wake.set()
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.6)
+        await pool.close()
+
+    gaps = [b - a for a, b in zip(attempts, attempts[1:])]
+    assert 4 <= len(attempts) <= 7
+    assert gaps[0] == pytest.approx(0.05, abs=0.03)
+    assert gaps[1] == pytest.approx(0.1, abs=0.03)
+    assert max(gaps) == pytest.approx(0.2, abs=0.04)
+    assert pool.fill_failures == len(attempts)
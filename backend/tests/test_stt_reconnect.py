@@ -0,0 +1,108 @@
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from core import metrics
+from devtools.fake_deepgram import FakeDeepgram
+from services import audio_processor
+from services.audio_processor import AudioProcessor
+
+# 100 ms of 16 kHz linear16
+FRAME = b"\x00\x00" * 1600
+
+
+async def _wait_for(predicate, timeout=2.0):
+    for _ in range(int(timeout / 0.02)):
+        if predicate():
+            return
+        await asyncio.sleep(0.02)
+    raise AssertionError("condition not met in time")
+
+
+def _processor(received, statuses, starts):
+    async def on_status(event):
+        statuses.append(event)
+    processor = AudioProcessor(transcript_callback=lambda *args: received.append(args), status_callback=on_status)
+    emit = processor._emit
+
+    def spy(transcript, speaker, data, *args):
+        starts.append(data["start"])
+        emit(transcript, speaker, data, *args)
+    processor._emit = spy
+    return processor
+
+
+@pytest.mark.asyncio
+async def test_reconnects_replays_audio_and_keeps_timestamps_monotonic():
+    fake = FakeDeepgram(script=[(1, "Line one."), (1, "Line two."), (1, "Line three.")], utterance_seconds=0.5, latency_ms=0)
+    received, statuses, starts = [], [], []
+    async with fake.serve(port=0) as server:
+        port = list(server.sockets)[0].getsockname()[1]
+        with patch.object(audio_processor, "DEEPGRAM_URL", f"ws://127.0.0.1:{port}/v1/listen"), \
+             patch.object(audio_processor, "STT_RECONNECT_BASE_SECONDS", 0.01), \
+             patch.object(audio_processor, "STT_REPLAY_BUFFER_MS", 500):
+            processor = _processor(received, statuses, starts)
+            assert await processor.start()
+            for _ in range(10):
+                assert await processor.send_audio(FRAME)
+            await _wait_for(lambda: len(received) == 2)
+
+            # Drop the socket from the server side
+            for connection in server.connections:
+                await connection.close(code=1011, reason="gone")
+            await _wait_for(lambda: processor.connected and processor.reconnects == 1)
+
+            # The replayed 0.5s is re-transcribed on the new connection and skipped;
+            # fresh audio continues the session timeline
+            for _ in range(5):
+                assert await processor.send_audio(FRAME)
+            await _wait_for(lambda: len(received) == 3)
+            await processor.stop()
+            await asyncio.sleep(0.05)
+
+    assert [r[0] for r in received] == ["Line one.", "Line two.", "Line two."]
+    assert starts == [0.0, 0.5, 1.0]
+    assert [s["status"] for s in statuses] == ["reconnecting", "connected"]
+    assert statuses[1]["replayed_seconds"] == 0.5
+    # stop() does not dial again
+    assert fake.connections == 2
+
+
+@pytest.mark.asyncio
+async def test_gives_up_after_max_attempts():
+    fake = FakeDeepgram(utterance_seconds=10, latency_ms=0)
+    received, statuses, starts = [], [], []
+    gave_up_before = metrics.STT_RECONNECTS.value(outcome="gave_up")
+    with patch.object(audio_processor, "STT_RECONNECT_BASE_SECONDS", 0.01), \
+         patch.object(audio_processor, "STT_RECONNECT_MAX_ATTEMPTS", 2):
+        async with fake.serve(port=0) as server:
+            port = list(server.sockets)[0].getsockname()[1]
+            with patch.object(audio_processor, "DEEPGRAM_URL", f"ws://127.0.0.1:{port}/v1/listen"):
+                processor = _processor(received, statuses, starts)
+                assert await processor.start()
+                # Server goes away entirely
+                server.close()
+                await server.wait_closed()
+                await _wait_for(lambda: statuses and statuses[-1]["status"] == "failed")
+
+    assert [s["status"] for s in statuses] == ["reconnecting", "reconnecting", "failed"]
+    assert not processor.connected
+    assert await processor.send_audio(FRAME) is False
+    assert metrics.STT_RECONNECTS.value(outcome="gave_up") == gave_up_before + 1
+    await processor.stop()
+
+
+def test_replay_buffer_keeps_only_recent_audio():
+    with patch.object(audio_processor, "STT_REPLAY_BUFFER_MS", 300):
+        processor = AudioProcessor(transcript_callback=None)
+
+    class _Ws:
+        async def send(self, data):
+            pass
+    processor.ws = _Ws()
+    processor._connected = True
+    for i in range(10):
+        asyncio.run(processor.send_audio(bytes([i]) * 3200))
+    assert [frame[0] for frame in processor._replay] == [7, 8, 9]
+    assert processor._sent_bytes == 32000
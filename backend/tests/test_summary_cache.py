@@ -0,0 +1,85 @@
+import json
+from pathlib import Path
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from main import generate_session_summary
+from services.session_recorder import SessionRecorder
+from services.summary_cache import summary_cache_key
+
+
+TRANSCRIPTS = [
+    {"speaker": 0, "text": "What is the price?", "timestamp": "now"},
+    {"speaker": 1, "text": "It is $40,000, today only.", "timestamp": "now"},
+]
+
+
+@pytest.fixture
+def session_id():
+    project_root = Path(__file__).resolve().parent.parent.parent
+    sessions_dir = project_root / "sessions"
+    sessions_dir.mkdir(parents=True, exist_ok=True)
+    sid = "test_summary_cache"
+    path = sessions_dir / f"{sid}.json"
+    path.write_text(json.dumps({
+        "session_id": sid,
+        "negotiation_type": "Vendor",
+        "outcome": {"result": "won", "confidence": 4, "notes": "", "timestamp": "t1"},
+        "transcripts": TRANSCRIPTS,
+        "advice_given": [],
+    }, indent=2))
+    yield sid
+    if path.exists():
+        path.unlink()
+
+
+def test_cache_key_tracks_summary_inputs():
+    outcome = {"result": "won", "confidence": 4, "notes": "", "timestamp": "t1"}
+    key = summary_cache_key(TRANSCRIPTS, outcome, "Vendor", False)
+
+    # Whitespace and outcome timestamps do not change the key
+    respaced = [dict(t, text=f"  {t['text']}  ") for t in TRANSCRIPTS]
+    assert summary_cache_key(respaced, dict(outcome, timestamp="t2"), "Vendor", False) == key
+
+    assert summary_cache_key(TRANSCRIPTS, dict(outcome, result="lost"), "Vendor", False) != key
+    assert summary_cache_key(TRANSCRIPTS, outcome, "Renewal", False) != key
+    assert summary_cache_key(TRANSCRIPTS, outcome, "Vendor", True) != key
+    swapped = [dict(TRANSCRIPTS[0], speaker="counterparty"), TRANSCRIPTS[1]]
+    assert summary_cache_key(swapped, outcome, "Vendor", False) != key
+
+
+@pytest.mark.asyncio
+async def test_repeat_summary_request_served_from_cache(session_id):
+    summary = {"strong_move": "Held firm.", "missed_opportunity": "m", "improvement_tip": "t"}
+    with patch("main.Coach") as mock_coach_cls:
+        mock_coach_cls.return_value.generate_summary = AsyncMock(return_value=summary)
+
+        first = await generate_session_summary(session_id)
+        second = await generate_session_summary(session_id)
+
+        assert first == summary
+        assert second == summary
+        assert mock_coach_cls.return_value.generate_summary.await_count == 1
+
+        # Outcome update invalidates the cached reflection
+        assert SessionRecorder.update_outcome(session_id, "lost", 2)
+        await generate_session_summary(session_id)
+        assert mock_coach_cls.return_value.generate_summary.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_swap_and_failed_analysis_are_not_cached(session_id):
+    ok = {"strong_move": "Held firm.", "missed_opportunity": "m", "improvement_tip": "t"}
+    failed = {"strong_move": "Analysis failed", "missed_opportunity": "Analysis failed", "improvement_tip": "Analysis failed"}
+    with patch("main.Coach") as mock_coach_cls:
+        mock_coach_cls.return_value.generate_summary = AsyncMock(side_effect=[ok, failed, ok])
+
+        await generate_session_summary(session_id)
+        assert SessionRecorder.swap_speaker_role(session_id, 0)
+        saved = SessionRecorder.get_session(session_id)
+        assert "cache_key" not in saved["summary_details"]
+
+        assert await generate_session_summary(session_id) == failed
+        assert await generate_session_summary(session_id) == ok
+        assert mock_coach_cls.return_value.generate_summary.await_count == 3
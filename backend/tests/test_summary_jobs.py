@@ -0,0 +1,140 @@
+import asyncio
+import json
+from unittest.mock import patch
+
+import pytest
+
+from services.summary_jobs import SummaryJobQueue
+
+
+@pytest.mark.asyncio
+async def test_job_reports_progress_and_result():
+    release = asyncio.Event()
+
+    async def runner(session_id, expanded=False, on_progress=None):
+        on_progress(10, 40)
+        await release.wait()
+        on_progress(40, 40)
+        return {"strong_move": f"summary for {session_id}"}
+
+    queue = SummaryJobQueue(runner)
+    job = queue.submit("s1")
+    await asyncio.sleep(0)
+
+    assert job["status"] == "running"
+    assert job["progress"] == {"analyzed": 10, "total": 40}
+
+    release.set()
+    await asyncio.sleep(0.01)
+    done = queue.get(job["job_id"])
+    assert done["status"] == "done"
+    assert done["progress"] == {"analyzed": 40, "total": 40}
+    assert queue.describe(done, include_result=True)["result"] == {"strong_move": "summary for s1"}
+
+
+@pytest.mark.asyncio
+async def test_duplicate_submissions_are_deduplicated():
+    calls = []
+    release = asyncio.Event()
+
+    async def runner(session_id, expanded=False, on_progress=None):
+        calls.append(session_id)
+        await release.wait()
+        return {}
+
+    queue = SummaryJobQueue(runner)
+    first = queue.submit("s1")
+    second = queue.submit("s1")
+    other = queue.submit("s1", expanded=True)
+
+    assert first["job_id"] == second["job_id"]
+    assert other["job_id"] != first["job_id"]
+
+    release.set()
+    await asyncio.sleep(0.01)
+    assert calls == ["s1", "s1"]
+    # Once finished, a new submission starts a fresh job
+    assert queue.submit("s1")["job_id"] != first["job_id"]
+
+
+@pytest.mark.asyncio
+async def test_concurrency_limit_and_failures():
+    running = {"now": 0, "peak": 0}
+
+    async def runner(session_id, expanded=False, on_progress=None):
+        running["now"] += 1
+        running["peak"] = max(running["peak"], running["now"])
+        await asyncio.sleep(0.01)
+        running["now"] -= 1
+        if session_id == "bad":
+            raise ValueError("boom")
+        return {}
+
+    queue = SummaryJobQueue(runner, max_concurrency=2)
+    jobs = [queue.submit(sid) for sid in ("a", "b", "c", "bad")]
+    assert jobs[2]["status"] == "queued"
+
+    await asyncio.sleep(0.1)
+    assert running["peak"] == 2
+    assert [j["status"] for j in jobs] == ["done", "done", "done", "failed"]
+    assert jobs[3]["error"] == "boom"
+
+
+@pytest.mark.asyncio
+async def test_job_endpoints():
+    import main
+
+    async def runner(session_id, expanded=False, on_progress=None):
+        return {"strong_move": "ok"}
+
+    with patch.object(main, "summary_jobs", SummaryJobQueue(runner)), \
+         patch.object(main, "session_path") as mock_path:
+        mock_path.return_value.exists.return_value = True
+        submitted = await main.submit_summary_job("s1")
+        assert submitted.status_code == 202
+        job_id = json.loads(submitted.body)["job_id"]
+
+        await asyncio.sleep(0.01)
+        status = await main.get_summary_job(job_id)
+        body = json.loads(status.body)
+        assert body["status"] == "done"
+        assert body["result"] == {"strong_move": "ok"}
+
+        missing = await main.get_summary_job("nope")
+        assert missing.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_sync_endpoint_joins_the_running_job():
+    import main
+
+    calls = []
+    release = asyncio.Event()
+
+    async def runner(session_id, expanded=False, on_progress=None):
+        calls.append(session_id)
+        await release.wait()
+        if session_id == "bad":
+            raise ValueError("boom")
+        return {"strong_move": "ok"}
+
+    with patch.object(main, "summary_jobs", SummaryJobQueue(runner)), \
+         patch.object(main, "session_path") as mock_path:
+        mock_path.return_value.exists.return_value = True
+        submitted = await main.submit_summary_job("s1")
+        waiting = asyncio.create_task(main.generate_session_summary("s1"))
+        await asyncio.sleep(0.01)
+        assert not waiting.done()
+
+        release.set()
+        assert await waiting == {"strong_move": "ok"}
+        assert calls == ["s1"]
+        assert main.summary_jobs.get(json.loads(submitted.body)["job_id"])["status"] == "done"
+
+        failed = await main.generate_session_summary("bad")
+        assert failed.status_code == 500 and json.loads(failed.body) == {"message": "boom"}
+
+        mock_path.return_value.exists.return_value = False
+        missing = await main.generate_session_summary("gone")
+        assert missing.status_code == 404
+        assert calls == ["s1", "bad"]
@@ -0,0 +1,220 @@
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from core.analysis_engine.schemas import TranscriptSegment
+from core.analysis_engine.tactic_detection_v2 import TacticDetectorV2
+
+
+def mock_openai_response(content_json):
+    mock_response = MagicMock()
+    mock_response.choices = [MagicMock()]
+    mock_response.choices[0].message.content = json.dumps(content_json)
+    return mock_response
+
+
+def make_segment(text, timestamp=0.0):
+    return TranscriptSegment(speaker="COUNTERPARTY", text=text, timestamp=timestamp)
+
+
+@pytest.fixture
+def detector():
+    with patch("core.analysis_engine.tactic_detection_v2.AsyncOpenAI"):
+        det = TacticDetectorV2(api_key="fake")
+        det.client.chat.completions.create = AsyncMock()
+        yield det
+
+
+@pytest.mark.asyncio
+async def test_batch_single_request_maps_results_per_line(detector):
+    detector.client.chat.completions.create.return_value = mock_openai_response({
+        "results": [
+            {"line": 1, "signals": [{"category": "AUTHORITY", "subtype": "manager_deferral", "confidence": 0.9, "evidence": "Let me check with my manager."}]},
+            {"line": "3", "signals": [{"category": "URGENCY", "subtype": "deadline", "confidence": 0.9, "evidence": "This expires today."}]},
+        ]
+    })
+
+    lines = [
+        make_segment("Let me check with my manager.", 1.0),
+        make_segment("Thanks for coming in.", 2.0),
+        make_segment("This expires today.", 3.0),
+    ]
+    results = await detector.detect_tactics_batch(lines)
+
+    assert detector.client.chat.completions.create.call_count == 1
+    assert len(results) == 3
+    assert results[0][0].category == "AUTHORITY"
+    assert results[1] == []
+    assert results[2][0].category == "URGENCY"
+    assert results[2][0].timestamp == 3.0
+
+    user_content = detector.client.chat.completions.create.call_args.kwargs["messages"][1]["content"]
+    assert "[LINE 1] [COUNTERPARTY]: Let me check with my manager." in user_content
+    assert "[LINE 3] [COUNTERPARTY]: This expires today." in user_content
+
+
+@pytest.mark.asyncio
+async def test_batch_applies_postprocessing_per_line(detector):
+    detector.client.chat.completions.create.return_value = mock_openai_response({
+        "results": [
+            {"line": 1, "signals": [{"category": "COMMITMENT_TRAP", "subtype": "conditional_commitment", "confidence": 0.9, "evidence": "We need a decision soon."}]},
+            {"line": 2, "signals": [{"category": "SOCIAL_PROOF", "subtype": "herd_reference", "confidence": 0.9, "evidence": "The other dealer will match it."}]},
+        ]
+    })
+
+    lines = [
+        make_segment("We need a decision soon."),
+        make_segment("The other dealer will match it."),
+        make_segment("The price is $42,000."),
+        make_segment("This episode is brought to you by our sponsor."),
+    ]
+    results = await detector.detect_tactics_batch(lines)
+
+    # Commitment trap without a conditional exchange is neutralized
+    assert results[0][0].category == "NONE"
+    # Competitor mention is remapped away from SOCIAL_PROOF
+    assert results[1][0].category == "ANCHORING"
+    assert results[1][0].subtype == "comparison_anchor"
+    # Omitted line still gets the deterministic price anchor override
+    assert results[2][0].subtype == "numeric_anchor"
+    # Ad-like line is never sent to the model
+    assert results[3] == []
+    user_content = detector.client.chat.completions.create.call_args.kwargs["messages"][1]["content"]
+    assert "sponsor" not in user_content
+
+
+@pytest.mark.asyncio
+async def test_batch_invalid_json_retries_then_returns_empty(detector):
+    bad = MagicMock()
+    bad.choices = [MagicMock()]
+    bad.choices[0].message.content = "not json"
+    detector.client.chat.completions.create.side_effect = [bad, bad]
+
+    results = await detector.detect_tactics_batch([make_segment("Hello there.")])
+
+    assert detector.client.chat.completions.create.call_count == 2
+    assert results == [[]]
+
+
+@pytest.mark.asyncio
+async def test_generate_summary_uses_one_batch_call(detector):
+    detector.client.chat.completions.create.side_effect = [
+        mock_openai_response({
+            "results": [
+                # Batch numbering is per opponent line; summary numbering is per transcript line
+                {"line": 1, "signals": [{"category": "URGENCY", "subtype": "deadline", "confidence": 0.9, "evidence": "Only valid today."}]},
+            ]
+        }),
+        mock_openai_response({
+            "strong_move": "Asked for time.",
+            "missed_opportunity": "Did not verify the deadline.",
+            "improvement_tip": "Ask what happens after today.",
+            "negotiation_score": 70,
+        }),
+    ]
+
+    transcript = "\n".join([
+        "[Speaker 0]: What is the price?",
+        "[Speaker 1]: It is only valid today.",
+        "[Speaker 0]: I need to think.",
+        "[Speaker 1]: Sure, take a look.",
+    ])
+    summary = await detector.generate_summary(transcript, {"result": "won"})
+
+    assert detector.client.chat.completions.create.call_count == 2
+    assert summary.negotiation_score == 70
+    summary_prompt = detector.client.chat.completions.create.call_args.kwargs["messages"][1]["content"]
+    assert "[LINE 2] URGENCY (deadline)" in summary_prompt
+
+
+@pytest.mark.asyncio
+async def test_generate_summary_batches_run_concurrently_in_line_order(detector, monkeypatch):
+    import asyncio
+    from core.analysis_engine import tactic_detection_v2
+
+    monkeypatch.setattr(tactic_detection_v2, "SUMMARY_BATCH_SIZE", 2)
+    detector.max_concurrency = 2
+    in_flight = {"now": 0, "peak": 0}
+
+    async def fake_batch(segs, negotiation_type="General"):
+        in_flight["now"] += 1
+        in_flight["peak"] = max(in_flight["peak"], in_flight["now"])
+        # Earlier batches finish last, so ordering must come from the line index
+        await asyncio.sleep(0.01 if segs[0].text == "line 1" else 0)
+        in_flight["now"] -= 1
+        return [[tactic_detection_v2.TacticSignal(category="URGENCY", subtype="deadline", confidence=0.9, evidence=s.text)] for s in segs]
+
+    detector.detect_tactics_batch = fake_batch
+    detector.client.chat.completions.create.return_value = mock_openai_response({
+        "strong_move": "a", "missed_opportunity": "b", "improvement_tip": "c"
+    })
+    progress = []
+
+    transcript = "\n".join(f"[Speaker 1]: line {i}" for i in range(1, 7))
+    await detector.generate_summary(transcript, {"result": "won"}, on_progress=lambda done, total: progress.append((done, total)))
+
+    assert in_flight["peak"] == 2
+    prompt = detector.client.chat.completions.create.call_args.kwargs["messages"][1]["content"]
+    positions = [prompt.index(f"[LINE {i}] URGENCY") for i in range(1, 7)]
+    assert positions == sorted(positions)
+    assert progress[-1] == (6, 6)
+
+
+@pytest.mark.asyncio
+async def test_generate_summary_progress_total_is_final(detector, monkeypatch):
+    from core.analysis_engine import tactic_detection_v2
+
+    monkeypatch.setattr(tactic_detection_v2, "SUMMARY_BATCH_SIZE", 2)
+
+    async def fake_batch(segs, negotiation_type="General"):
+        # Finishes before normalization has counted the remaining lines
+        return [[] for _ in segs]
+
+    detector.detect_tactics_batch = fake_batch
+    detector.client.chat.completions.create.return_value = mock_openai_response({
+        "strong_move": "a", "missed_opportunity": "b", "improvement_tip": "c"
+    })
+    progress = []
+
+    transcript = "\n".join(f"[Speaker 1]: line {i}" for i in range(1, 11))
+    await detector.generate_summary(transcript, {"result": "won"}, on_progress=lambda done, total: progress.append((done, total)))
+
+    assert {total for _, total in progress} == {10}
+    assert [done for done, _ in progress] == sorted(done for done, _ in progress)
+    assert progress[-1] == (10, 10)
+
+
+@pytest.mark.asyncio
+async def test_batch_backs_off_on_rate_limit(detector, monkeypatch):
+    import httpx
+    from openai import RateLimitError
+    from core.analysis_engine import tactic_detection_v2
+
+    sleeps = []
+
+    async def fake_sleep(delay):
+        sleeps.append(delay)
+
+    monkeypatch.setattr(tactic_detection_v2.asyncio, "sleep", fake_sleep)
+    limited = RateLimitError(
+        "rate limited",
+        response=httpx.Response(429, headers={"retry-after": "3"}, request=httpx.Request("POST", "https://api.openai.com")),
+        body=None,
+    )
+    detector.client.chat.completions.create.side_effect = [
+        limited,
+        mock_openai_response({"results": [{"line": 1, "signals": [{"category": "URGENCY", "subtype": "deadline", "confidence": 0.9, "evidence": "Today only."}]}]}),
+    ]
+
+    from core import metrics
+    retried = metrics.LLM_CALL_SECONDS.count(operation="batch", attempt=1, retry=1)
+    second_attempts = metrics.LLM_CALL_SECONDS.count(operation="batch", attempt=2, retry=0)
+
+    results = await detector.detect_tactics_batch([make_segment("Today only.")])
+
+    assert sleeps == [3.0]
+    # The rate-limit retry is labelled as a retry of attempt 1, not as the JSON re-ask
+    assert metrics.LLM_CALL_SECONDS.count(operation="batch", attempt=1, retry=1) == retried + 1
+    assert metrics.LLM_CALL_SECONDS.count(operation="batch", attempt=2, retry=0) == second_attempts
+    assert results[0][0].category == "URGENCY"
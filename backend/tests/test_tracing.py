@@ -0,0 +1,101 @@
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from core import tracing
+from core.analysis_engine.schemas import TranscriptSegment
+from core.analysis_engine.tactic_detection_v2 import TacticDetectorV2
+from services.audio_processor import AudioProcessor
+from services.coach import Coach
+from services.session_recorder import SessionRecorder
+
+
+def mock_openai_response(content):
+    mock_response = MagicMock()
+    mock_response.choices = [MagicMock()]
+    mock_response.choices[0].message.content = content
+    return mock_response
+
+
+@pytest.fixture
+def trace_file(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    tracing.set_exporter(tracing.JsonlSpanExporter(str(path)))
+    yield path
+    tracing.set_exporter(None)
+
+
+def read_spans(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_spans_are_noops_without_exporter(tmp_path):
+    tracing.set_exporter(None)
+    with tracing.span("anything", "abc") as attrs:
+        attrs["x"] = 1
+    tracing.record_span("other", "abc", 0.0)
+    assert not tracing.enabled()
+
+
+@pytest.mark.asyncio
+async def test_trace_id_flows_from_stt_to_advice(trace_file):
+    received = []
+    processor = AudioProcessor(transcript_callback=lambda *args: received.append(args))
+    processor.ws = MagicMock()
+    messages = [json.dumps({
+        "type": "Results", "is_final": True, "speech_final": True, "start": 3.2, "duration": 1.4,
+        "channel": {"alternatives": [{"transcript": "The price is $50,000, final offer.", "words": [{"speaker": 1}]}]},
+    })]
+
+    async def iterate():
+        for m in messages:
+            yield m
+    processor.ws.__aiter__ = lambda self: iterate()
+    await processor._receive_messages()
+
+    transcript, speaker, trace_id = received[0]
+    assert trace_id and len(trace_id) == 16
+
+    signal = json.dumps({"signals": [{
+        "category": "ANCHOR", "subtype": "anchor_high", "confidence": 0.9,
+        "evidence": transcript, "options": ["Ask how they arrived at that number."],
+    }]})
+    with patch("services.coach.TacticDetector"), \
+         patch("core.analysis_engine.tactic_detection_v2.AsyncOpenAI"):
+        coach = Coach(mode="live")
+        coach.detector_v2.client.chat.completions.create = AsyncMock(return_value=mock_openai_response(signal))
+        coach.window_size_seconds = 0.0
+        advice = await coach.process_transcript(transcript, speaker, trace_id=trace_id)
+
+    assert advice is not None and advice["trace_id"] == trace_id
+    names = {s["span"] for s in read_spans(trace_file) if s["trace_id"] == trace_id}
+    assert {"stt.final_to_callback", "coach.gate", "coach.detect", "detect.prompt_build", "llm.detect", "detect.postprocess"} <= names
+    stt = next(s for s in read_spans(trace_file) if s["span"] == "stt.final_to_callback")
+    assert stt["audio_start"] == 3.2 and stt["speaker"] == 1
+
+
+@pytest.mark.asyncio
+async def test_retry_attempts_are_separate_spans(trace_file):
+    with patch("core.analysis_engine.tactic_detection_v2.AsyncOpenAI"):
+        det = TacticDetectorV2(api_key="fake")
+    det.client.chat.completions.create = AsyncMock(side_effect=[
+        mock_openai_response("not json"),
+        mock_openai_response(json.dumps({"signals": []})),
+    ])
+    seg = TranscriptSegment(speaker="COUNTERPARTY", text="We need an answer by Friday.", trace_id="t1")
+    await det.detect_tactics([seg], new_segments=[seg])
+
+    attempts = [s["attempt"] for s in read_spans(trace_file) if s["span"] == "llm.detect"]
+    assert attempts == [1, 2]
+
+
+def test_recorder_keeps_trace_id(tmp_path, trace_file):
+    with patch.object(SessionRecorder, "_get_sessions_dir", return_value=tmp_path):
+        recorder = SessionRecorder()
+    recorder.add_transcript("Hello there, thanks for coming.", speaker=1, trace_id="abc123")
+    recorder.add_transcript("No trace here.", speaker=0)
+
+    assert recorder.transcripts[0]["trace_id"] == "abc123"
+    assert "trace_id" not in recorder.transcripts[1]
+    assert any(s["span"] == "recorder.flush" and s["trace_id"] == "abc123" for s in read_spans(trace_file))
@@ -0,0 +1,130 @@
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from core import metrics
+from services.session_recorder import SessionRecorder
+from services.transcript_pipeline import TranscriptPipeline
+
+
+class SlowCoach:
+    """Records call order and whether process_transcript calls ever overlapped."""
+
+    def __init__(self, delay=0.01, advice_for=()):
+        self.delay = delay
+        self.advice_for = set(advice_for)
+        self.seen = []
+        self.active = 0
+        self.max_active = 0
+        self.scheduler = SimpleNamespace(run=None)
+        self._analyze_pending = AsyncMock()
+
+    async def process_transcript(self, transcript, speaker, trace_id=None):
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        await asyncio.sleep(self.delay)
+        self.seen.append(transcript)
+        self.active -= 1
+        if transcript in self.advice_for:
+            return {"category": "URGENCY", "trace_id": trace_id}
+        return None
+
+
+@pytest.fixture
+def recorder(tmp_path, monkeypatch):
+    monkeypatch.setenv("SESSIONS_DIR", str(tmp_path))
+    return SessionRecorder()
+
+
+@pytest.mark.asyncio
+async def test_lines_are_analyzed_in_order_one_at_a_time(recorder):
+    coach = SlowCoach(advice_for={"line 3"})
+    deliver = AsyncMock()
+    pipeline = TranscriptPipeline(coach, recorder, deliver, maxsize=16)
+    pipeline.start()
+    for i in range(6):
+        pipeline.submit(f"line {i}", 1, trace_id=f"t{i}")
+    await pipeline.close()
+
+    assert coach.seen == [f"line {i}" for i in range(6)]
+    assert coach.max_active == 1
+    deliver.assert_awaited_once_with({"category": "URGENCY", "trace_id": "t3"})
+    assert [t["text"] for t in recorder.transcripts] == coach.seen
+    assert recorder.transcripts[3]["trace_id"] == "t3"
+
+
+@pytest.mark.asyncio
+async def test_full_queue_drops_oldest_but_records_everything(recorder):
+    coach = SlowCoach(delay=0.05)
+    pipeline = TranscriptPipeline(coach, recorder, AsyncMock(), maxsize=2)
+    pipeline.start()
+    dropped_before = metrics.PIPELINE_DROPPED.value()
+    depth_before = metrics.PIPELINE_QUEUE_DEPTH.value()
+
+    pipeline.submit("line 0", 1)
+    await asyncio.sleep(0.01)  # consumer picks up line 0
+    for i in range(1, 6):
+        pipeline.submit(f"line {i}", 1)
+    assert pipeline.depth == 2
+    await pipeline.close()
+
+    # line 0 was in flight; lines 1-3 were dropped in favour of the newest two
+    assert coach.seen == ["line 0", "line 4", "line 5"]
+    assert pipeline.dropped == 3
+    assert metrics.PIPELINE_DROPPED.value() == dropped_before + 3
+    assert metrics.PIPELINE_QUEUE_DEPTH.value() == depth_before
+    assert len(recorder.transcripts) == 6
+
+
+@pytest.mark.asyncio
+async def test_persistence_batches_writes(recorder):
+    coach = SlowCoach(delay=0)
+    pipeline = TranscriptPipeline(coach, recorder, AsyncMock())
+    with patch.object(recorder, "_save", wraps=recorder._save) as save:
+        pipeline.start()
+        for i in range(20):
+            pipeline.submit(f"line {i}", 1)
+        await pipeline.close()
+
+    assert len(recorder.transcripts) == 20
+    assert save.call_count < 20
+
+
+@pytest.mark.asyncio
+async def test_trailing_analysis_runs_through_the_queue(recorder):
+    coach = SlowCoach(delay=0.02)
+    pipeline = TranscriptPipeline(coach, recorder, AsyncMock())
+    pipeline.start()
+    pipeline.submit("line 0", 1)
+    # The scheduler fires while line 0 is still being analyzed
+    await coach.scheduler.run()
+    assert not coach._analyze_pending.await_count
+    await pipeline.close()
+
+    assert coach.seen == ["line 0"]
+    coach._analyze_pending.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_real_coach_arms_trailing_analysis(recorder):
+    with patch("services.coach.TacticDetector"), \
+         patch("services.coach.TacticDetectorV2") as mock_v2_cls:
+        mock_v2_cls.return_value.detect_tactics = AsyncMock(return_value=[])
+        from services.coach import Coach
+        coach = Coach(mode="live")
+        deliver = AsyncMock()
+        coach.advice_callback = deliver
+        pipeline = TranscriptPipeline(coach, recorder, deliver)
+        pipeline.start()
+        pipeline.submit("Our standard package includes installation.", 1)
+        pipeline.submit("Installation is usually two weeks out.", 1)
+        await asyncio.sleep(0.05)
+        assert coach.scheduler.pending
+        coach.scheduler.clear()
+        await pipeline.close()
+        coach.close()
+
+    assert mock_v2_cls.return_value.detect_tactics.await_count == 1
+    assert len(recorder.transcripts) == 2
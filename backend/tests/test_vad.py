@@ -0,0 +1,161 @@
+import asyncio
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from devtools.fake_deepgram import FakeDeepgram
+from scripts.loadtest import synthetic_pcm
+from services import audio_ingest, audio_processor
+from services.audio_ingest import AudioIngestBuffer
+from services.audio_processor import AudioProcessor, _StreamTimeline
+from services.vad import VoiceActivityDetector, frame_features
+
+RATE = 16000
+SILENCE = b"\x00\x00" * 1600  # 100 ms
+
+
+def tone(seconds=0.1, amplitude=8000, freq=220):
+    t = np.arange(int(RATE * seconds)) / RATE
+    return (amplitude * np.sin(2 * np.pi * freq * t)).astype("<i2").tobytes()
+
+
+def noise(seconds=0.1, amplitude=60, seed=1):
+    rng = np.random.default_rng(seed)
+    return rng.uniform(-amplitude, amplitude, int(RATE * seconds)).astype("<i2").tobytes()
+
+
+def test_frame_features():
+    assert frame_features(SILENCE) == (-100.0, 0.0)
+    level, zcr = frame_features(tone())
+    assert level == pytest.approx(-15.2, abs=0.5)
+    assert zcr == pytest.approx(2 * 220 / RATE, abs=0.005)
+    # White noise crosses zero about every other sample
+    assert frame_features(noise())[1] > 0.4
+
+
+def test_hangover_and_preroll():
+    vad = VoiceActivityDetector(hangover_ms=200, preroll_ms=200)
+    results = [vad.process(SILENCE) for _ in range(5)]
+    # The last 200 ms are held back as pre-roll, older silence is dropped
+    assert [r[0] for r in results] == [[]] * 5
+    assert sum(r[1] for r in results) == pytest.approx(0.3)
+
+    speech = tone()
+    sent, skipped = vad.process(speech)
+    assert sent == [SILENCE, SILENCE, speech] and skipped == 0
+
+    # Hangover: two more frames go out, then silence is withheld again
+    assert [len(vad.process(SILENCE)[0]) for _ in range(3)] == [1, 1, 0]
+    assert vad.speech_seconds == pytest.approx(0.1)
+    assert vad.saved_seconds == pytest.approx(0.4)
+
+
+def test_quiet_fricatives_count_as_speech():
+    vad = VoiceActivityDetector(threshold_db=-50, hangover_ms=0, preroll_ms=0)
+    # About -55 dBFS: under the threshold but noisy like an "s"
+    level, _ = frame_features(noise(amplitude=100))
+    assert -58 < level < -50
+    assert vad.is_speech(noise(amplitude=100))
+    assert not vad.is_speech(tone(amplitude=20))
+
+
+def test_quiet_background_noise_is_learned():
+    vad = VoiceActivityDetector(threshold_db=-50, margin_db=10, hangover_ms=0, preroll_ms=0)
+    hum = tone(amplitude=80, freq=60)  # about -55 dBFS, low ZCR
+    quiet_voice = tone(amplitude=150)  # about -50 dBFS
+    assert vad.is_speech(quiet_voice)
+    for _ in range(400):
+        assert not vad.is_speech(hum)
+    # The floor sits near the hum now: barely-above-threshold audio no longer counts
+    assert vad.noise_floor_db == pytest.approx(-55, abs=1)
+    assert not vad.is_speech(quiet_voice)
+    assert vad.is_speech(tone(amplitude=8000))
+
+
+def test_long_speech_level_audio_keeps_flowing():
+    # The loadtest's stream: a steady speech-level tone, minutes long
+    chunk = synthetic_pcm()
+    vad = VoiceActivityDetector()
+    withheld = 0
+    for _ in range(90):  # 3 minutes
+        for i in range(0, len(chunk), 3200):
+            sent, skipped = vad.process(chunk[i:i + 3200])
+            withheld += skipped + (not sent)
+    assert withheld == 0
+    assert vad.noise_floor_db == vad.threshold_db - vad.margin_db
+
+
+def test_timeline_maps_stream_time_past_withheld_audio():
+    timeline = _StreamTimeline(offset=10.0)
+    timeline.skip(2.0, 1.5)
+    timeline.skip(3.0, 0.5)
+    assert timeline.to_session(1.0) == 11.0
+    assert timeline.to_session(2.0) == 13.5
+    assert timeline.to_session(3.5) == 15.5
+    # A replay starting at stream 2.5 keeps the later withheld point
+    rebased = timeline.rebase(2.5)
+    assert rebased.to_session(0.0) == 14.0
+    assert rebased.to_session(1.0) == 15.5
+
+
+class KeepAliveProcessor:
+    connected = True
+
+    def __init__(self):
+        self.frames, self.skipped, self.keepalives = [], [], 0
+
+    async def send_audio(self, data):
+        self.frames.append(data)
+        return True
+
+    async def send_keepalive(self):
+        self.keepalives += 1
+        return True
+
+    def skip_audio(self, seconds):
+        self.skipped.append(seconds)
+
+
+@pytest.mark.asyncio
+async def test_ingest_withholds_silence_and_keeps_alive():
+    proc = KeepAliveProcessor()
+    vad = VoiceActivityDetector(hangover_ms=0, preroll_ms=100)
+    with patch.object(audio_ingest, "VAD_KEEPALIVE_SECONDS", 0.05):
+        ingest = AudioIngestBuffer(proc, frame_ms=100, vad=vad)
+        ingest.start()
+        ingest.push(SILENCE * 10)
+        await asyncio.sleep(0.15)
+        ingest.push(tone(0.2))
+        await ingest.close()
+
+    assert proc.keepalives >= 1
+    assert sum(proc.skipped) == pytest.approx(0.9)
+    # Pre-roll frame, then the speech
+    assert [len(f) for f in proc.frames] == [3200, 3200, 3200]
+    assert ingest.stats()["vad_saved_seconds"] == pytest.approx(0.9)
+
+
+@pytest.mark.asyncio
+async def test_transcript_timestamps_include_withheld_silence():
+    fake = FakeDeepgram(script=[(1, "Hello there.")], utterance_seconds=0.5, latency_ms=0)
+    starts = []
+    async with fake.serve(port=0) as server:
+        port = list(server.sockets)[0].getsockname()[1]
+        with patch.object(audio_processor, "DEEPGRAM_URL", f"ws://127.0.0.1:{port}/v1/listen"):
+            processor = AudioProcessor(transcript_callback=lambda *args: None)
+            emit = processor._emit
+            processor._emit = lambda t, s, data, *a: (starts.append(data["start"]), emit(t, s, data, *a))
+            assert await processor.start()
+            ingest = AudioIngestBuffer(processor, frame_ms=100, max_buffer_ms=5000, vad=VoiceActivityDetector(hangover_ms=0, preroll_ms=200))
+            ingest.start()
+            # 2s of silence, then speech: only 0.2s pre-roll + speech reach Deepgram
+            ingest.push(SILENCE * 20 + tone(0.5))
+            for _ in range(100):
+                if starts:
+                    break
+                await asyncio.sleep(0.02)
+            await ingest.close()
+            await processor.stop()
+
+    assert starts == [1.8]
@@ -3,12 +3,23 @@ import OutcomeModal from './OutcomeModal';
 import PreFlight from './PreFlight';
 import SummaryView from './SummaryView';
 import SessionHistory from './SessionHistory';
+import { AudioTransport } from './audioTransport';
 
 // Electron IPC for receiving toggle events
 const ipcRenderer = (window as any).require?.('electron')?.ipcRenderer;
 
 const ADVICE_DURATION_MS = 8000;
 const SAMPLE_RATE = 16000;
+// Compressed transport (~32 kbps instead of 256 kbps PCM) when the browser can record it;
+// the backend passes it through to Deepgram. Falls back to PCM if not accepted.
+const COMPRESSED_MIME = 'audio/webm;codecs=opus';
+const COMPRESSED_BITRATE = 32000;
+const RECORDER_TIMESLICE_MS = 250;
+
+const createRecorder = (stream: MediaStream) => new MediaRecorder(stream, {
+    mimeType: COMPRESSED_MIME,
+    audioBitsPerSecond: COMPRESSED_BITRATE
+});
 
 // App Store Mode: When true, forces Mic Only mode (no system audio capture)
 // This is required for Mac App Store compliance
@@ -61,6 +72,7 @@ export default function Overlay() {
     const [emitInterim, setEmitInterim] = useState(false);
     const [endpointingMs, setEndpointingMs] = useState<number>(300);
     const [windowSizeSeconds, setWindowSizeSeconds] = useState<number>(15);
+    const [sttStatus, setSttStatus] = useState<string>('connected'); // 'connected' | 'reconnecting' | 'failed'
     const [hasSystemAudio, setHasSystemAudio] = useState(false);
     const [micLevel, setMicLevel] = useState(0);
     const [systemLevel, setSystemLevel] = useState(0);
@@ -91,6 +103,11 @@ export default function Overlay() {
     const micAnalyserRef = useRef<AnalyserNode | null>(null);
     const systemAnalyserRef = useRef<AnalyserNode | null>(null);
     const animationRef = useRef<number | null>(null);
+    // PCM vs. compressed (MediaRecorder) audio for the current connection
+    const transportRef = useRef(new AudioTransport(createRecorder, RECORDER_TIMESLICE_MS));
+
+    // Stop the recorder (and its mic capture) when the overlay goes away
+    useEffect(() => () => transportRef.current.stop(), []);
 
     // Listen for toggle shortcut from Electron main process
     useEffect(() => {
@@ -211,6 +228,12 @@ export default function Overlay() {
         try {
             const ws = new WebSocket('ws://127.0.0.1:8000/ws');
             socketRef.current = ws;
+            const compressed = typeof MediaRecorder !== 'undefined' && MediaRecorder.isTypeSupported(COMPRESSED_MIME);
+            const transport = transportRef.current;
+            // Also drops a recorder left over from a previous connection
+            transport.begin(compressed, (chunk) => {
+                if (ws.readyState === WebSocket.OPEN) ws.send(chunk);
+            });
 
             await new Promise<void>((resolve, reject) => {
                 ws.onopen = () => {
@@ -225,7 +248,8 @@ export default function Overlay() {
                         test_mode_counterparty: testModeCounterparty,
                         emit_interim: emitInterim,
                         endpointing_ms: endpointingMs,
-                        window_size_seconds: windowSizeSeconds
+                        window_size_seconds: windowSizeSeconds,
+                        ...(compressed ? { audio_format: { encoding: 'webm', bitrate: COMPRESSED_BITRATE } } : {})
                     }));
                     resolve();
                 };
@@ -243,6 +267,13 @@ export default function Overlay() {
                         console.log('Session ID:', data.session_id);
                     } else if (data.type === 'personality_changed') {
                         console.log('Personality confirmed:', data.personality);
+                    } else if (data.type === 'audio_format') {
+                        console.log('Audio format:', data);
+                        transport.handleAck(data);
+                    } else if (data.type === 'stt_status') {
+                        // Backend transcription dropped / came back
+                        console.log('STT status:', data);
+                        setSttStatus(data.status);
                     }
                 } catch {
                     // Legacy: plain text advice (backwards compatibility)
@@ -250,7 +281,11 @@ export default function Overlay() {
                 }
             };
 
-            ws.onclose = () => setStatus('connecting');
+            ws.onclose = () => {
+                // A retry may already own the transport
+                if (socketRef.current === ws) transport.stop();
+                setStatus('connecting');
+            };
 
             // Create audio context
             const audioContext = new window.AudioContext({ sampleRate: SAMPLE_RATE });
@@ -297,8 +332,18 @@ export default function Overlay() {
             merger.connect(processor);
             processor.connect(audioContext.destination);
 
+            // Mono mix for the compressed recorder (same mix as the PCM path below)
+            const mixNode = audioContext.createGain();
+            mixNode.channelCount = 1;
+            mixNode.channelCountMode = 'explicit';
+            (withSystemAudio ? merger : micSource).connect(mixNode);
+            const mixDestination = audioContext.createMediaStreamDestination();
+            mixNode.connect(mixDestination);
+            // Starts the recorder if the ack arrived before the audio graph was ready
+            transport.setMixStream(mixDestination.stream);
+
             processor.onaudioprocess = (e) => {
-                if (ws.readyState === WebSocket.OPEN) {
+                if (ws.readyState === WebSocket.OPEN && transport.sendsPcm) {
                     // Mix channels if we have both, otherwise just use what we have
                     const channel0 = e.inputBuffer.getChannelData(0);
                     const channel1 = e.inputBuffer.numberOfChannels > 1
@@ -333,6 +378,7 @@ export default function Overlay() {
 
         } catch (err) {
             console.error('Error connecting:', err);
+            transportRef.current.stop();
             setStatus('error');
         }
     };
@@ -575,6 +621,11 @@ export default function Overlay() {
                     ⚠️ CONNECTION ERROR
                 </div>
             )}
+            {displayStatus === 'connected' && sttStatus !== 'connected' && (
+                <div style={{ color: sttStatus === 'failed' ? '#ff0000' : '#ff9900', fontSize: '14px', marginBottom: '8px' }}>
+                    {sttStatus === 'failed' ? '⚠️ TRANSCRIPTION STOPPED' : '⏳ TRANSCRIPTION RECONNECTING...'}
+                </div>
+            )}
             {displayStatus === 'connecting' && (
                 <div style={{ color: '#ff9900', fontSize: '18px' }}>
                     ⏳ CONNECTING...
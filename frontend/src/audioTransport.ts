@@ -0,0 +1,84 @@
+// How client audio reaches the backend for one connection: raw PCM frames from the
+// ScriptProcessor, or MediaRecorder WebM/Opus chunks once the backend has accepted them.
+// 'pending' means compressed was requested and the ack hasn't arrived (nothing is sent).
+export type Transport = 'pending' | 'pcm' | 'compressed';
+
+export interface RecorderLike {
+    state: string;
+    ondataavailable: ((e: { data: Blob }) => void) | null;
+    start(timeslice?: number): void;
+    stop(): void;
+}
+
+export interface AudioFormatAck {
+    status: string;
+    transport?: string;
+}
+
+type RecorderFactory = (stream: MediaStream) => RecorderLike;
+
+export class AudioTransport {
+    mode: Transport = 'pcm';
+    private recorder: RecorderLike | null = null;
+    private mixStream: MediaStream | null = null;
+    private send: ((chunk: Blob) => void) | null = null;
+    private createRecorder: RecorderFactory;
+    private timesliceMs: number;
+
+    constructor(createRecorder: RecorderFactory, timesliceMs: number) {
+        this.createRecorder = createRecorder;
+        this.timesliceMs = timesliceMs;
+    }
+
+    // New connection: anything left from the previous one is torn down first
+    begin(compressed: boolean, send: (chunk: Blob) => void) {
+        this.stop();
+        this.send = send;
+        this.mode = compressed ? 'pending' : 'pcm';
+    }
+
+    handleAck(ack: AudioFormatAck) {
+        if (ack.status === 'accepted' && ack.transport === 'passthrough') {
+            this.mode = 'compressed';
+            this.startRecorder();
+        } else {
+            this.mode = 'pcm';
+        }
+    }
+
+    // The mix is ready once the audio graph is built, which may be before or after the ack
+    setMixStream(stream: MediaStream) {
+        this.mixStream = stream;
+        if (this.mode === 'compressed') this.startRecorder();
+    }
+
+    get sendsPcm(): boolean {
+        return this.mode === 'pcm';
+    }
+
+    get recording(): boolean {
+        return this.recorder !== null;
+    }
+
+    // Connection closed or failed: release the recorder so the next session starts clean
+    stop() {
+        if (this.recorder && this.recorder.state !== 'inactive') {
+            this.recorder.stop();
+        }
+        if (this.recorder) this.recorder.ondataavailable = null;
+        this.recorder = null;
+        this.mixStream = null;
+        this.send = null;
+        this.mode = 'pcm';
+    }
+
+    private startRecorder() {
+        if (this.recorder || !this.mixStream) return;
+        const recorder = this.createRecorder(this.mixStream);
+        recorder.ondataavailable = (e) => {
+            if (e.data.size > 0 && this.send) this.send(e.data);
+        };
+        recorder.start(this.timesliceMs);
+        this.recorder = recorder;
+    }
+}
@@ -0,0 +1,87 @@
+// Run with `npm test` (Node's test runner; needs Node 22.6+ for --experimental-strip-types)
+import { test } from 'node:test';
+import assert from 'node:assert/strict';
+import { AudioTransport, type RecorderLike } from '../src/audioTransport.ts';
+
+class FakeRecorder implements RecorderLike {
+    state = 'inactive';
+    ondataavailable: ((e: { data: Blob }) => void) | null = null;
+    start() { this.state = 'recording'; }
+    stop() { this.state = 'inactive'; }
+    emit(data: string) { this.ondataavailable?.({ data: new Blob([data]) }); }
+}
+
+const setup = () => {
+    const recorders: FakeRecorder[] = [];
+    const transport = new AudioTransport(() => {
+        const recorder = new FakeRecorder();
+        recorders.push(recorder);
+        return recorder;
+    }, 250);
+    return { transport, recorders };
+};
+
+const stream = {} as MediaStream;
+
+test('pcm until the backend accepts compressed audio', () => {
+    const { transport, recorders } = setup();
+    transport.begin(true, () => {});
+    assert.equal(transport.mode, 'pending');
+    assert.equal(transport.sendsPcm, false);
+    transport.setMixStream(stream);
+    assert.equal(recorders.length, 0);
+
+    transport.handleAck({ status: 'rejected' });
+    assert.equal(transport.sendsPcm, true);
+    assert.equal(recorders.length, 0);
+});
+
+test('ack before or after the audio graph starts one recorder', () => {
+    const { transport, recorders } = setup();
+    transport.begin(true, () => {});
+    transport.handleAck({ status: 'accepted', transport: 'passthrough' });
+    assert.equal(recorders.length, 0);
+    transport.setMixStream(stream);
+    transport.setMixStream(stream);
+    assert.equal(recorders.length, 1);
+    assert.equal(recorders[0].state, 'recording');
+});
+
+test('reconnect after an accepted compressed ack records again', () => {
+    const { transport, recorders } = setup();
+    const first: number[] = [];
+    transport.begin(true, (chunk) => first.push(chunk.size));
+    transport.handleAck({ status: 'accepted', transport: 'passthrough' });
+    transport.setMixStream(stream);
+
+    // Socket closed: the recorder stops and PCM is the default again
+    transport.stop();
+    assert.equal(recorders[0].state, 'inactive');
+    assert.equal(transport.recording, false);
+    assert.equal(transport.mode, 'pcm');
+    recorders[0].emit('late');
+    assert.deepEqual(first, []);
+
+    // Retry: a fresh recorder feeds the new socket
+    const second: number[] = [];
+    transport.begin(true, (chunk) => second.push(chunk.size));
+    transport.handleAck({ status: 'accepted', transport: 'passthrough' });
+    transport.setMixStream(stream);
+    assert.equal(recorders.length, 2);
+    recorders[1].emit('opus');
+    assert.deepEqual(second, [4]);
+});
+
+test('a new connection without compression falls back to pcm', () => {
+    const { transport, recorders } = setup();
+    transport.begin(true, () => {});
+    transport.handleAck({ status: 'accepted', transport: 'passthrough' });
+    transport.setMixStream(stream);
+
+    // begin() tears down a recorder even if the old socket never reported closing
+    transport.begin(false, () => {});
+    assert.equal(recorders[0].state, 'inactive');
+    assert.equal(transport.sendsPcm, true);
+    transport.setMixStream(stream);
+    assert.equal(recorders.length, 1);
+});